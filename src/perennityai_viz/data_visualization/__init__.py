@@ -13,8 +13,14 @@ __version__ = "1.0.0"
 
 # Import all functions
 from .data_visualizer import DataVisualizer
+from .batch_processor import BatchProcessor
+from .frame_viewer import FrameViewer
+from .async_visualizer import AsyncDataVisualizer
 
 # public classes that are available at the sub-package level
 __all__ = [
            'DataVisualizer', 
+           'BatchProcessor',
+           'FrameViewer',
+           'AsyncDataVisualizer',
            ]
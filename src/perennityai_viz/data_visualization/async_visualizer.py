@@ -0,0 +1,276 @@
+import os
+import asyncio
+import tempfile
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from perennityai_viz.utils.landmark_layout import to_landmark_array, find_frame_runs
+
+
+class RenderCancelled(Exception):
+    """Raised in an encoding thread when the request it serves has been cancelled."""
+
+
+class _ChunkWriter:
+    """
+    A write-only binary file object that hands the bytes written by an encoder thread to an event loop.
+
+    Bytes are buffered up to `chunk_size` and then put on an asyncio.Queue of the loop; None marks the
+    end of the stream and an exception instance an encoding failure. Once cancelled, writing raises
+    RenderCancelled, which aborts the encoder.
+    """
+
+    def __init__(self, loop, queue, chunk_size):
+        self.loop = loop
+        self.queue = queue
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.cancelled = False
+
+    def _send(self, item):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+
+    def write(self, data):
+        if self.cancelled:
+            raise RenderCancelled()
+        self.buffer += data
+        if len(self.buffer) >= self.chunk_size:
+            self._send(bytes(self.buffer))
+            self.buffer.clear()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self, error=None):
+        if self.buffer:
+            self._send(bytes(self.buffer))
+            self.buffer.clear()
+        self._send(error)
+
+
+class AsyncDataVisualizer:
+    """
+    An asyncio front end of a DataVisualizer, for serving render requests from an event loop.
+
+    Reading, rendering and encoding run in executors, so the event loop is never blocked, and at most
+    `max_concurrency` requests are processed at once; further requests wait their turn. Frames are
+    rendered `frames_per_step` at a time, one executor call per step, so cancelling a request (e.g. the
+    client disconnected) stops its rendering between frames. A cancelled streaming request also aborts
+    its encoder at the next write.
+
+    The executors run methods of the shared visualizer, so they must be thread pools. GIFs with the
+    'palette' encoder are encoded in the render executor; other formats go through matplotlib, which
+    is not thread-safe, and are therefore encoded in a single-threaded executor by default.
+
+    Attributes:
+        visualizer (DataVisualizer): The visualizer doing the work.
+        max_concurrency (int): Maximum number of requests processed at once.
+        frames_per_step (int): Number of frames rendered per executor call.
+        read_executor (concurrent.futures.Executor): Executor of the reads.
+        render_executor (concurrent.futures.Executor): Executor of the rendering and GIF encoding.
+        encode_executor (concurrent.futures.Executor): Executor of the matplotlib-based encoding.
+    """
+
+    def __init__(self, visualizer, max_concurrency=4, frames_per_step=1, read_executor=None, render_executor=None,
+                 encode_executor=None):
+        """
+        Initializes the AsyncDataVisualizer.
+
+        Args:
+            visualizer (DataVisualizer): The visualizer doing the work.
+            max_concurrency (int, optional): Maximum number of requests processed at once. Defaults to 4.
+            frames_per_step (int, optional): Number of frames rendered per executor call; cancellation takes
+                effect between steps. Defaults to 1.
+            read_executor (concurrent.futures.Executor, optional): Executor of the reads. Defaults to a
+                thread pool of max_concurrency threads.
+            render_executor (concurrent.futures.Executor, optional): Executor of the rendering. Defaults to
+                a thread pool of max_concurrency threads.
+            encode_executor (concurrent.futures.Executor, optional): Executor of the matplotlib-based
+                encoding. Defaults to a single thread.
+
+        Raises:
+            ValueError: If max_concurrency or frames_per_step is not positive.
+        """
+        if max_concurrency < 1 or frames_per_step < 1:
+            raise ValueError("max_concurrency and frames_per_step must be positive!")
+
+        self.visualizer = visualizer
+        self.max_concurrency = max_concurrency
+        self.frames_per_step = frames_per_step
+        # Executors created here are shut down by close()
+        self.owned_executors = []
+        self.read_executor = read_executor or self._own(ThreadPoolExecutor(max_concurrency, thread_name_prefix='read'))
+        self.render_executor = render_executor or self._own(ThreadPoolExecutor(max_concurrency, thread_name_prefix='render'))
+        self.encode_executor = encode_executor or self._own(ThreadPoolExecutor(1, thread_name_prefix='encode'))
+        # Created in the running loop on first use
+        self.semaphore = None
+
+    def _own(self, executor):
+        self.owned_executors.append(executor)
+        return executor
+
+    def _get_semaphore(self):
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self.semaphore
+
+    async def _run(self, executor, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+    async def read_sequence(self, input_file, record_index=None):
+        """
+        Reads the landmarks and phrase of an input file (or record) in the read executor.
+
+        Args:
+            input_file (str): Path of the input file.
+            record_index (int, optional): Read only this record of the file. Defaults to None.
+
+        Returns:
+            tuple: (seq_df, phrase), see DataVisualizer.read_sequence.
+        """
+        return await self._run(self.read_executor,
+                               functools.partial(self.visualizer.read_sequence, input_file, record_index=record_index))
+
+    async def render_frames(self, seq_df):
+        """
+        Renders the combined frames of a sequence in the render executor, frames_per_step at a time.
+
+        Cancelling the awaiting task stops the rendering before the next step.
+
+        Args:
+            seq_df (pandas.DataFrame): Landmark data with one row per frame.
+
+        Returns:
+            list of numpy.ndarray: The combined frames.
+        """
+        images = []
+        for start in range(0, len(seq_df), self.frames_per_step):
+            step_df = seq_df.iloc[start:start + self.frames_per_step]
+            images.extend(await self._run(self.render_executor, self.visualizer.render_frames, step_df))
+        return images
+
+    async def render_unique_frames(self, seq_df):
+        """
+        Renders each run of identical consecutive frames once, see DataVisualizer.render_unique_frames.
+
+        Args:
+            seq_df (pandas.DataFrame): Landmark data with one row per frame.
+
+        Returns:
+            tuple: (images, counts), one combined frame and its number of frames per run.
+        """
+        tolerance = self.visualizer.frame_tolerance
+        if tolerance is None or len(seq_df) < 2:
+            return await self.render_frames(seq_df), [1] * len(seq_df)
+        starts, counts = find_frame_runs(to_landmark_array(seq_df), tolerance=tolerance)
+        return await self.render_frames(seq_df.iloc[starts].reset_index(drop=True)), counts.tolist()
+
+    def _get_title(self, input_file, phrase, output_format):
+        animation_name = self.visualizer.get_animation_name(input_file) + output_format
+        return animation_name, f'Gesture: {phrase} ({animation_name})'
+
+    def _encode_executor(self, output_format, gif_encoder):
+        return self.render_executor if output_format == '.gif' and gif_encoder == 'palette' else self.encode_executor
+
+    async def render_file(self, input_file, output_format='.gif', gif_encoder='palette', record_index=None):
+        """
+        Reads an input file and writes its animation to the output directory, without blocking the loop.
+
+        Args:
+            input_file (str): Path of the input file.
+            output_format (str, optional): Output format, e.g. '.gif'. Defaults to '.gif'.
+            gif_encoder (str, optional): 'palette' or 'pillow'. Defaults to 'palette'.
+            record_index (int, optional): Render only this record of the file. Defaults to None.
+
+        Returns:
+            str: The path of the written animation.
+        """
+        async with self._get_semaphore():
+            seq_df, phrase = await self.read_sequence(input_file, record_index=record_index)
+            images, counts = await self.render_unique_frames(seq_df)
+            animation_name, title = self._get_title(input_file, phrase, output_format)
+            out_file = os.path.join(self.visualizer.output_dir, animation_name)
+            save = functools.partial(self.visualizer.save_animation, images, out_file, title=title,
+                                     output_format=output_format, gif_encoder=gif_encoder, counts=counts)
+            return await self._run(self._encode_executor(output_format, gif_encoder), save)
+
+    async def stream(self, input_file, output_format='.gif', gif_encoder='palette', record_index=None,
+                     chunk_size=64 * 1024):
+        """
+        Renders an input file and yields the encoded animation in chunks, e.g. for an HTTP response.
+
+        GIFs with the 'palette' encoder are streamed while they are being encoded. Other formats are
+        encoded to a temporary file first, which is then streamed and deleted.
+
+        Args:
+            input_file (str): Path of the input file.
+            output_format (str, optional): Output format, e.g. '.gif'. Defaults to '.gif'.
+            gif_encoder (str, optional): 'palette' or 'pillow'. Defaults to 'palette'.
+            record_index (int, optional): Render only this record of the file. Defaults to None.
+            chunk_size (int, optional): Size of the yielded chunks in bytes. Defaults to 64 KiB.
+
+        Yields:
+            bytes: The next chunk of the encoded animation.
+        """
+        async with self._get_semaphore():
+            seq_df, phrase = await self.read_sequence(input_file, record_index=record_index)
+            images, counts = await self.render_unique_frames(seq_df)
+            _, title = self._get_title(input_file, phrase, output_format)
+
+            if output_format == '.gif' and gif_encoder == 'palette':
+                async for chunk in self._stream_gif(images, counts, title, chunk_size):
+                    yield chunk
+                return
+
+            file_descriptor, temp_file = tempfile.mkstemp(suffix=output_format, dir=self.visualizer.output_dir)
+            os.close(file_descriptor)
+            try:
+                save = functools.partial(self.visualizer.save_animation, images, temp_file, title=title,
+                                         output_format=output_format, gif_encoder=gif_encoder, counts=counts)
+                await self._run(self.encode_executor, save)
+                with open(temp_file, 'rb') as file:
+                    while True:
+                        chunk = await self._run(self.read_executor, file.read, chunk_size)
+                        if not chunk:
+                            break
+                        yield chunk
+            finally:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+
+    async def _stream_gif(self, images, counts, title, chunk_size):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        writer = _ChunkWriter(loop, queue, chunk_size)
+
+        def encode():
+            try:
+                self.visualizer.write_gif(images, writer, title=title, fps=3, counts=counts)
+            except RenderCancelled:
+                return
+            except Exception as e:
+                writer.close(e)
+                return
+            writer.close()
+
+        encoding = loop.run_in_executor(self.render_executor, encode)
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Stops the encoder at its next write when the consumer goes away early
+            writer.cancelled = True
+            if not encoding.done():
+                encoding.cancel()
+
+    def close(self):
+        """Shuts down the executors created by this instance."""
+        for executor in self.owned_executors:
+            executor.shutdown(wait=False)
+        self.owned_executors = []
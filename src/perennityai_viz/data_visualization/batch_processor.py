@@ -0,0 +1,269 @@
+import time
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+from perennityai_viz.utils import metrics
+
+# DataVisualizer owned by each worker process, created once by the pool initializer
+_worker_visualizer = None
+
+
+def _init_worker(config, metrics_queue=None):
+    """
+    Creates the DataVisualizer used by a worker process.
+
+    Args:
+        config (dict): Keyword arguments for DataVisualizer.
+        metrics_queue (multiprocessing.Queue, optional): Channel of the worker's metrics, see BatchMetrics.
+    """
+    global _worker_visualizer
+    if metrics_queue is not None:
+        metrics.set_metrics_sink(metrics.QueueSink(metrics_queue))
+    from perennityai_viz.data_visualization.data_visualizer import DataVisualizer
+    # Workers render each input once, so they keep no sequence cache; they are handed their inputs, so they
+    # neither search the input directory nor index archives they may never read
+    _worker_visualizer = DataVisualizer(**dict(config, cache_mb=0, files={}))
+
+
+def _call_worker(method, item, kwargs):
+    """
+    Calls a DataVisualizer method on the worker's instance.
+
+    Args:
+        method (str): Name of the DataVisualizer method.
+        item: First positional argument of the method.
+        kwargs (dict): Keyword arguments of the method.
+
+    Returns:
+        The method's return value.
+    """
+    try:
+        return getattr(_worker_visualizer, method)(item, **kwargs)
+    finally:
+        if isinstance(metrics._sink, metrics.QueueSink):
+            metrics._sink.report_rss()
+
+
+def _call_worker_timed(method, item, kwargs):
+    """
+    Calls a DataVisualizer method on the worker's instance and measures the time spent.
+
+    Returns:
+        tuple: (return value, seconds spent in the call).
+    """
+    start = time.perf_counter()
+    result = _call_worker(method, item, kwargs)
+    return result, time.perf_counter() - start
+
+
+class BatchProcessor:
+    """
+    A worker pool that runs DataVisualizer methods over many inputs.
+
+    Every worker process owns its own DataVisualizer, built once from the configuration of the
+    parent visualizer, so that TensorFlow, MediaPipe and matplotlib are initialized once per
+    worker rather than once per file. With max_workers <= 1 the work runs in the calling process
+    on the parent visualizer itself.
+
+    Attributes:
+        visualizer (DataVisualizer): The visualizer that owns the batch.
+        max_workers (int): Number of worker processes.
+        logger (Log): Logger of the parent visualizer.
+        executor (ProcessPoolExecutor): Long-lived pool used by submit, created on first use.
+        busy_seconds (float): Time workers spent in map and imap calls, for scheduler efficiency reports.
+        metrics_queue (multiprocessing.Queue): Channel through which workers send metrics, or None.
+    """
+
+    def __init__(self, visualizer, max_workers=None, metrics_queue=None):
+        """
+        Initializes the BatchProcessor.
+
+        Args:
+            visualizer (DataVisualizer): The parent visualizer. Its `config` is used to build the workers.
+            max_workers (int, optional): Number of worker processes. Defaults to the CPU count.
+            metrics_queue (multiprocessing.Queue, optional): Channel through which workers send metrics,
+                see BatchMetrics.queue. Defaults to None.
+        """
+        self.visualizer = visualizer
+        self.max_workers = max_workers if max_workers is not None else multiprocessing.cpu_count()
+        self.logger = visualizer.logger
+        self.executor = None
+        self.busy_seconds = 0.0
+        self.metrics_queue = metrics_queue
+
+    def _new_executor(self, max_workers=None):
+        # Spawn avoids forking an already initialized TensorFlow runtime
+        return ProcessPoolExecutor(max_workers=max_workers or self.max_workers,
+                                   mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker,
+                                   initargs=(self.visualizer.config, self.metrics_queue))
+
+    def _add_busy(self, seconds):
+        self.busy_seconds += seconds
+        metrics.observe('task', seconds)
+
+    def map(self, method, items, **kwargs):
+        """
+        Runs `visualizer.<method>(item, **kwargs)` for every item.
+
+        Args:
+            method (str): Name of the DataVisualizer method to call.
+            items (list): Inputs, each passed as the first positional argument.
+            **kwargs: Keyword arguments passed to every call.
+
+        Yields:
+            tuple: (item, result, error) in input order. `error` is the raised exception or None.
+        """
+        items = list(items)
+        if self.max_workers <= 1 or len(items) <= 1:
+            for item in items:
+                start = time.perf_counter()
+                try:
+                    result = getattr(self.visualizer, method)(item, **kwargs)
+                except Exception as e:
+                    result, error = None, e
+                else:
+                    error = None
+                self._add_busy(time.perf_counter() - start)
+                yield item, result, error
+            return
+
+        with self._new_executor(max_workers=min(self.max_workers, len(items))) as executor:
+            futures = [executor.submit(_call_worker_timed, method, item, kwargs) for item in items]
+            for item, future in zip(items, futures):
+                try:
+                    result, seconds = future.result()
+                except Exception as e:
+                    yield item, None, e
+                else:
+                    self._add_busy(seconds)
+                    yield item, result, None
+
+    def imap(self, method, items, max_pending=None, can_submit=None, **kwargs):
+        """
+        Runs `visualizer.<method>(item, **kwargs)` for items produced lazily by an iterator.
+
+        At most `max_pending` items are submitted ahead of the consumer, so a slow consumer
+        (or a fast producer) never accumulates unbounded work in memory. Results are produced as
+        they complete, so one long item never holds back the submission of further items.
+
+        When a worker process dies (e.g. killed for memory or crashed in a native library), the items
+        in flight in its pool are produced with the BrokenProcessPool error, and the remaining items
+        go to a new pool.
+
+        Args:
+            method (str): Name of the DataVisualizer method to call.
+            items (iterable): Inputs, consumed only as workers become available.
+            max_pending (int, optional): Maximum number of submitted, unconsumed items. Defaults to 2 * max_workers.
+            can_submit (callable, optional): Tells whether a further item may be submitted while others are
+                pending, e.g. PrefetchReader.within_budget. Defaults to None (up to max_pending).
+            **kwargs: Keyword arguments passed to every call.
+
+        Yields:
+            tuple: (item, result, error) in completion order. `error` is the raised exception or None.
+        """
+        if self.max_workers <= 1:
+            for item in items:
+                start = time.perf_counter()
+                try:
+                    result = getattr(self.visualizer, method)(item, **kwargs)
+                except Exception as e:
+                    result, error = None, e
+                else:
+                    error = None
+                self._add_busy(time.perf_counter() - start)
+                yield item, result, error
+            return
+
+        max_pending = max_pending if max_pending else 2 * self.max_workers
+        iterator = iter(items)
+        # Items by future, with the generation of the pool running them
+        pending = {}
+        executor = self._new_executor()
+        generation = 0
+
+        def restart(broken_generation):
+            # Replaces the pool once per broken generation; its in-flight futures fail by themselves
+            nonlocal executor, generation
+            if broken_generation != generation:
+                return
+            self.logger.warning("A worker process died, restarting the worker pool")
+            executor.shutdown(wait=False)
+            executor = self._new_executor()
+            generation += 1
+
+        try:
+            exhausted = False
+            while not exhausted or pending:
+                while (not exhausted and len(pending) < max_pending
+                       and (not pending or can_submit is None or can_submit())):
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    try:
+                        future = executor.submit(_call_worker_timed, method, item, kwargs)
+                    except BrokenProcessPool:
+                        restart(generation)
+                        future = executor.submit(_call_worker_timed, method, item, kwargs)
+                    pending[future] = (item, generation)
+
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item, item_generation = pending.pop(future)
+                    try:
+                        result, seconds = future.result()
+                    except BrokenProcessPool as e:
+                        restart(item_generation)
+                        yield item, None, e
+                    except Exception as e:
+                        yield item, None, e
+                    else:
+                        self._add_busy(seconds)
+                        yield item, result, None
+        finally:
+            executor.shutdown(wait=True)
+
+    def submit(self, method, item, **kwargs):
+        """
+        Submits one call of `visualizer.<method>(item, **kwargs)` to a long-lived pool.
+
+        The pool is kept warm across calls until close(), for callers that produce work over time.
+        With max_workers <= 1 the call runs immediately in this process.
+
+        Args:
+            method (str): Name of the DataVisualizer method to call.
+            item: First positional argument of the method.
+            **kwargs: Keyword arguments of the call.
+
+        Returns:
+            concurrent.futures.Future: The future of the call.
+        """
+        if self.max_workers <= 1:
+            future = Future()
+            try:
+                future.set_result(getattr(self.visualizer, method)(item, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        if self.executor is None:
+            self.executor = self._new_executor()
+        try:
+            return self.executor.submit(_call_worker, method, item, kwargs)
+        except BrokenProcessPool:
+            # A worker died; the calls in flight fail with BrokenProcessPool, later ones go to a new pool
+            self.logger.warning("A worker process died, restarting the worker pool")
+            self.executor.shutdown(wait=False)
+            self.executor = self._new_executor()
+            return self.executor.submit(_call_worker, method, item, kwargs)
+
+    def close(self):
+        """Waits for submitted calls and shuts the long-lived pool down."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
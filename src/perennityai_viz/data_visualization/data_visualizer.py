@@ -1,12 +1,17 @@
 import os
 import cv2
-import glob
 import json
+import time
+import hashlib
+import collections
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, wait
 import pandas as pd
 import numpy as np
 import mediapipe
 import tensorflow as tf
 
+from PIL import Image
 from mediapipe.framework.formats import landmark_pb2
 from matplotlib.animation import PillowWriter
 import matplotlib.pyplot as plt
@@ -16,6 +21,30 @@ from perennityai_viz.utils import TFRecordProcessor
 from perennityai_viz.utils import CSVHandler
 from perennityai_viz.utils import Log
 from perennityai_viz.utils import get_header
+from perennityai_viz.utils import GIFEncoder
+from perennityai_viz.utils import PrefetchReader
+from perennityai_viz.utils import RunManifest
+from perennityai_viz.utils.run_manifest import get_temp_path
+from perennityai_viz.utils.sharding import shard_files, get_shard_suffix
+from perennityai_viz.utils.directory_watcher import DirectoryWatcher
+from perennityai_viz.utils.cost_estimator import schedule_longest_first
+from perennityai_viz.utils.file_probe import FileProbe, get_file_format
+from perennityai_viz.utils.file_discovery import INPUT_PATTERNS, FileDiscovery, matches_any, get_output_stem
+from perennityai_viz.utils.array_reader import NPY_EXTENSIONS, ARROW_EXTENSIONS, read_array_file
+from perennityai_viz.utils.archive_reader import (ARCHIVE_PATTERNS, ARCHIVE_EXTENSIONS, is_archive, is_member_path,
+                                                  split_member_path, open_input, expand_archives, group_by_archive,
+                                                  set_index_dir, iter_member_records, read_array_member)
+from perennityai_viz.utils.shared_buffers import SharedBufferPool, SharedArrayRef
+from perennityai_viz.utils.sequence_cache import SequenceCache
+from perennityai_viz.utils import metrics
+from perennityai_viz.utils.metrics import BatchMetrics
+from perennityai_viz.utils.tfrecord_reader import read_tfrecord_record, decode_example
+from perennityai_viz.utils.landmark_layout import (LANDMARK_COLUMNS, PART_SLICES, to_landmark_array,
+                                                   get_presence_mask, get_part_presence, find_frame_runs,
+                                                   expand_runs)
+from perennityai_viz.utils.tfrecord_processor import RAW_LAYOUT
+from .batch_processor import BatchProcessor
+from .frame_viewer import FrameViewer
 
 header = get_header().split('\t')
 
@@ -29,12 +58,51 @@ mp_face_mesh = mediapipe.solutions.face_mesh
 mp_drawing = mediapipe.solutions.drawing_utils
 mp_drawing_styles = mediapipe.solutions.drawing_styles
 
+# Connections as (edges, 2) index arrays, so edges to absent landmarks can be masked in bulk
+HAND_CONNECTIONS = np.array(sorted(mp_hands.HAND_CONNECTIONS), dtype=np.int64)
+POSE_CONNECTIONS = np.array(sorted(mp_pose.POSE_CONNECTIONS), dtype=np.int64)
+FACEMESH_TESSELATION = np.array(sorted(mp_face_mesh.FACEMESH_TESSELATION), dtype=np.int64)
+FACEMESH_CONTOURS = np.array(sorted(mp_face_mesh.FACEMESH_CONTOURS), dtype=np.int64)
+
 # Animation setup
 rc('animation', html='jshtml')
 
 # Increase the animation embed limit to, for example, 50MB
 plt.rcParams['animation.embed_limit'] = 50 * 1024 * 1024  # 50 MB
 
+# Colors shared by the matplotlib figure and the GIF encoder
+BACKGROUND_COLOR = '#030012'
+TITLE_COLOR = '#c3c0d8'
+
+
+def hex_to_rgb(color):
+    """Converts a '#rrggbb' color string to an RGB tuple."""
+    color = color.lstrip('#')
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def get_durations(counts, fps):
+    """Converts the frame counts of animation images to display durations in milliseconds."""
+    return [int(round(1000 * count / fps)) for count in counts]
+
+
+def get_style_colors():
+    """
+    Collects every color used by the MediaPipe drawing styles applied in this module.
+
+    Returns:
+        list of tuple: Unique colors, in the channel order they are written into the frames.
+    """
+    specs = []
+    specs += list(mp_drawing_styles.get_default_hand_landmarks_style().values())
+    specs += list(mp_drawing_styles.get_default_hand_connections_style().values())
+    specs += list(mp_drawing_styles.get_default_face_mesh_contours_style().values())
+    specs.append(mp_drawing_styles.get_default_face_mesh_tesselation_style())
+    specs += list(mp_drawing_styles.get_default_pose_landmarks_style().values())
+    # Default connection spec used for hand and pose edges and the landmark circle borders
+    specs.append(mp_drawing.DrawingSpec())
+    return list(dict.fromkeys(tuple(spec.color) for spec in specs))
+
 class DataVisualizer:
     """
     The DataVisualizer class handles and validates dataset files in CSV or TFRecord formats,
@@ -62,7 +130,9 @@ class DataVisualizer:
         ValueError: If no valid input files are found in the input directory.
     """
     
-    def __init__(self, input_file='', input_dir='', output_dir='', encoding='', verbose='INFO'):
+    def __init__(self, input_file='', input_dir='', output_dir='', encoding='', verbose='INFO', cache_mb=512,
+                 frame_tolerance=0.0, include=None, exclude=None, recursive=True, listing_cache=True,
+                 files=None):
         """
         Initializes the DataVisualizer with the specified input file or directory, output directory,
         and data input format. Validates paths and sets up the output directory structure. If no valid
@@ -74,6 +144,23 @@ class DataVisualizer:
             output_dir (str): Directory path where processed data and visualizations will be saved.
             data_input_format (str): Format of input data files ('csv' or 'tfrecord'). Defaults to 'csv'.
             logger (Logger, optional): Logger instance for logging activities. Defaults to None.
+            cache_mb (float, optional): Memory budget of the cache of decoded sequences (see read_sequence).
+                Defaults to 512; 0 disables the cache.
+            frame_tolerance (float, optional): Runs of consecutive frames whose landmarks differ by at most
+                this much from the run's first frame are rendered once and encoded as one longer frame (see
+                render_unique_frames). Defaults to 0.0 (exact duplicates only); None renders every frame.
+            include (list of str, optional): Patterns of the input files, matched against the path relative
+                to input_dir and the file name, e.g. ['participant_1/*']. Defaults to every input format and
+                tar and zip archives, whose members are read in place (see discover_files).
+            exclude (list of str, optional): Patterns of the files and directories of input_dir, and of the
+                archive members, to skip. The output directory is always skipped. Defaults to None.
+            recursive (bool, optional): Search the subdirectories of input_dir. Defaults to True.
+            listing_cache (bool, optional): Cache the directory listings in `discovery_cache.json` of the
+                output directory, so unchanged directories are not listed again (see FileDiscovery).
+                Defaults to True.
+            files (dict, optional): Input files by format (see split_by_format) already known to the caller,
+                e.g. the parent of a batch worker, so input_dir and archives are not searched again.
+                Defaults to None.
 
         Raises:
             ValueError: If neither input file nor input directory is valid.
@@ -82,6 +169,10 @@ class DataVisualizer:
         """
         self.input_file = input_file
         self.input_dir = input_dir
+        # Constructor arguments, used to build the visualizers of batch worker processes
+        self.config = dict(input_file=input_file, input_dir=input_dir, output_dir=output_dir,
+                           encoding=encoding, verbose=verbose, cache_mb=cache_mb, frame_tolerance=frame_tolerance,
+                           include=include, exclude=exclude, recursive=recursive, listing_cache=listing_cache)
         
 
         self.logger = Log(log_file=os.path.join(output_dir,  f"data_visualizer.log"), verbose=verbose)
@@ -97,37 +188,113 @@ class DataVisualizer:
         self.output_dir = os.path.join(output_dir, 'animations')
         # Ensure Path
         os.makedirs(self.output_dir, exist_ok=True)
+        # Archive indexes are kept with the outputs, never in the (possibly read-only) input tree
+        set_index_dir(os.path.join(self.output_dir, '.archive_index'))
         
         # Initialize input and output paths based on input format
-        if os.path.exists(input_dir):
-
-            # Collect files based on specified data format
-            self.tf_dataset_files = glob.glob(f'{self.input_dir}/*.tfrecord')
-
-            self.csv_dataset_files = glob.glob(f'{self.input_dir}/*.csv')
-
-            self.parquet_dataset_files = glob.glob(f'{self.input_dir}/*.parquet')
+        if files is not None:
+            self.set_dataset_files(dict(self.split_by_format([]), **files))
+        elif os.path.exists(input_dir):
+
+            # Collect the files of every format in a single pass over the directory tree
+            files_by_format = self.discover_files(include=include, exclude=exclude, recursive=recursive,
+                                                  listing_cache=listing_cache)
+            self.set_dataset_files(files_by_format)
             
             # Check for valid files
-            if len(self.csv_dataset_files) == 0 and len(self.tf_dataset_files) == 0 and len(self.parquet_dataset_files) == 0:
+            if not self.get_dataset_files():
                 raise ValueError("The input directory is empty!")
         
+        elif is_archive(input_file) and os.path.exists(input_file):
+            self.set_dataset_files(self.split_by_format(expand_archives([input_file], exclude=exclude or ())))
+            if not self.get_dataset_files():
+                raise ValueError(f"The archive has no input files : {input_file}")
         elif '.tfrecord' in input_file and os.path.exists(input_file):
             self.tf_dataset_files = [input_file]
         elif '.csv' in input_file and os.path.exists(input_file):
             self.csv_dataset_files = [input_file]
         elif '.parquet' in input_file and os.path.exists(input_file):
             self.parquet_dataset_files = [input_file]
+        elif input_file.endswith(NPY_EXTENSIONS) and os.path.exists(input_file):
+            self.npy_dataset_files = [input_file]
+        elif input_file.endswith(ARROW_EXTENSIONS) and os.path.exists(input_file):
+            self.arrow_dataset_files = [input_file]
         else:
             raise ValueError(f"Please provide valid input! input_dir: {self.input_dir},  input_file:{self.input_file}")
         
         self.csv = CSVHandler(encoding=encoding)
-        self.tfrecord_processor = TFRecordProcessor(input_file=input_file, input_path=self.input_dir, logger=self.logger)
+        # Built lazily on the first direct GIF write
+        self.gif_encoder = None
+        # Built lazily on the first probe
+        self.file_probe = None
+        # Decoded sequences of this session, so that re-rendering a file does not read it again
+        self.sequence_cache = SequenceCache(max_bytes=int(cache_mb * 1024 * 1024))
+        self.frame_tolerance = frame_tolerance
+        # TensorFlow reads files only, archive members are decoded by read_member
+        tf_files = [f for f in getattr(self, 'tf_dataset_files', []) if not is_member_path(f)]
+        self.tfrecord_processor = TFRecordProcessor(input_file=input_file if not is_archive(input_file) else '',
+                                                    input_path=self.input_dir, logger=self.logger,
+                                                    files=tf_files if input_dir else None)
 
         self.logger.debug("input_file : ", self.input_file)
         self.logger.debug("input_dir : ", self.input_dir)
         self.logger.debug("output_dir : ", self.output_dir)
         
+    def discover_files(self, include=None, exclude=None, recursive=True, listing_cache=True):
+        """
+        Lists the input files of the input directory tree, by format.
+
+        Tar (WebDataset-style shards, optionally compressed) and zip archives are not extracted: each is
+        replaced by the member paths of its input files, e.g. 'shards/shard-000.tar::0001.parquet', in
+        archive order. Members are read in memory through the same readers as files (see read_member).
+
+        Args:
+            include (list of str, optional): Patterns of the input files. Defaults to every input format.
+            exclude (list of str, optional): Patterns of the files and directories to skip. Defaults to None.
+            recursive (bool, optional): Search the subdirectories. Defaults to True.
+            listing_cache (bool, optional): Use the listing cache of the output directory. Defaults to True.
+
+        Returns:
+            dict: File lists by format: 'tfrecord', 'csv', 'parquet', 'npy' and 'arrow'.
+        """
+        exclude = list(exclude or [])
+        # Never read back our own outputs (e.g. chunk frames) when the output directory is inside the input tree
+        output_rel = os.path.relpath(os.path.abspath(self.output_dir), os.path.abspath(self.input_dir))
+        if not output_rel.startswith(os.pardir):
+            exclude.append(output_rel.replace(os.sep, '/'))
+
+        cache_file = os.path.join(self.output_dir, 'discovery_cache.json') if listing_cache else None
+        discovery = FileDiscovery(include=include or INPUT_PATTERNS + ARCHIVE_PATTERNS, exclude=exclude,
+                                  recursive=recursive, cache_file=cache_file, logger=self.logger)
+        files = expand_archives(discovery.find_files(self.input_dir), exclude=exclude, logger=self.logger)
+        return self.split_by_format(files)
+
+    @staticmethod
+    def split_by_format(files):
+        """
+        Groups input files by format, keeping their order.
+
+        Args:
+            files (list of str): Paths of input files or archive members.
+
+        Returns:
+            dict: File lists by format: 'tfrecord', 'csv', 'parquet', 'npy' and 'arrow'.
+        """
+        files_by_format = {'tfrecord': [], 'csv': [], 'parquet': [], 'npy': [], 'arrow': []}
+        for f in files:
+            # Custom include patterns may also match sidecars such as index or metadata files
+            if matches_any(os.path.basename(f), INPUT_PATTERNS):
+                files_by_format[get_file_format(f)].append(f)
+        return files_by_format
+
+    def set_dataset_files(self, files_by_format):
+        """Sets the input file lists of every format, see split_by_format."""
+        self.tf_dataset_files = files_by_format['tfrecord']
+        self.csv_dataset_files = files_by_format['csv']
+        self.parquet_dataset_files = files_by_format['parquet']
+        self.npy_dataset_files = files_by_format['npy']
+        self.arrow_dataset_files = files_by_format['arrow']
+
     @classmethod
     def from_pretrained(cls, config):
         """
@@ -152,16 +319,90 @@ class DataVisualizer:
             output_dir=config.get('output_dir', ''),
             data_input_format=config.get('data_input_format', 'csv'),
             encoding=config.get('encoding','ISO-8859-1'),
-            verbose=config.get('verbose','INFO')
+            verbose=config.get('verbose','INFO'),
+            cache_mb=config.get('cache_mb', 512),
+            frame_tolerance=config.get('frame_tolerance', 0.0),
+            include=config.get('include'),
+            exclude=config.get('exclude'),
+            recursive=config.get('recursive', True),
+            listing_cache=config.get('listing_cache', True)
         )
 
-    def get_hands(self, seq_df):
+    def _draw_part(self, landmarks, present, drawings, canvas_size=(600, 600)):
+        """
+        Draws one body part on a canvas per frame, skipping absent frames and edges to absent landmarks.
+
+        Args:
+            landmarks (numpy.ndarray): Landmarks of the part, of shape (frames, part landmarks, 3).
+            present (numpy.ndarray): Boolean presence mask of shape (frames, part landmarks).
+            drawings (list of tuple): (connections, draw_landmarks keyword arguments) pairs, drawn in order.
+                connections is an (edges, 2) integer array.
+            canvas_size (tuple, optional): (width, height) of the images. Defaults to (600, 600).
+
+        Returns:
+            tuple: A tuple containing:
+                - images (list of numpy.ndarray): One uint8 image per frame. Frames where the part is
+                  absent all share the same blank image.
+                - all_landmarks (list of landmark_pb2.NormalizedLandmarkList): One landmark list per frame,
+                  empty where the part is absent.
+        """
+        images = []
+        all_landmarks = []
+        blank_image = np.zeros((canvas_size[1], canvas_size[0], 3), dtype=np.uint8)
+        part_present = present.any(axis=1)
+
+        # Edges whose both ends are present, for all frames at once
+        valid_edges = [present[:, connections[:, 0]] & present[:, connections[:, 1]] for connections, _ in drawings]
+
+        for seq_idx in range(len(landmarks)):
+            if not part_present[seq_idx]:
+                images.append(blank_image)
+                all_landmarks.append(landmark_pb2.NormalizedLandmarkList())
+                continue
+
+            annotated_image = np.zeros((canvas_size[1], canvas_size[0], 3), dtype=np.uint8)
+            landmark_list = landmark_pb2.NormalizedLandmarkList()
+            for x, y, z in landmarks[seq_idx].tolist():
+                landmark_list.landmark.add(x=x, y=y, z=z)
+            self.logger.debug('landmarks: %d', len(landmark_list.landmark))
+
+            for (connections, draw_kwargs), valid in zip(drawings, valid_edges):
+                mp_drawing.draw_landmarks(
+                    annotated_image,
+                    landmark_list,
+                    [tuple(edge) for edge in connections[valid[seq_idx]].tolist()],
+                    **draw_kwargs)
+
+            images.append(annotated_image)
+            all_landmarks.append(landmark_list)
+
+        return images, all_landmarks
+
+    def get_presence(self, seq_df):
+        """
+        Computes the landmark presence mask of a sequence once, for all body parts and frames.
+
+        Args:
+            seq_df (pandas.DataFrame): Landmark data with one row per frame.
+
+        Returns:
+            tuple: A tuple containing:
+                - landmarks (numpy.ndarray): Landmark coordinates of shape (frames, 543, 3).
+                - presence (dict): Maps each body part to a (frames, part landmarks) boolean mask.
+        """
+        landmarks = to_landmark_array(seq_df)
+        return landmarks, get_presence_mask(landmarks)
+
+    def get_hands(self, seq_df, landmarks=None, presence=None, canvas_size=(600, 600)):
         """
         Extracts hand landmarks from a DataFrame and generates annotated images for both hands.
 
         Args:
             seq_df (pandas.DataFrame): A DataFrame containing hand landmark data, with columns for x, y, and z coordinates 
                                     of both the right and left hands.
+            landmarks (numpy.ndarray, optional): Landmark array of seq_df, as returned by get_presence.
+            presence (dict, optional): Presence mask of seq_df, as returned by get_presence.
+            canvas_size (tuple, optional): (width, height) of the images. Defaults to (600, 600).
 
         Returns:
             tuple: A tuple containing:
@@ -173,68 +414,33 @@ class DataVisualizer:
         Raises:
             ValueError: If seq_df does not contain any hand data for either hand.
         """
-        images = []
-        all_hand_landmarks = []
-
         if seq_df.empty:
             raise ValueError("The input DataFrame is empty.")
 
-        for seq_idx in range(len(seq_df)):
-            # Extract right hand landmarks
-            x_hand = seq_df.iloc[seq_idx].filter(regex="x_right_hand.*").values
-            y_hand = seq_df.iloc[seq_idx].filter(regex="y_right_hand.*").values
-            z_hand = seq_df.iloc[seq_idx].filter(regex="z_right_hand.*").values
+        if landmarks is None or presence is None:
+            landmarks, presence = self.get_presence(seq_df)
 
-            right_hand_image = np.zeros((600, 600, 3))
-            right_hand_landmarks = landmark_pb2.NormalizedLandmarkList()
-            right_len = 0
-            
-            for x, y, z in zip(x_hand, y_hand, z_hand):
-                right_hand_landmarks.landmark.add(x=x, y=y, z=z)
-                right_len += 1
-            self.logger.debug('right_hand_landmarks: %d', right_len)
-
-            # Draw right hand landmarks
-            mp_drawing.draw_landmarks(
-                right_hand_image,
-                right_hand_landmarks,
-                mp_hands.HAND_CONNECTIONS,
-                landmark_drawing_spec=mp_drawing_styles.get_default_hand_landmarks_style())
-
-            # Extract left hand landmarks
-            x_hand = seq_df.iloc[seq_idx].filter(regex="x_left_hand.*").values
-            y_hand = seq_df.iloc[seq_idx].filter(regex="y_left_hand.*").values
-            z_hand = seq_df.iloc[seq_idx].filter(regex="z_left_hand.*").values
-
-            left_hand_image = np.zeros((600, 600, 3))
-            left_hand_landmarks = landmark_pb2.NormalizedLandmarkList()
-            left_len = 0
-            
-            for x, y, z in zip(x_hand, y_hand, z_hand):
-                left_hand_landmarks.landmark.add(x=x, y=y, z=z)
-                left_len += 1
-            self.logger.debug('left_hand_landmarks: %d', left_len)
-
-            # Draw left hand landmarks
-            mp_drawing.draw_landmarks(
-                left_hand_image,
-                left_hand_landmarks,
-                mp_hands.HAND_CONNECTIONS,
-                landmark_drawing_spec=mp_drawing_styles.get_default_hand_landmarks_style())
-
-            # Append images and landmarks to the results
-            images.append([right_hand_image.astype(np.uint8), left_hand_image.astype(np.uint8)])
-            all_hand_landmarks.append([right_hand_landmarks, left_hand_landmarks])
+        drawings = [(HAND_CONNECTIONS, dict(landmark_drawing_spec=mp_drawing_styles.get_default_hand_landmarks_style()))]
+        right_images, right_landmarks = self._draw_part(
+            landmarks[:, PART_SLICES['right_hand']], presence['right_hand'], drawings, canvas_size=canvas_size)
+        left_images, left_landmarks = self._draw_part(
+            landmarks[:, PART_SLICES['left_hand']], presence['left_hand'], drawings, canvas_size=canvas_size)
+
+        images = [list(pair) for pair in zip(right_images, left_images)]
+        all_hand_landmarks = [list(pair) for pair in zip(right_landmarks, left_landmarks)]
 
         return images, all_hand_landmarks
 
 
-    def get_face(self, seq_df):
+    def get_face(self, seq_df, landmarks=None, presence=None, canvas_size=(600, 600)):
         """
         Extracts face landmarks from a DataFrame and generates annotated images.
 
         Args:
             seq_df (pandas.DataFrame): A DataFrame containing face landmark data, with columns for x, y, and z coordinates.
+            landmarks (numpy.ndarray, optional): Landmark array of seq_df, as returned by get_presence.
+            presence (dict, optional): Presence mask of seq_df, as returned by get_presence.
+            canvas_size (tuple, optional): (width, height) of the images. Defaults to (600, 600).
 
         Returns:
             tuple: A tuple containing:
@@ -244,53 +450,31 @@ class DataVisualizer:
         Raises:
             ValueError: If seq_df does not contain any face data.
         """
-        images = []
-        all_face_landmarks = []
-        
         if seq_df.empty:
             raise ValueError("The input DataFrame is empty.")
-        
-        for seq_idx in range(len(seq_df)):
-            x_face = seq_df.iloc[seq_idx].filter(regex="x_face.*").values
-            y_face = seq_df.iloc[seq_idx].filter(regex="y_face.*").values
-            z_face = seq_df.iloc[seq_idx].filter(regex="z_face.*").values
-
-            annotated_image = np.zeros((600, 600, 3))
 
-            face_landmarks = landmark_pb2.NormalizedLandmarkList()
-            i = 0
-            for x, y, z in zip(x_face, y_face, z_face):
-                face_landmarks.landmark.add(x=x, y=y, z=z)
-                i += 1
-            self.logger.debug('face_landmarks: %d', i)
+        if landmarks is None or presence is None:
+            landmarks, presence = self.get_presence(seq_df)
 
+        drawings = [
             # Draw face mesh tessellation
-            mp_drawing.draw_landmarks(
-                image=annotated_image,
-                landmark_list=face_landmarks,
-                connections=mp_face_mesh.FACEMESH_TESSELATION,
-                landmark_drawing_spec=None,
-                connection_drawing_spec=mp_drawing_styles.get_default_face_mesh_tesselation_style())
-            
+            (FACEMESH_TESSELATION, dict(landmark_drawing_spec=None,
+                                        connection_drawing_spec=mp_drawing_styles.get_default_face_mesh_tesselation_style())),
             # Draw face mesh contours
-            mp_drawing.draw_landmarks(
-                image=annotated_image,
-                landmark_list=face_landmarks,
-                connections=mp_face_mesh.FACEMESH_CONTOURS,
-                landmark_drawing_spec=None,
-                connection_drawing_spec=mp_drawing_styles.get_default_face_mesh_contours_style())
-
-            images.append(annotated_image.astype(np.uint8))
-            all_face_landmarks.append(face_landmarks)
+            (FACEMESH_CONTOURS, dict(landmark_drawing_spec=None,
+                                     connection_drawing_spec=mp_drawing_styles.get_default_face_mesh_contours_style())),
+        ]
+        return self._draw_part(landmarks[:, PART_SLICES['face']], presence['face'], drawings, canvas_size=canvas_size)
 
-        return images, all_face_landmarks
-
-    def get_pose(self, seq_df):
+    def get_pose(self, seq_df, landmarks=None, presence=None, canvas_size=(600, 600)):
         """
         Extracts pose landmarks from a DataFrame and generates annotated images.
 
         Args:
             seq_df (pandas.DataFrame): A DataFrame containing pose landmark data, with columns for x, y, and z coordinates.
+            landmarks (numpy.ndarray, optional): Landmark array of seq_df, as returned by get_presence.
+            presence (dict, optional): Presence mask of seq_df, as returned by get_presence.
+            canvas_size (tuple, optional): (width, height) of the images. Defaults to (600, 600).
 
         Returns:
             tuple: A tuple containing:
@@ -300,40 +484,14 @@ class DataVisualizer:
         Raises:
             ValueError: If seq_df does not contain any pose data.
         """
-        images = []
-        all_pose_landmarks = []
-        
         if seq_df.empty:
             raise ValueError("The input DataFrame is empty.")
-        
-        for seq_idx in range(len(seq_df)):
-            x_pose = seq_df.iloc[seq_idx].filter(regex="x_pose.*").values
-            y_pose = seq_df.iloc[seq_idx].filter(regex="y_pose.*").values
-            z_pose = seq_df.iloc[seq_idx].filter(regex="z_pose.*").values
-
-            annotated_image = np.zeros((600, 600, 3))
-
-            data_points = []
-            i = 0
-            for x, y, z in zip(x_pose, y_pose, z_pose):
-                data_points.append(np.array([x, y, z]))
-                i += 1
-            self.logger.debug('pose_landmarks: %d', i)
-
-            pose_landmarks = landmark_pb2.NormalizedLandmarkList()
-            for row in data_points:
-                pose_landmarks.landmark.add(x=row[0], y=row[1], z=row[2])
-
-            mp_drawing.draw_landmarks(
-                annotated_image,
-                pose_landmarks,
-                mp_pose.POSE_CONNECTIONS,
-                landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style())
-            
-            images.append(annotated_image.astype(np.uint8))
-            all_pose_landmarks.append(pose_landmarks)
 
-        return images, all_pose_landmarks
+        if landmarks is None or presence is None:
+            landmarks, presence = self.get_presence(seq_df)
+
+        drawings = [(POSE_CONNECTIONS, dict(landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style()))]
+        return self._draw_part(landmarks[:, PART_SLICES['pose']], presence['pose'], drawings, canvas_size=canvas_size)
 
 
     def create_animation(self, images, title=''):
@@ -353,7 +511,7 @@ class DataVisualizer:
         if not images:
             raise ValueError("The images list cannot be empty.")
 
-        bg_color = '#030012'
+        bg_color = BACKGROUND_COLOR
         fig = plt.figure(figsize=(8, 8)) # Set the figure size with width and height (in inches)
         fig.patch.set_facecolor(bg_color)  # Set figure background color (light gray here)
         ax = plt.Axes(fig, [0., 0., 1., 1.])
@@ -367,11 +525,89 @@ class DataVisualizer:
         def animate_func(i):
             ax.clear()  # Clear previous image before drawing new one
             ax.imshow(images[i], animated=True)
-            ax.set_title(f"Visualization of {title}", color="#c3c0d8", fontsize=24)# Set the title for each frame
+            ax.set_title(f"Visualization of {title}", color=TITLE_COLOR, fontsize=24)# Set the title for each frame
             return [ax]
 
         return FuncAnimation(fig, animate_func, frames=len(images), interval=1000/10)
 
+    def draw_title(self, image, title):
+        """
+        Draws the animation title centered at the top of a frame.
+
+        Args:
+            image (numpy.ndarray): The frame to draw on. It is not modified.
+            title (str): The title text.
+
+        Returns:
+            numpy.ndarray: A copy of the frame with the title drawn on it.
+        """
+        image = image.copy()
+        text = f"Visualization of {title}"
+        font, scale, thickness = cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2
+        (text_width, text_height), _ = cv2.getTextSize(text, font, scale, thickness)
+        origin = (max(0, (image.shape[1] - text_width) // 2), text_height + 20)
+        cv2.putText(image, text, origin, font, scale, hex_to_rgb(TITLE_COLOR), thickness, cv2.LINE_AA)
+        return image
+
+    def write_gif(self, images, out_file, title='', fps=3, counts=None):
+        """
+        Encodes frames directly into a GIF using a palette shared by all frames.
+
+        Unlike saving the matplotlib animation with PillowWriter, frames are not re-rasterized
+        by matplotlib and are not quantized independently; see GIFEncoder.
+
+        Args:
+            images (list of numpy.ndarray): Combined frames to encode.
+            out_file (str): Path of the GIF file to write.
+            title (str, optional): The title drawn on each frame. Defaults to ''.
+            fps (int, optional): Frames per second. Defaults to 3.
+            counts (list of int, optional): Number of frames each image stands for, as returned by
+                render_unique_frames; an image is shown that many frame durations. Defaults to one each.
+
+        Returns:
+            str: The path of the written file.
+        """
+        if not images:
+            raise ValueError("The images list cannot be empty.")
+
+        if self.gif_encoder is None or self.gif_encoder.fps != fps:
+            self.gif_encoder = GIFEncoder(
+                colors=get_style_colors() + [hex_to_rgb(TITLE_COLOR)],
+                background=(0, 0, 0),
+                fps=fps,
+                logger=self.logger
+            )
+
+        if title:
+            # Title bands are identical across frames, so they cost nothing after the first frame
+            images = [self.draw_title(image, title) for image in images]
+
+        return self.gif_encoder.write(images, out_file, durations=get_durations(counts, fps) if counts else None)
+
+    def write_webp(self, images, out_file, title='', fps=3, counts=None):
+        """
+        Encodes frames directly into a lossless animated WebP, with per-frame durations.
+
+        Args:
+            images (list of numpy.ndarray): Combined frames to encode.
+            out_file (str): Path of the WebP file to write.
+            title (str, optional): The title drawn on each frame. Defaults to ''.
+            fps (int, optional): Frames per second. Defaults to 3.
+            counts (list of int, optional): Number of frames each image stands for. Defaults to one each.
+
+        Returns:
+            str: The path of the written file.
+        """
+        if not images:
+            raise ValueError("The images list cannot be empty.")
+
+        if title:
+            images = [self.draw_title(image, title) for image in images]
+        frames = [Image.fromarray(np.ascontiguousarray(image, dtype=np.uint8)) for image in images]
+        frames[0].save(out_file, format='WEBP', save_all=True, append_images=frames[1:],
+                       duration=get_durations(counts or [1] * len(frames), fps), loop=0, lossless=True)
+        return out_file
+
 
     def resize_image(self, image, size):
         """
@@ -389,7 +625,8 @@ class DataVisualizer:
         """
         return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
 
-    def combine_images(self, right_hand_images, left_hand_images, face_images, pose_images):
+    def combine_images(self, right_hand_images, left_hand_images, face_images, pose_images, target_size=(1280, 720),
+                       part_presence=None):
         """
         Combines images of right hand, left hand, face, and body pose into a single image for each set of images.
 
@@ -398,6 +635,9 @@ class DataVisualizer:
             left_hand_images (list of numpy.ndarray): List of images depicting the left hand landmarks.
             face_images (list of numpy.ndarray): List of images depicting face landmarks.
             pose_images (list of numpy.ndarray): List of images depicting body pose landmarks.
+            target_size (tuple, optional): (width, height) of the combined images. Defaults to (1280, 720).
+            part_presence (dict, optional): Maps 'right_hand', 'left_hand', 'face' and 'pose' to (frames,) boolean
+                arrays. Images of absent parts are neither resized nor overlaid.
 
         Returns:
             list of numpy.ndarray: A list of combined images, each containing the overlaid right hand, left hand, face, 
@@ -407,28 +647,33 @@ class DataVisualizer:
             ValueError: If the lengths of the input image lists do not match.
         """
         combined_images = []
-        target_size = (1280, 720)  # Ensure all images are resized to this target size
 
         # Check if all input lists are of the same length
         if not (len(right_hand_images) == len(left_hand_images) == len(face_images) == len(pose_images)):
             raise ValueError("All input image lists must have the same length.")
 
-        for idx, (rh_img, lh_img, face_img, pose_img) in enumerate(zip(right_hand_images, left_hand_images, face_images, pose_images)):
-            
-            # Resize images to the target size
-            rh_img_resized = self.resize_image(rh_img, target_size)
-            lh_img_resized = self.resize_image(lh_img, target_size)
-            face_img_resized = self.resize_image(face_img, target_size)
-            pose_img_resized = self.resize_image(pose_img, target_size)
-
+        num_frames = len(right_hand_images)
+        if part_presence is None:
+            part_presence = {}
+        parts = [
+            (right_hand_images, part_presence.get('right_hand', np.ones(num_frames, dtype=bool))),
+            (left_hand_images, part_presence.get('left_hand', np.ones(num_frames, dtype=bool))),
+            (face_images, part_presence.get('face', np.ones(num_frames, dtype=bool))),
+            (pose_images, part_presence.get('pose', np.ones(num_frames, dtype=bool))),
+        ]
+
+        for idx in range(num_frames):
             # Create a blank image for the combined output
             combined_image = np.zeros((target_size[1], target_size[0], 3), dtype=np.uint8)
 
-            # Overlay each image onto the blank image
-            combined_image = cv2.addWeighted(combined_image, 1.0, rh_img_resized, 1.0, 0)
-            combined_image = cv2.addWeighted(combined_image, 1.0, lh_img_resized, 1.0, 0)
-            combined_image = cv2.addWeighted(combined_image, 1.0, face_img_resized, 1.0, 0)
-            combined_image = cv2.addWeighted(combined_image, 1.0, pose_img_resized, 1.0, 0)
+            # Resize and overlay each present part onto the blank image
+            for images, present in parts:
+                if not present[idx]:
+                    continue
+                image_resized = images[idx]
+                if image_resized.shape[:2] != (target_size[1], target_size[0]):
+                    image_resized = self.resize_image(image_resized, target_size)
+                combined_image = cv2.addWeighted(combined_image, 1.0, image_resized, 1.0, 0)
 
             # Append the combined image to the result list
             combined_images.append(combined_image)
@@ -460,7 +705,7 @@ class DataVisualizer:
         Reads a TFRecord file and returns its contents as a DataFrame.
 
         Args:
-            tfrecord_file (str): The path to the TFRecord file to be read.
+            tfrecord_file (str): The path to the TFRecord file to be read, or an archive member path.
 
         Returns:
             tuple: A tuple containing:
@@ -474,8 +719,18 @@ class DataVisualizer:
         It iterates through the dataset to collect landmarks and phrases, storing them in lists which are
         then converted into a DataFrame.
         """
+        if is_member_path(tfrecord_file):
+            return self.read_tfrecord_member(tfrecord_file)
+
+        # Raw-tensor records are decoded with NumPy directly
+        if self.tfrecord_processor.detect_layout(tfrecord_file) == RAW_LAYOUT:
+            records = list(self.tfrecord_processor.read_raw_records(tfrecord_file))
+            landmark_np = np.concatenate([landmarks.reshape(len(landmarks), -1) for landmarks, _, _ in records])
+            landmarks = pd.DataFrame(landmark_np, columns=LANDMARK_COLUMNS)
+            landmarks.insert(0, 'frame', np.arange(len(landmarks), dtype=np.float32))
+            return landmarks, records[0][1]
+
         # Read the TFRecord file
-        self.tfrecord_processor.set_tfrecord_path(tfrecord_file)
         dataset = self.tfrecord_processor.get_dataset(tfrecord_file)
 
         phrase_list = []
@@ -534,7 +789,7 @@ class DataVisualizer:
         sample_file = f'{self.csv_dataset_files[file_index]}'
         
         self.logger.debug('Reading : ', sample_file)
-        return self.read_csv(sample_file)
+        return self.read_csv(open_input(sample_file))
     
     def read_parquet_sample_file_with_index(self, file_index=0):
         """
@@ -555,7 +810,7 @@ class DataVisualizer:
         sample_file = f'{self.parquet_dataset_files[file_index]}'
         
         self.logger.debug('Reading : ', sample_file)
-        return self.read_parquet(sample_file)
+        return self.read_parquet(open_input(sample_file))
     
     def read_parquet(self, parquet_file):
         """
@@ -627,7 +882,31 @@ class DataVisualizer:
         return landmarks, phrase
 
 
-    def visualize_data(self, csv_file=None, tfrecord_file=None, parquet_file=None, tf_file_index=-1, csv_file_index=-1, parquet_file_index=-1, animation_name='', write=False, output_format='.gif'):
+    def read_array(self, array_file):
+        """
+        Reads a NumPy (.npy, .npz) or Arrow IPC/Feather file of landmarks and its phrase.
+
+        A .npy file is memory-mapped and an Arrow file is read through a memory map, and the returned
+        DataFrame wraps the landmark array without copying it, so frames are only paged in as they are
+        rendered. See read_array_file for the supported layouts and where the phrase is stored.
+
+        Args:
+            array_file (str): The path to the array file, or an archive member path.
+
+        Returns:
+            tuple: A tuple containing:
+                - pandas.DataFrame: The landmark data, one row per frame.
+                - str: The phrase of the sequence.
+        """
+        if is_member_path(array_file):
+            landmarks, metadata = read_array_member(array_file)
+        else:
+            landmarks, metadata = read_array_file(array_file)
+        seq_df = pd.DataFrame(landmarks.reshape(len(landmarks), -1), columns=LANDMARK_COLUMNS, copy=False)
+        return seq_df, metadata['phrase']
+
+    def visualize_data(self, csv_file=None, tfrecord_file=None, parquet_file=None, tf_file_index=-1, csv_file_index=-1, parquet_file_index=-1, animation_name='', write=False, output_format='.gif', gif_encoder='palette',
+                       array_file=None, npy_file_index=-1, arrow_file_index=-1, record_index=None):
         """
         Generates a visual animation of hand, face, and body poses from a specified CSV or TFRecord file. 
 
@@ -645,6 +924,16 @@ class DataVisualizer:
             animation_name (str, optional): Custom name for the animation file. Defaults to ''.
             write (bool, optional): Whether to save the animation to the filesystem. Defaults to False.
             output_format (str, optional): The output format for the animation file (e.g., '.gif'). Defaults to '.gif'.
+            gif_encoder (str, optional): 'palette' encodes GIFs directly with a shared palette and delta frames,
+                'pillow' saves the matplotlib animation with PillowWriter. Defaults to 'palette'.
+            array_file (str, optional): Path to a .npy, .npz, .arrow or .feather file to visualize. Defaults to None.
+            npy_file_index (int, optional): Index of the NumPy file to read from the dataset path.
+            arrow_file_index (int, optional): Index of the Arrow file to read from the dataset path.
+            record_index (int, optional): Visualize only this record (sequence) of the file, e.g. a
+                `record_index` returned by find_phrase. Defaults to None (the whole file).
+
+        Files are read through the sequence cache (see read_sequence), so repeated calls on the same
+        file only render it again.
 
         Returns:
             matplotlib.animation.Animation: The generated animation showing the hand, face, and body poses.
@@ -678,57 +967,1186 @@ class DataVisualizer:
 
         # Read the specified data file
         if tf_file_index >= 0:
-            seq_df, phrase = self.read_tf_sample_file_with_index(file_index=tf_file_index)
             sample_file = f'{self.tf_dataset_files[tf_file_index]}'
+            seq_df, phrase = self.read_sequence(sample_file, record_index=record_index)
             animation_name = os.path.splitext(os.path.basename(sample_file))[0]
         elif csv_file_index >= 0:
-            seq_df, phrase = self.read_csv_sample_file_with_index(file_index=csv_file_index)
             sample_file = f'{self.csv_dataset_files[csv_file_index]}'
+            seq_df, phrase = self.read_sequence(sample_file, record_index=record_index)
             animation_name = os.path.splitext(os.path.basename(sample_file))[0]
         elif parquet_file_index >=0:
-            seq_df, phrase = self.read_parquet_sample_file_with_index(file_index=parquet_file_index)
             sample_file = f'{self.parquet_dataset_files[parquet_file_index]}'
+            seq_df, phrase = self.read_sequence(sample_file, record_index=record_index)
             animation_name = os.path.splitext(os.path.basename(sample_file))[0]
         elif tfrecord_file is not None:
             if '.tfrecord' in self.input_file and not tfrecord_file:
                 tfrecord_file = self.input_file
-            seq_df, phrase = self.read_tfrecord_as_df(tfrecord_file)
+            seq_df, phrase = self.read_sequence(tfrecord_file, record_index=record_index)
             animation_name = os.path.basename(tfrecord_file).replace('.tfrecord', '')
         elif csv_file is not None:
             if '.csv' in self.input_file and not csv_file:
                 csv_file = self.input_file
-            seq_df, phrase = self.read_csv(csv_file)
+            seq_df, phrase = self.read_sequence(csv_file, record_index=record_index)
             animation_name = os.path.basename(csv_file).replace('.csv', '')
         elif parquet_file is not None:
             if '.parquet' in self.input_file and not parquet_file:
                 parquet_file = self.input_file
-            seq_df, phrase = self.read_parquet(parquet_file)
-            animation_name = os.path.basename(csv_file).replace('.parquet', '')
+            seq_df, phrase = self.read_sequence(parquet_file, record_index=record_index)
+            animation_name = os.path.basename(parquet_file).replace('.parquet', '')
+        elif npy_file_index >= 0 or arrow_file_index >= 0:
+            if npy_file_index >= 0:
+                sample_file = self.npy_dataset_files[npy_file_index]
+            else:
+                sample_file = self.arrow_dataset_files[arrow_file_index]
+            seq_df, phrase = self.read_sequence(sample_file, record_index=record_index)
+            animation_name = self.get_animation_name(sample_file)
+        elif array_file is not None:
+            if self.input_file.endswith(NPY_EXTENSIONS + ARROW_EXTENSIONS) and not array_file:
+                array_file = self.input_file
+            seq_df, phrase = self.read_sequence(array_file, record_index=record_index)
+            animation_name = self.get_animation_name(array_file)
         else:
             raise ValueError("Either file_index or tfrecord or df must be provided")
+        if record_index is not None:
+            animation_name = f'{animation_name}-{record_index}'
+        self.logger.debug("Sequence cache : ", self.cache_info())
 
         animation_name = animation_name + output_format
 
-        # Generate hand pose images
-        hand_images, _ = self.get_hands(seq_df)
-        right_hand_images = np.array(hand_images)[:, 0]
-        left_hand_images = np.array(hand_images)[:, 1]
-
-        # Generate face and body poses
-        face_images, _ = self.get_face(seq_df)
-        pose_images, _ = self.get_pose(seq_df)
-
-        # Combine hand, face, and body images into frames
-        combined_images = self.combine_images(right_hand_images, left_hand_images, face_images, pose_images)
+        # Render hand, face, and body images and combine them into frames, once per run of identical frames
+        combined_images, counts = self.render_unique_frames(seq_df)
+        title = f'Gesture: {phrase} ({animation_name})'
 
         # Create and display the animation
-        animation = self.create_animation(combined_images, title=f'Gesture: {phrase} ({animation_name})')
+        animation = self.create_animation(expand_runs(combined_images, counts), title=title)
 
         # Save animation if write is True
         if write:
             out_file = f'{self.output_dir}/{animation_name}'
-            animation.save(out_file, dpi=80, writer=PillowWriter(fps=3))
+            self.save_animation(combined_images, out_file, title=title, output_format=output_format,
+                                gif_encoder=gif_encoder, animation=animation, counts=counts)
 
             self.logger.info("Finished processing : ", out_file)
 
         return animation
+
+    def view(self, input_file=None, record_index=None, max_frames=64, prefetch=4):
+        """
+        Opens a sequence for on-demand frame rendering, e.g. for scrubbing in a notebook.
+
+        Unlike visualize_data, no frame is rendered up front: `viewer[i]` renders frame i when it is
+        requested, memoizes recent frames and prefetches the next ones in the background, and
+        `viewer.show()` displays an ipywidgets slider. See FrameViewer.
+
+        Args:
+            input_file (str, optional): Path of the input file. Defaults to the visualizer's input file.
+            record_index (int, optional): View only this record (sequence) of the file. Defaults to None.
+            max_frames (int, optional): Maximum number of memoized frames. Defaults to 64.
+            prefetch (int, optional): Number of frames rendered ahead of the viewed frame. Defaults to 4.
+
+        Returns:
+            FrameViewer: The viewer.
+
+        Raises:
+            ValueError: If no input file is given.
+        """
+        input_file = input_file or self.input_file
+        if not input_file:
+            raise ValueError("Please, provide input_file to view!")
+        seq_df, phrase = self.read_sequence(input_file, record_index=record_index)
+        animation_name = self.get_animation_name(input_file)
+        return FrameViewer(self, seq_df, phrase=phrase, title=f'Gesture: {phrase} ({animation_name})',
+                           max_frames=max_frames, prefetch=prefetch)
+
+    def render_frames(self, seq_df, target_size=(1280, 720), canvas_size=(600, 600)):
+        """
+        Renders the combined hand, face, and body pose frames of a sequence.
+
+        Args:
+            seq_df (pandas.DataFrame): Landmark data with one row per frame.
+            target_size (tuple, optional): (width, height) of the frames. Defaults to (1280, 720).
+            canvas_size (tuple, optional): (width, height) the parts are drawn at before being scaled to
+                target_size. Defaults to (600, 600); small frames such as thumbnails are drawn directly at
+                target_size.
+
+        Returns:
+            list of numpy.ndarray: One combined uint8 frame per row of seq_df.
+        """
+        # Presence of every part in every frame, computed once for the whole sequence
+        landmarks, presence = self.get_presence(seq_df)
+
+        # Generate hand pose images
+        hand_images, _ = self.get_hands(seq_df, landmarks=landmarks, presence=presence, canvas_size=canvas_size)
+        right_hand_images = [images[0] for images in hand_images]
+        left_hand_images = [images[1] for images in hand_images]
+
+        # Generate face and body poses
+        face_images, _ = self.get_face(seq_df, landmarks=landmarks, presence=presence, canvas_size=canvas_size)
+        pose_images, _ = self.get_pose(seq_df, landmarks=landmarks, presence=presence, canvas_size=canvas_size)
+
+        # Combine hand, face, and body images into frames
+        return self.combine_images(right_hand_images, left_hand_images, face_images, pose_images,
+                                   target_size=target_size, part_presence=get_part_presence(presence))
+
+    def render_unique_frames(self, seq_df, target_size=(1280, 720)):
+        """
+        Renders each run of identical consecutive frames of a sequence once.
+
+        Recordings often hold long static stretches (idle poses, or empty frames before the signer
+        starts). Runs of frames whose landmarks differ by at most `frame_tolerance` are found in one
+        vectorized pass (see find_frame_runs), and only their first frame is rendered.
+
+        Args:
+            seq_df (pandas.DataFrame): Landmark data with one row per frame.
+            target_size (tuple, optional): (width, height) of the frames. Defaults to (1280, 720).
+
+        Returns:
+            tuple: A tuple containing:
+                - list of numpy.ndarray: One combined frame per run.
+                - list of int: Number of frames of every run, to be passed to save_animation.
+        """
+        if self.frame_tolerance is None or len(seq_df) < 2:
+            images = self.render_frames(seq_df, target_size=target_size)
+            return images, [1] * len(images)
+        starts, counts = find_frame_runs(to_landmark_array(seq_df), tolerance=self.frame_tolerance)
+        if len(starts) < len(seq_df):
+            seq_df = seq_df.iloc[starts].reset_index(drop=True)
+        return self.render_frames(seq_df, target_size=target_size), counts.tolist()
+
+    def save_animation(self, images, out_file, title='', output_format='.gif', gif_encoder='palette', animation=None,
+                       counts=None):
+        """
+        Writes rendered frames to an animation file.
+
+        Frames are written to a temporary file that is renamed to out_file once complete, so an
+        interrupted write never leaves a partial file under the final name.
+
+        With the 'palette' encoder, GIF and WebP files are encoded directly, and each image is stored
+        once with a duration of `count` frames. Other formats are saved through matplotlib at a
+        constant frame rate, so images are repeated by their counts.
+
+        Args:
+            images (list of numpy.ndarray): Combined frames.
+            out_file (str): Path of the file to write.
+            title (str, optional): Title shown on each frame. Defaults to ''.
+            output_format (str, optional): Output format, e.g. '.gif'. Defaults to '.gif'.
+            gif_encoder (str, optional): 'palette' or 'pillow'. Defaults to 'palette'.
+            animation (FuncAnimation, optional): Animation of the frames, created if needed and not given.
+            counts (list of int, optional): Number of frames each image stands for, as returned by
+                render_unique_frames. Defaults to one each.
+
+        Returns:
+            str: The path of the written file.
+        """
+        temp_file = get_temp_path(out_file)
+        start = time.perf_counter()
+        try:
+            if output_format == '.gif' and gif_encoder == 'palette':
+                self.write_gif(images, temp_file, title=title, fps=3, counts=counts)
+            elif output_format == '.webp' and gif_encoder == 'palette':
+                self.write_webp(images, temp_file, title=title, fps=3, counts=counts)
+            else:
+                if animation is None:
+                    animation = self.create_animation(expand_runs(images, counts) if counts else images, title=title)
+                animation.save(temp_file, dpi=80, writer=PillowWriter(fps=3))
+            os.replace(temp_file, out_file)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+        metrics.observe('encode', time.perf_counter() - start)
+        return out_file
+
+    def get_animation_name(self, input_file):
+        """
+        Derives the animation name of an input file from its path and data format extension.
+
+        The name is the path relative to the input directory with its extension (see get_output_stem),
+        e.g. 'participant_1_session_2_0_parquet' for participant_1/session_2/0.parquet, so neither nested
+        files of the same name nor a.csv and a.parquet overwrite each other's animations. Archive members
+        are prefixed with the archive name and their directory in the archive, e.g.
+        'shard-000_tar_0001_parquet' for shard-000.tar::0001.parquet.
+
+        Args:
+            input_file (str): Path of the input file or archive member.
+
+        Returns:
+            str: The animation name.
+        """
+        archive, member_name = split_member_path(input_file)
+        if member_name is not None:
+            parts = member_name.strip('/').split('/')
+            return '_'.join([self.get_animation_name(archive)] + parts[:-1] + [get_output_stem(parts[-1])])
+        return get_output_stem(input_file, self.input_dir or None)
+
+    def get_output_file(self, input_file, output_format='.gif'):
+        """
+        Returns the path of the animation of an input file in the output directory, see get_animation_name.
+
+        Args:
+            input_file (str): Path of the input file or archive member.
+            output_format (str, optional): Output format, e.g. '.gif'. Defaults to '.gif'.
+
+        Returns:
+            str: The path of the animation.
+        """
+        return os.path.join(self.output_dir, self.get_animation_name(input_file) + output_format)
+
+    def get_dataset_files(self):
+        """
+        Returns every discovered input file, whatever its format.
+
+        Returns:
+            list of str: CSV, Parquet, TFRecord, NumPy and Arrow files, in that order.
+        """
+        return (list(getattr(self, 'csv_dataset_files', []))
+                + list(getattr(self, 'parquet_dataset_files', []))
+                + list(getattr(self, 'tf_dataset_files', []))
+                + list(getattr(self, 'npy_dataset_files', []))
+                + list(getattr(self, 'arrow_dataset_files', [])))
+
+    def probe(self, files=None, max_workers=8, use_cache=True):
+        """
+        Lists the format, sequences, frame count and phrases of input files without decoding landmarks.
+
+        Results are cached in `probe_cache.json` in the output directory (see FileProbe), so repeated
+        probes of an unchanged dataset are nearly free.
+
+        Args:
+            files (list of str, optional): Input files. Defaults to every discovered input file.
+            max_workers (int, optional): Number of threads probing files concurrently. Defaults to 8.
+            use_cache (bool, optional): Read and update the cache. Defaults to True.
+
+        Returns:
+            list of dict: One entry per file (see FileProbe.probe_file), with its `file_index` in the list
+                of discovered files of its format, as used by csv_file_index, tf_file_index,
+                parquet_file_index, npy_file_index and arrow_file_index (-1 for other files).
+        """
+        if self.file_probe is None or (self.file_probe.cache_file is not None) != use_cache:
+            cache_file = os.path.join(self.output_dir, 'probe_cache.json') if use_cache else None
+            self.file_probe = FileProbe(cache_file=cache_file, encoding=self.config['encoding'] or 'ISO-8859-1',
+                                        max_workers=max_workers, logger=self.logger)
+        self.file_probe.max_workers = max_workers
+
+        files = self.get_dataset_files() if files is None else list(files)
+        format_files = {
+            'csv': list(getattr(self, 'csv_dataset_files', [])),
+            'parquet': list(getattr(self, 'parquet_dataset_files', [])),
+            'tfrecord': list(getattr(self, 'tf_dataset_files', [])),
+            'npy': list(getattr(self, 'npy_dataset_files', [])),
+            'arrow': list(getattr(self, 'arrow_dataset_files', [])),
+        }
+        positions = {fmt: {f: idx for idx, f in enumerate(paths)} for fmt, paths in format_files.items()}
+
+        entries = []
+        for entry in self.file_probe.probe(files):
+            file_index = positions.get(entry['format'], {}).get(entry['file_path'], -1)
+            entries.append(dict(entry, file_index=file_index))
+        return entries
+
+    def find_phrase(self, phrase, exact=False, files=None):
+        """
+        Finds the files and records of a phrase, using the probe cache.
+
+        Args:
+            phrase (str): The phrase to search, case-insensitive.
+            exact (bool, optional): Match whole phrases instead of substrings. Defaults to False.
+            files (list of str, optional): Files to search. Defaults to every discovered input file.
+
+        Returns:
+            list of dict: The matching records, see FileProbe.search.
+        """
+        files = self.get_dataset_files() if files is None else list(files)
+        self.probe(files)
+        return self.file_probe.search(phrase, files=files, exact=exact)
+
+    def read_sequence(self, input_file, record_index=None, use_cache=True):
+        """
+        Reads the landmarks and phrase of an input file, or of one of its records, dispatching on its format.
+
+        Decoded sequences are kept in a per-visualizer LRU cache bounded by `cache_mb`, keyed by path,
+        modification time and record index, so re-rendering a file in the same session does not read it
+        again, while a rewritten file is read afresh. The cached DataFrame is shared by every hit and must
+        not be modified in place. See cache_info for the hit and miss counts.
+
+        Args:
+            input_file (str): Path of a CSV, Parquet, TFRecord, NumPy or Arrow file.
+            record_index (int, optional): Read only this record (sequence) of the file, as numbered by
+                probe and find_phrase. Defaults to None (the whole file).
+            use_cache (bool, optional): Look up and fill the sequence cache. Defaults to True.
+
+        Returns:
+            tuple: A tuple containing:
+                - pandas.DataFrame: The landmark data.
+                - str: The phrase of the sequence.
+
+        Raises:
+            ValueError: If the file format is not supported.
+        """
+        def load_fn():
+            start = time.perf_counter()
+            if record_index is not None:
+                result = self.read_record(input_file, record_index)
+            else:
+                result = self.read_file(input_file)
+            metrics.observe('read', time.perf_counter() - start)
+            return result
+
+        if not use_cache or not self.sequence_cache.max_bytes:
+            return load_fn()
+        return self.sequence_cache.get_or_load(input_file, load_fn, record_index=record_index)
+
+    def read_file(self, input_file):
+        """
+        Reads the landmarks and phrase of an input file, dispatching on its format, without caching.
+
+        Args:
+            input_file (str): Path of a CSV, Parquet, TFRecord, NumPy or Arrow file, or of an archive member.
+
+        Returns:
+            tuple: (seq_df, phrase), see read_sequence.
+
+        Raises:
+            ValueError: If the file format is not supported.
+        """
+        if is_member_path(input_file):
+            return self.read_member(input_file)
+        if '.tfrecord' in input_file:
+            return self.read_tfrecord_as_df(input_file)
+        elif input_file.endswith('.csv'):
+            return self.read_csv(input_file)
+        elif input_file.endswith('.parquet'):
+            return self.read_parquet(input_file)
+        elif input_file.endswith(NPY_EXTENSIONS + ARROW_EXTENSIONS):
+            return self.read_array(input_file)
+        raise ValueError(f"Unsupported input file format : {input_file}")
+
+    def read_record(self, input_file, record_index):
+        """
+        Reads one record (sequence) of an input file, without caching.
+
+        A TFRecord record is read by seeking to it through the file's index sidecar. The records of a
+        CSV or Parquet file are its `sequence_id` groups, in order of first appearance. NumPy and Arrow
+        files hold a single record. Archive members are decoded in memory.
+
+        Args:
+            input_file (str): Path of a CSV, Parquet, TFRecord, NumPy or Arrow file, or of an archive member.
+            record_index (int): Index of the record in the file.
+
+        Returns:
+            tuple: (seq_df, phrase), see read_sequence.
+
+        Raises:
+            ValueError: If the file has no such record or its format is not supported.
+        """
+        if '.tfrecord' in input_file and is_member_path(input_file):
+            return self.read_tfrecord_member(input_file, record_index=record_index)
+        if '.tfrecord' in input_file:
+            landmarks, phrase, _ = decode_example(read_tfrecord_record(input_file, record_index))
+            seq_df = pd.DataFrame(landmarks.reshape(len(landmarks), -1), columns=LANDMARK_COLUMNS)
+            return seq_df, phrase
+
+        if input_file.endswith('.csv') or input_file.endswith('.parquet'):
+            source = open_input(input_file)
+            if input_file.endswith('.parquet'):
+                columns = self.csv.get_parquet_columns(source)
+                columns = [col for col in ['sequence_id', 'phrase'] + LANDMARK_COLUMNS if col in columns]
+                seq_df = self.csv.read_parquet_file(source, columns=columns)
+            else:
+                seq_df = self.csv.read_csv_file(source)
+            sequence_ids = pd.unique(seq_df['sequence_id']) if 'sequence_id' in seq_df.columns else [None]
+            if not 0 <= record_index < len(sequence_ids):
+                raise ValueError(f"Record {record_index} not found, {input_file} has {len(sequence_ids)} records")
+            if sequence_ids[record_index] is not None:
+                seq_df = seq_df[seq_df['sequence_id'] == sequence_ids[record_index]]
+            phrase = str(seq_df['phrase'].iloc[0]) if 'phrase' in seq_df.columns else ''
+            return seq_df[LANDMARK_COLUMNS].astype(np.float32), phrase
+
+        if record_index != 0:
+            raise ValueError(f"Record {record_index} not found, {input_file} has 1 record")
+        return self.read_file(input_file)
+
+    def read_member(self, member_path):
+        """
+        Reads the landmarks and phrase of an archive member, decoded in memory, without caching.
+
+        The member is read from its archive without extracting it (see ArchiveReader) and parsed by the
+        reader of its format: CSV and Parquet members through pandas and pyarrow, TFRecord members
+        without TensorFlow, NumPy and Arrow members with their phrase from the file or a sibling
+        `<member>.json`.
+
+        Args:
+            member_path (str): Member path, e.g. 'shards/shard-000.tar::0001.parquet'.
+
+        Returns:
+            tuple: (seq_df, phrase), see read_sequence.
+
+        Raises:
+            ValueError: If the archive has no such member or its format is not supported.
+        """
+        if '.tfrecord' in member_path:
+            return self.read_tfrecord_member(member_path)
+        elif member_path.endswith('.csv'):
+            return self.read_csv(open_input(member_path))
+        elif member_path.endswith('.parquet'):
+            return self.read_parquet(open_input(member_path))
+        elif member_path.endswith(NPY_EXTENSIONS + ARROW_EXTENSIONS):
+            return self.read_array(member_path)
+        raise ValueError(f"Unsupported input file format : {member_path}")
+
+    def read_tfrecord_member(self, member_path, record_index=None):
+        """
+        Decodes the records of a TFRecord archive member, of either layout, without TensorFlow.
+
+        Args:
+            member_path (str): Member path of a .tfrecord, .tfrecord.gz or .tfrecord.zlib member.
+            record_index (int, optional): Read only this record. Defaults to None (every record, concatenated).
+
+        Returns:
+            tuple: (seq_df, phrase) with the phrase of the first record read.
+
+        Raises:
+            ValueError: If the member has no such record, or no record at all.
+        """
+        records = [decode_example(record) for record in iter_member_records(member_path)]
+        if record_index is not None:
+            if not 0 <= record_index < len(records):
+                raise ValueError(f"Record {record_index} not found, {member_path} has {len(records)} records")
+            records = records[record_index:record_index + 1]
+        if not records:
+            raise ValueError(f"No records in {member_path}")
+        landmark_np = np.concatenate([landmarks.reshape(len(landmarks), -1) for landmarks, _, _ in records])
+        return pd.DataFrame(landmark_np, columns=LANDMARK_COLUMNS), records[0][1]
+
+    def cache_info(self):
+        """
+        Returns the statistics of the sequence cache.
+
+        Returns:
+            dict: `hits`, `misses`, `hit_rate`, `evictions`, `entries`, `nbytes` and `max_bytes`.
+        """
+        return self.sequence_cache.stats()
+
+    def clear_cache(self):
+        """Empties the sequence cache."""
+        self.sequence_cache.clear()
+
+    def render_file(self, input_file, output_format='.gif', gif_encoder='palette'):
+        """
+        Reads an input file and writes its animation to the output directory.
+
+        Unlike visualize_data, no FuncAnimation is returned, which keeps the result picklable for batch workers.
+
+        Args:
+            input_file (str): Path of the input file.
+            output_format (str, optional): Output format, e.g. '.gif'. Defaults to '.gif'.
+            gif_encoder (str, optional): 'palette' or 'pillow'. Defaults to 'palette'.
+
+        Returns:
+            str: The path of the written animation.
+        """
+        return self.render_sequence((input_file, self.read_sequence(input_file)),
+                                    output_format=output_format, gif_encoder=gif_encoder)
+
+    def render_sequence(self, task, output_format='.gif', gif_encoder='palette'):
+        """
+        Writes the animation of an already read input file to the output directory.
+
+        A task may also hold one frame range (chunk) of a long sequence, as `(input_file, (seq_df, phrase),
+        (chunk_index, num_chunks))`. Its unique frames (one per run of identical frames, see
+        render_unique_frames) are then saved to a `.npy` file in the chunk directory, named after the task
+        id of the input file, to be assembled into the animation by assemble_chunks. When the chunk tuple
+        also holds a SharedArrayRef large enough, the frames are written into that shared buffer instead.
+
+        seq_df may be a SharedArrayRef of the (frames, 1629) landmark values, handed over by
+        visualize_batch through shared memory; it is viewed in place, without a copy.
+
+        Args:
+            task (tuple): (input_file, (seq_df, phrase)), as produced by a PrefetchReader over read_sequence,
+                optionally followed by (chunk_index, num_chunks) or (chunk_index, num_chunks, frames_ref).
+            output_format (str, optional): Output format, e.g. '.gif'. Defaults to '.gif'.
+            gif_encoder (str, optional): 'palette' or 'pillow'. Defaults to 'palette'.
+
+        Returns:
+            str or tuple: The path of the written animation, or for a chunk (frames, counts): the path of
+                its frames file or the shared buffer holding them, and the number of frames of each.
+        """
+        input_file, (seq_df, phrase) = task[:2]
+        out_file = self.get_output_file(input_file, output_format)
+
+        if isinstance(seq_df, SharedArrayRef):
+            values = seq_df.open()
+            seq_df = pd.DataFrame(values.reshape(len(values), -1), columns=LANDMARK_COLUMNS, copy=False)
+
+        start = time.perf_counter()
+        combined_images, counts = self.render_unique_frames(seq_df)
+        metrics.observe('render', time.perf_counter() - start)
+        # 'frames' counts the source frames, whatever their runs; 'rendered_frames' the runs actually drawn
+        metrics.increment('frames', int(sum(counts)))
+        metrics.increment('rendered_frames', len(combined_images))
+        if len(task) > 2:
+            # Only the unique frames are kept; assemble_chunks encodes them with their counts
+            frames_ref = task[2][2] if len(task[2]) > 2 else None
+            if frames_ref is not None and frames_ref.shape[0] >= len(combined_images) \
+                    and frames_ref.shape[1:] == combined_images[0].shape:
+                frames = frames_ref.open()
+                for idx, image in enumerate(combined_images):
+                    frames[idx] = image
+                return frames_ref, counts
+            chunk_file = os.path.join(self.get_chunk_dir(), f'{self.get_task_id(input_file)}-{task[2][0]:04d}.npy')
+            np.save(chunk_file, np.stack(combined_images))
+            return chunk_file, counts
+        self.save_animation(combined_images, out_file, title=f'Gesture: {phrase} ({animation_name})',
+                            output_format=output_format, gif_encoder=gif_encoder, counts=counts)
+        return out_file
+
+    def get_task_id(self, input_file):
+        """
+        Returns an id unique to an input file, for naming its intermediate files.
+
+        Unlike the animation name, which is relative to the input directory, it also tells apart files of
+        the same name outside of it.
+
+        Args:
+            input_file (str): Path of the input file or archive member.
+
+        Returns:
+            str: The animation name followed by a hash of the absolute path, e.g. '0001_csv-3f2a9c0b1d4e'.
+        """
+        digest = hashlib.sha1(os.path.abspath(input_file).encode('utf-8')).hexdigest()[:12]
+        return f'{self.get_animation_name(input_file)}-{digest}'
+
+    def get_chunk_dir(self):
+        """Returns the directory holding the rendered frames of sequence chunks, creating it if needed."""
+        chunk_dir = os.path.join(self.output_dir, '.chunks')
+        os.makedirs(chunk_dir, exist_ok=True)
+        return chunk_dir
+
+    def split_chunks(self, task, chunk_frames):
+        """
+        Splits a read input file into frame-range chunks that can be rendered in parallel.
+
+        Args:
+            task (tuple): (input_file, (seq_df, phrase)).
+            chunk_frames (int): Maximum number of frames per chunk; 0 disables splitting.
+
+        Returns:
+            list of tuple: The task itself when short enough, otherwise one
+                (input_file, (chunk_df, phrase), (chunk_index, num_chunks)) task per chunk.
+        """
+        input_file, (seq_df, phrase) = task
+        if not chunk_frames or len(seq_df) <= chunk_frames:
+            return [task]
+        num_chunks = -(-len(seq_df) // chunk_frames)
+        return [(input_file, (seq_df.iloc[i * chunk_frames:(i + 1) * chunk_frames], phrase), (i, num_chunks))
+                for i in range(num_chunks)]
+
+    def assemble_chunks(self, input_file, phrase, chunk_files, output_format='.gif', gif_encoder='palette',
+                        buffers=None):
+        """
+        Writes the animation of a sequence rendered in chunks, and deletes the chunk files.
+
+        Args:
+            input_file (str): Path of the input file.
+            phrase (str): The phrase of the sequence.
+            chunk_files (list): (frames, counts) of the chunks in frame order, as returned by render_sequence:
+                the frames file or SharedArrayRef of the unique frames, and the frame count of each.
+            output_format (str, optional): Output format, e.g. '.gif'. Defaults to '.gif'.
+            gif_encoder (str, optional): 'palette' or 'pillow'. Defaults to 'palette'.
+            buffers (SharedBufferPool, optional): The pool the shared frames were allocated from. They are
+                left for the caller to release.
+
+        Returns:
+            str: The path of the written animation.
+        """
+        out_file = self.get_output_file(input_file, output_format)
+        try:
+            images, counts = [], []
+            for frames, chunk_counts in chunk_files:
+                frames = buffers.view(frames) if isinstance(frames, SharedArrayRef) else np.load(frames, mmap_mode='r')
+                images.extend(frames[:len(chunk_counts)])
+                counts.extend(chunk_counts)
+            self.save_animation(images, out_file, title=f'Gesture: {phrase} ({animation_name})',
+                                output_format=output_format, gif_encoder=gif_encoder, counts=counts)
+        finally:
+            for frames, _ in chunk_files:
+                if isinstance(frames, str) and os.path.exists(frames):
+                    os.remove(frames)
+        return out_file
+
+    def visualize_batch(self, files=None, max_workers=None, output_format='.gif', gif_encoder='palette',
+                        prefetch_depth=2, prefetch_memory_mb=None, force=False, use_hash=False,
+                        num_shards=1, shard_index=0, balance_by_size=False, longest_first=True, chunk_frames=0,
+                        shared_memory_mb=512, metrics_interval=0, metrics_json=False):
+        """
+        Renders and writes the animations of many input files.
+
+        Input files are read ahead on background threads (see PrefetchReader) so that reading the next
+        files overlaps rendering the current ones; rendering runs on a pool of worker processes.
+
+        To keep every worker busy until the end of the run, files are scheduled by decreasing estimated
+        cost (see schedule_longest_first), and sequences longer than `chunk_frames` are split into frame
+        ranges rendered in parallel, then assembled and encoded on a thread of this process while the
+        workers keep rendering. The batch report includes the scheduler efficiency, busy time (rendering
+        and assembly) / (wall time x workers).
+
+        With worker processes, the landmark values of each task and the rendered frames of each chunk go
+        through shared memory (see SharedBufferPool) rather than being pickled; only small descriptors are
+        sent to the workers. This process owns every segment, releases it once the result is back, and
+        unlinks them all when the batch ends, even if workers crash. Tasks that do not fit the pool fall
+        back to pickling.
+
+        With `metrics_interval`, throughput and resource metrics (files and frames per second, queue depth,
+        read/render/encode latency histograms, worker RSS, failures) are collected from every worker and
+        written every interval to `metrics.prom` in the Prometheus text format, optionally to `metrics.json`,
+        with a progress and ETA line on stderr (see BatchMetrics).
+
+        Every outcome is recorded in `manifest.jsonl` in the output directory (see RunManifest). A rerun
+        skips inputs whose outputs are up to date and processes only new, changed or failed ones.
+
+        For scale-out over several nodes, each node runs the same batch with its own shard_index; the
+        inputs are split deterministically (see shard_files), each shard keeps its own manifest and
+        `batch_report` file, and merge_shard_outputs combines them afterwards.
+
+        Archive members are read in archive order, each archive taking the scheduling slot of its first
+        member, and every archive is assigned to a single shard, so a batch reads each archive once,
+        sequentially (see group_by_archive).
+
+        Args:
+            files (list of str, optional): Input files. Defaults to every discovered input file.
+            max_workers (int, optional): Number of worker processes. Defaults to the CPU count.
+                With 1, rendering runs in this process.
+            output_format (str, optional): Output format, e.g. '.gif'. Defaults to '.gif'.
+            gif_encoder (str, optional): 'palette' or 'pillow'. Defaults to 'palette'.
+            prefetch_depth (int, optional): Number of files read ahead. Defaults to 2.
+            prefetch_memory_mb (float, optional): Memory budget of the sequences read ahead or rendering in the
+                pool, counted until their results return. Defaults to None (no limit).
+            force (bool, optional): Process every input, even if up to date. Defaults to False.
+            use_hash (bool, optional): Detect changed inputs by content hash instead of size and mtime.
+                Defaults to False.
+            num_shards (int, optional): Number of shards the inputs are split into. Defaults to 1.
+            shard_index (int, optional): Index of the shard processed by this call. Defaults to 0.
+            balance_by_size (bool, optional): Balance shards by input file size. Defaults to False.
+            longest_first (bool, optional): Schedule the files with the most estimated frames first. Defaults to True.
+            chunk_frames (int, optional): Split sequences longer than this into chunks rendered in parallel.
+                Defaults to 0 (no splitting).
+            shared_memory_mb (float, optional): Size limit of the shared memory buffers. Defaults to 512;
+                0 disables shared memory.
+            metrics_interval (float, optional): Seconds between metrics exports. Defaults to 0 (no metrics).
+            metrics_json (bool, optional): Also write a JSON snapshot of the metrics. Defaults to False.
+
+        Returns:
+            dict: Maps each processed input file to its output file, or None if it failed.
+        """
+        start_time = time.perf_counter()
+        files = self.get_dataset_files() if files is None else list(files)
+        files = shard_files(files, num_shards, shard_index, balance_by_size=balance_by_size,
+                            root=self.input_dir or os.path.dirname(self.input_file))
+
+        suffix = get_shard_suffix(num_shards, shard_index)
+        manifest = RunManifest(self.output_dir, use_hash=use_hash, name=f'manifest{suffix}.jsonl')
+        settings = {'output_format': output_format, 'gif_encoder': gif_encoder}
+        num_inputs = len(files)
+        if not force:
+            files = [f for f in files
+                     if not manifest.is_up_to_date(f, settings, output_file=self.get_output_file(f, output_format))]
+            if len(files) < num_inputs:
+                self.logger.info(f"Skipping {num_inputs - len(files)} up-to-date inputs")
+
+        batch_metrics = None
+        if metrics_interval:
+            batch_metrics = BatchMetrics(self.output_dir, name=f'metrics{suffix}', interval=metrics_interval,
+                                         write_json=metrics_json, logger=self.logger)
+            batch_metrics.set_total(num_inputs)
+            batch_metrics.increment('skipped', num_inputs - len(files))
+            batch_metrics.start(multiprocessing.get_context('spawn'))
+        batch = BatchProcessor(self, max_workers=max_workers,
+                               metrics_queue=batch_metrics.queue if batch_metrics is not None else None)
+
+        if longest_first:
+            files, _ = schedule_longest_first(files)
+        # Read the members of each archive together and in archive order, so every archive is read once
+        files = group_by_archive(files)
+
+        results = {}
+        # Rendered chunk files of the sequences split into chunks, by input file
+        chunks = {}
+        # Fingerprints of the inputs taken before reading them, by input file, for their manifest entries
+        fingerprints = {}
+
+        def read(input_file):
+            try:
+                fingerprints[input_file] = manifest.get_fingerprint(input_file)
+            except (OSError, ValueError):
+                pass
+            # Batch inputs are rendered once, so they bypass the sequence cache
+            return self.read_sequence(input_file, use_cache=False)
+
+        # Inputs handed to the pool stay counted against the memory budget until their results return
+        reader = PrefetchReader(read, files, depth=prefetch_depth, memory_budget_mb=prefetch_memory_mb,
+                                hold_results=True, logger=self.logger)
+        buffers = None
+        if batch.max_workers > 1 and shared_memory_mb:
+            buffers = SharedBufferPool(max_buffers=4 * batch.max_workers, max_bytes=int(shared_memory_mb * 1024 * 1024),
+                                       logger=self.logger)
+
+        def share(task):
+            # Replaces the landmarks (and the frames of a chunk) by shared buffers when they fit the pool
+            input_file, (seq_df, phrase) = task[:2]
+            ref = buffers.put(seq_df[LANDMARK_COLUMNS].to_numpy(dtype=np.float32))
+            if ref is None:
+                return task
+            if len(task) > 2:
+                frames_ref = buffers.allocate((len(seq_df), 720, 1280, 3), np.uint8)
+                return input_file, (ref, phrase), task[2] + (frames_ref,)
+            return input_file, (ref, phrase)
+
+        num_read = 0
+
+        def read_tasks():
+            nonlocal num_read
+            for input_file, data, error in reader:
+                num_read += 1
+                if error is None:
+                    for task in self.split_chunks((input_file, data), chunk_frames):
+                        yield share(task) if buffers is not None else task
+                else:
+                    manifest.record(input_file, settings, status='failed', error=str(error),
+                                    fingerprint=fingerprints.pop(input_file, None))
+                    results[input_file] = None
+                    if batch_metrics is not None:
+                        batch_metrics.increment('failed')
+
+        def update_queue_depth():
+            # Files read and waiting for, or in, the pool
+            if batch_metrics is not None:
+                batch_metrics.set_queue_depth(num_read - len(results))
+
+        def finish(input_file, out_file, error):
+            fingerprint = fingerprints.pop(input_file, None)
+            if error is not None:
+                self.logger.error(f"Failed processing : {input_file} : {error}")
+                manifest.record(input_file, settings, status='failed', error=str(error), fingerprint=fingerprint)
+                out_file = None
+            else:
+                self.logger.info("Finished processing : ", out_file)
+                manifest.record(input_file, settings, output_file=out_file, fingerprint=fingerprint)
+            results[input_file] = out_file
+            if batch_metrics is not None:
+                batch_metrics.increment('failed' if out_file is None else 'processed')
+                update_queue_depth()
+
+        def assemble(input_file, phrase, chunk_files):
+            start = time.perf_counter()
+            out_file = self.assemble_chunks(input_file, phrase, chunk_files, output_format=output_format,
+                                            gif_encoder=gif_encoder, buffers=buffers)
+            return out_file, time.perf_counter() - start
+
+        # Assembled sequences by future; with worker processes the assembly runs on a thread of this process
+        # while the pool keeps being fed, otherwise inline
+        assemblies = {}
+        assembler = ThreadPoolExecutor(max_workers=1, thread_name_prefix='assemble') if batch.max_workers > 1 else None
+
+        def release_chunks(chunk_files):
+            for frames, _ in chunk_files:
+                if isinstance(frames, SharedArrayRef):
+                    buffers.release(frames)
+
+        def collect_assemblies(block=False):
+            done = wait(assemblies).done if block else [future for future in assemblies if future.done()]
+            for future in done:
+                input_file, chunk_files = assemblies.pop(future)
+                try:
+                    out_file, seconds = future.result()
+                    batch._add_busy(seconds)
+                    error = None
+                except Exception as e:
+                    out_file, error = None, e
+                release_chunks(chunk_files)
+                finish(input_file, out_file, error)
+
+        try:
+            for task, out_file, error in batch.imap('render_sequence', read_tasks(), can_submit=reader.within_budget,
+                                                     output_format=output_format, gif_encoder=gif_encoder):
+                input_file = task[0]
+                update_queue_depth()
+                if isinstance(task[1][0], SharedArrayRef):
+                    buffers.release(task[1][0])
+                collect_assemblies()
+                if len(task) <= 2:
+                    reader.release(input_file)
+                    finish(input_file, out_file, error)
+                    continue
+
+                # One chunk of a split sequence; the animation is written once all chunks are rendered
+                if buffers is not None and len(task[2]) > 2 and (error is not None
+                                                                 or not isinstance(out_file[0], SharedArrayRef)):
+                    buffers.release(task[2][2])
+                chunk_files = chunks.setdefault(input_file, [None] * task[2][1])
+                chunk_files[task[2][0]] = out_file if error is None else error
+                if any(chunk_file is None for chunk_file in chunk_files):
+                    continue
+                del chunks[input_file]
+                reader.release(input_file)
+                failed = [chunk_file for chunk_file in chunk_files if isinstance(chunk_file, Exception)]
+                if failed:
+                    for chunk_file in chunk_files:
+                        if isinstance(chunk_file, Exception):
+                            continue
+                        if isinstance(chunk_file[0], SharedArrayRef):
+                            buffers.release(chunk_file[0])
+                        elif os.path.exists(chunk_file[0]):
+                            os.remove(chunk_file[0])
+                    finish(input_file, None, failed[0])
+                elif assembler is not None:
+                    assemblies[assembler.submit(assemble, input_file, task[1][1], chunk_files)] = (input_file, chunk_files)
+                else:
+                    try:
+                        out_file, seconds = assemble(input_file, task[1][1], chunk_files)
+                        batch._add_busy(seconds)
+                        error = None
+                    except Exception as e:
+                        out_file, error = None, e
+                    release_chunks(chunk_files)
+                    finish(input_file, out_file, error)
+            collect_assemblies(block=True)
+        finally:
+            if assembler is not None:
+                assembler.shutdown(wait=True)
+            if buffers is not None:
+                buffers.close()
+            if batch_metrics is not None:
+                batch_metrics.stop()
+
+        report = {
+            'num_shards': num_shards,
+            'shard_index': shard_index,
+            'max_workers': batch.max_workers,
+            'inputs': num_inputs,
+            'skipped': num_inputs - len(files),
+            'processed': sum(out_file is not None for out_file in results.values()),
+            'failed': sum(out_file is None for out_file in results.values()),
+            'wall_seconds': time.perf_counter() - start_time,
+            'busy_seconds': batch.busy_seconds,
+        }
+        report['efficiency'] = report['busy_seconds'] / max(report['wall_seconds'] * max(batch.max_workers, 1), 1e-9)
+        self.logger.info(f"Scheduler efficiency : {report['efficiency']:.1%} "
+                         f"({report['busy_seconds']:.1f} s busy / {report['wall_seconds']:.1f} s x {max(batch.max_workers, 1)} workers)")
+        with open(os.path.join(self.output_dir, f'batch_report{suffix}.json'), 'w') as file:
+            json.dump(report, file, indent=2)
+
+        return results
+
+    def watch(self, max_workers=None, max_pending=None, settle_seconds=2.0, poll_interval=1.0, use_inotify=True,
+              output_format='.gif', gif_encoder='palette', force=False, use_hash=False, stop_event=None,
+              metrics_interval=0, metrics_json=False):
+        """
+        Keeps rendering the input files that are added to or changed in the input directory.
+
+        Files are detected by a DirectoryWatcher (inotify, or polling as a fallback) once their writes
+        have settled, and rendered on a pool of worker processes that stays warm for the whole session.
+        At most `max_pending` files are in the pool at once; files that settle meanwhile wait in a
+        coalescing queue, where repeated changes to the same file collapse into a single render. A file
+        that changes while it is being rendered is rendered again afterwards. Outcomes are recorded in
+        `manifest.jsonl` as in visualize_batch, so up-to-date files are skipped, including on restart.
+
+        Runs until interrupted (Ctrl+C) or until stop_event is set; in-flight renders are then completed.
+        Metrics are exported as in visualize_batch.
+
+        Args:
+            max_workers (int, optional): Number of worker processes. Defaults to the CPU count.
+            max_pending (int, optional): Maximum number of files in the pool. Defaults to 2 * max_workers.
+            settle_seconds (float, optional): Time a file must stay unchanged before it is rendered. Defaults to 2.
+            poll_interval (float, optional): Interval between directory rescans when polling. Defaults to 1.
+            use_inotify (bool, optional): Use inotify when available. Defaults to True.
+            output_format (str, optional): Output format, e.g. '.gif'. Defaults to '.gif'.
+            gif_encoder (str, optional): 'palette' or 'pillow'. Defaults to 'palette'.
+            force (bool, optional): Render existing files even if up to date. Defaults to False.
+            use_hash (bool, optional): Detect changed inputs by content hash instead of size and mtime.
+                Defaults to False.
+            stop_event (threading.Event, optional): Stops watching when set. Defaults to None.
+            metrics_interval (float, optional): Seconds between metrics exports. Defaults to 0 (no metrics).
+            metrics_json (bool, optional): Also write a JSON snapshot of the metrics. Defaults to False.
+
+        Returns:
+            dict: Maps each processed input file to its latest output file, or None if it failed.
+
+        Raises:
+            ValueError: If the visualizer has no input directory.
+        """
+        if not self.input_dir or not os.path.isdir(self.input_dir):
+            raise ValueError("Watch mode needs an input_dir!")
+
+        batch_metrics = None
+        if metrics_interval:
+            batch_metrics = BatchMetrics(self.output_dir, interval=metrics_interval, write_json=metrics_json,
+                                         logger=self.logger)
+            batch_metrics.start(multiprocessing.get_context('spawn'))
+        batch = BatchProcessor(self, max_workers=max_workers,
+                               metrics_queue=batch_metrics.queue if batch_metrics is not None else None)
+        max_pending = max_pending if max_pending else 2 * max(batch.max_workers, 1)
+        manifest = RunManifest(self.output_dir, use_hash=use_hash)
+        settings = {'output_format': output_format, 'gif_encoder': gif_encoder}
+        watcher = DirectoryWatcher(self.input_dir, settle_seconds=settle_seconds, poll_interval=poll_interval,
+                                   use_inotify=use_inotify, logger=self.logger)
+
+        # Settled files waiting for the pool, in arrival order; dict keys coalesce repeated changes
+        queue = collections.OrderedDict()
+        in_flight = {}
+        # Fingerprints of the in-flight inputs taken when submitted, before the worker reads them
+        fingerprints = {}
+        results = {}
+        forced = set(watcher.pending) if force else set()
+        self.logger.info(f"Watching {self.input_dir} ({'inotify' if watcher.inotify else 'polling'})")
+
+        def collect(block):
+            while in_flight:
+                done = [future for future in in_flight if future.done()]
+                if done or not block:
+                    break
+                time.sleep(0.05)
+            for future in [future for future in in_flight if future.done()]:
+                input_file = in_flight.pop(future)
+                fingerprint = fingerprints.pop(input_file, None)
+                try:
+                    out_file = future.result()
+                    self.logger.info("Finished processing : ", out_file)
+                    manifest.record(input_file, settings, output_file=out_file, fingerprint=fingerprint)
+                except Exception as e:
+                    out_file = None
+                    self.logger.error(f"Failed processing : {input_file} : {e}")
+                    manifest.record(input_file, settings, status='failed', error=str(e), fingerprint=fingerprint)
+                results[input_file] = out_file
+                if batch_metrics is not None:
+                    batch_metrics.increment('failed' if out_file is None else 'processed')
+
+        try:
+            while stop_event is None or not stop_event.is_set():
+                for input_file in watcher.poll(timeout=0.1 if in_flight else None):
+                    if input_file in in_flight.values():
+                        # Changed during its render, so it is rendered again even if its manifest entry looks up to date
+                        forced.add(input_file)
+                    queue[input_file] = None
+
+                collect(block=False)
+                busy = set(in_flight.values())
+                for input_file in list(queue):
+                    if len(in_flight) >= max_pending:
+                        break
+                    if input_file in busy:
+                        # Rendered again once the current render is recorded
+                        continue
+                    del queue[input_file]
+                    if input_file not in forced and manifest.is_up_to_date(
+                            input_file, settings, output_file=self.get_output_file(input_file, output_format)):
+                        if batch_metrics is not None:
+                            batch_metrics.increment('skipped')
+                        continue
+                    forced.discard(input_file)
+                    try:
+                        fingerprints[input_file] = manifest.get_fingerprint(input_file)
+                    except (OSError, ValueError):
+                        pass
+                    in_flight[batch.submit('render_file', input_file, output_format=output_format,
+                                           gif_encoder=gif_encoder)] = input_file
+
+                if queue and len(in_flight) >= max_pending:
+                    self.logger.debug(f"Backlog of {len(queue)} files waiting for a worker")
+                if batch_metrics is not None:
+                    batch_metrics.set_queue_depth(len(queue) + len(in_flight))
+        except KeyboardInterrupt:
+            self.logger.info("Stopping watch mode")
+        finally:
+            watcher.close()
+            while in_flight:
+                collect(block=True)
+            batch.close()
+            if batch_metrics is not None:
+                batch_metrics.stop()
+
+        return results
+
+    def iter_tfrecord_sequences(self, tfrecord_path=None, num_parallel_reads=None, deterministic=True):
+        """
+        Iterates every record of the TFRecord shards of a directory as a separate sequence.
+
+        Shards are read concurrently and decoded records are prefetched in the background, so reading
+        overlaps with whatever the caller does with each sequence.
+
+        Args:
+            tfrecord_path (str, optional): Directory of the shards. Defaults to the input directory.
+            num_parallel_reads (int, optional): Number of shards read concurrently. Defaults to tf.data.AUTOTUNE.
+            deterministic (bool, optional): Whether records are produced in a fixed order. Defaults to True.
+
+        Yields:
+            tuple: (seq_df, phrase) for every record.
+        """
+        dataset = self.tfrecord_processor.get_directory_dataset(tfrecord_path or self.input_dir,
+                                                                num_parallel_reads=num_parallel_reads,
+                                                                deterministic=deterministic)
+        for landmarks, phrase in dataset:
+            yield pd.DataFrame(landmarks.numpy(), columns=header), phrase.numpy().decode('utf-8')
+
+    def visualize_records(self, tfrecord_path=None, num_parallel_reads=None, deterministic=True,
+                          output_format='.gif', gif_encoder='palette'):
+        """
+        Renders and writes one animation per record of the TFRecord shards of a directory.
+
+        Animations are named `<phrase>_<record index>`.
+
+        Args:
+            tfrecord_path (str, optional): Directory of the shards. Defaults to the input directory.
+            num_parallel_reads (int, optional): Number of shards read concurrently. Defaults to tf.data.AUTOTUNE.
+            deterministic (bool, optional): Whether records are produced in a fixed order. Defaults to True.
+            output_format (str, optional): Output format, e.g. '.gif'. Defaults to '.gif'.
+            gif_encoder (str, optional): 'palette' or 'pillow'. Defaults to 'palette'.
+
+        Returns:
+            list of str: Paths of the written animations.
+        """
+        out_files = []
+        for idx, (seq_df, phrase) in enumerate(self.iter_tfrecord_sequences(tfrecord_path, num_parallel_reads,
+                                                                           deterministic)):
+            animation_name = f'{phrase}_{idx:06d}{output_format}'
+            out_file = os.path.join(self.output_dir, animation_name)
+            self.save_animation(self.render_frames(seq_df), out_file, title=f'Gesture: {phrase} ({animation_name})',
+                                output_format=output_format, gif_encoder=gif_encoder)
+            self.logger.info("Finished processing : ", out_file)
+            out_files.append(out_file)
+        return out_files
+
+    def tile_images(self, images, columns, cell_size):
+        """
+        Tiles images row by row into a single image.
+
+        Args:
+            images (list of numpy.ndarray): RGB images. Missing cells are left black.
+            columns (int): Number of columns of the grid.
+            cell_size (tuple): (width, height) of each cell.
+
+        Returns:
+            numpy.ndarray: The tiled image.
+        """
+        rows = max(1, -(-len(images) // columns))
+        width, height = cell_size
+        sheet = np.zeros((rows * height, columns * width, 3), dtype=np.uint8)
+        for idx, image in enumerate(images):
+            row, col = divmod(idx, columns)
+            if image.shape[:2] != (height, width):
+                image = self.resize_image(image, (width, height))
+            sheet[row * height:(row + 1) * height, col * width:(col + 1) * width] = image
+        return sheet
+
+    def render_thumbnails(self, input_file, frame='middle', num_keyframes=4, thumbnail_size=(320, 180)):
+        """
+        Renders a few representative frames of an input file at thumbnail resolution.
+
+        Only the selected frames are rendered, directly at the thumbnail size.
+
+        Args:
+            input_file (str): Path of the input file.
+            frame (str, optional): 'middle' for the middle frame, or 'keyframes' for frames evenly spread
+                over the sequence. Defaults to 'middle'.
+            num_keyframes (int, optional): Number of frames selected in 'keyframes' mode. Defaults to 4.
+            thumbnail_size (tuple, optional): (width, height) of the thumbnails. Defaults to (320, 180).
+
+        Returns:
+            tuple: A tuple containing:
+                - list of numpy.ndarray: The thumbnails, each labeled with the animation name.
+                - str: The phrase of the sequence.
+
+        Raises:
+            ValueError: If frame is not 'middle' or 'keyframes'.
+        """
+        seq_df, phrase = self.read_sequence(input_file)
+        num_frames = len(seq_df)
+
+        if frame == 'middle':
+            indices = [num_frames // 2]
+        elif frame == 'keyframes':
+            indices = np.unique(np.linspace(0, num_frames - 1, num_keyframes).astype(int)).tolist()
+        else:
+            raise ValueError(f"frame must be 'middle' or 'keyframes', got {frame}")
+
+        thumbnails = self.render_frames(seq_df.iloc[indices].reset_index(drop=True), target_size=thumbnail_size,
+                                        canvas_size=thumbnail_size)
+
+        label = f"{phrase} ({self.get_animation_name(input_file)})"
+        for thumbnail in thumbnails:
+            cv2.putText(thumbnail, label, (5, 15), cv2.FONT_HERSHEY_SIMPLEX, 0.4,
+                        hex_to_rgb(TITLE_COLOR), 1, cv2.LINE_AA)
+        return thumbnails, phrase
+
+    def render_contact_sheet(self, files=None, grid=(4, 4), frame='middle', num_keyframes=4,
+                             thumbnail_size=(320, 180), sheet_name='contact_sheet', max_workers=None):
+        """
+        Renders representative frames of many sequences into contact sheets for visual QA.
+
+        With frame='middle', each sheet is a PNG image holding one thumbnail per sequence. With
+        frame='keyframes', each sheet is a short GIF whose n-th frame shows the n-th keyframe of every
+        sequence in the grid. Thumbnails are rendered on the batch worker pool; when there are more
+        files than grid cells, one sheet is written per page.
+
+        Args:
+            files (list of str, optional): Input files. Defaults to every discovered input file.
+            grid (tuple, optional): (rows, cols) of each sheet. Defaults to (4, 4).
+            frame (str, optional): 'middle' or 'keyframes'. Defaults to 'middle'.
+            num_keyframes (int, optional): Number of keyframes per sequence. Defaults to 4.
+            thumbnail_size (tuple, optional): (width, height) of each cell. Defaults to (320, 180).
+            sheet_name (str, optional): Base name of the sheet files. Defaults to 'contact_sheet'.
+            max_workers (int, optional): Number of worker processes. Defaults to the CPU count.
+
+        Returns:
+            list of str: Paths of the written sheets.
+        """
+        files = self.get_dataset_files() if files is None else list(files)
+        rows, cols = grid
+        batch = BatchProcessor(self, max_workers=max_workers)
+
+        thumbnails = []
+        for input_file, result, error in batch.map('render_thumbnails', files, frame=frame,
+                                                    num_keyframes=num_keyframes, thumbnail_size=thumbnail_size):
+            if error is not None:
+                self.logger.error(f"Failed processing : {input_file} : {error}")
+                continue
+            thumbnails.append(result[0])
+
+        sheets = []
+        cells = rows * cols
+        for page, start in enumerate(range(0, len(thumbnails), cells)):
+            page_thumbnails = thumbnails[start:start + cells]
+            if frame == 'middle':
+                out_file = os.path.join(self.output_dir, f'{sheet_name}_{page:03d}.png')
+                sheet = self.tile_images([t[0] for t in page_thumbnails], cols, thumbnail_size)
+                Image.fromarray(sheet).save(out_file)
+            else:
+                out_file = os.path.join(self.output_dir, f'{sheet_name}_{page:03d}.gif')
+                num_frames = max(len(t) for t in page_thumbnails)
+                # Shorter sequences hold their last keyframe
+                sheet_frames = [self.tile_images([t[min(i, len(t) - 1)] for t in page_thumbnails], cols, thumbnail_size)
+                                for i in range(num_frames)]
+                self.write_gif(sheet_frames, out_file, fps=1)
+            self.logger.info("Finished processing : ", out_file)
+            sheets.append(out_file)
+        return sheets
+
+    def render_sprite_sheet(self, input_file, columns=None, thumbnail_size=(320, 180)):
+        """
+        Renders every frame of one sequence at thumbnail resolution, tiled into a single PNG image.
+
+        Args:
+            input_file (str): Path of the input file.
+            columns (int, optional): Number of columns. Defaults to a near-square grid.
+            thumbnail_size (tuple, optional): (width, height) of each frame. Defaults to (320, 180).
+
+        Returns:
+            str: The path of the written sprite sheet.
+        """
+        seq_df, _ = self.read_sequence(input_file)
+        frames = self.render_frames(seq_df, target_size=thumbnail_size, canvas_size=thumbnail_size)
+        if columns is None:
+            columns = int(np.ceil(np.sqrt(len(frames))))
+
+        out_file = os.path.join(self.output_dir, f'{self.get_animation_name(input_file)}_sprites.png')
+        Image.fromarray(self.tile_images(frames, columns, thumbnail_size)).save(out_file)
+        self.logger.info("Finished processing : ", out_file)
+        return out_file
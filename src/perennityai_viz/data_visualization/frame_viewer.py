@@ -0,0 +1,208 @@
+import io
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+
+class FrameViewer:
+    """
+    Renders the frames of a sequence on demand, for scrubbing through long sequences in notebooks.
+
+    `viewer[i]` renders only frame i, so the time to the first frame does not depend on the sequence
+    length. Recently viewed frames are memoized, and after each access the next (and previous) frames
+    are rendered on a background thread, so that stepping through the sequence is immediate. Prefetches
+    that are no longer near the viewed frame are cancelled when the viewer jumps elsewhere.
+
+    show() displays the frames with an ipywidgets slider, when ipywidgets is installed.
+
+    Attributes:
+        visualizer (DataVisualizer): The visualizer rendering the frames.
+        seq_df (pandas.DataFrame): Landmark data, one row per frame.
+        phrase (str): The phrase of the sequence.
+        title (str): Title drawn on the frames, or '' for none.
+        max_frames (int): Maximum number of memoized frames.
+        prefetch (int): Number of frames rendered ahead of the viewed frame.
+        target_size (tuple): (width, height) of the frames.
+    """
+
+    def __init__(self, visualizer, seq_df, phrase='', title='', max_frames=64, prefetch=4, target_size=(1280, 720)):
+        """
+        Initializes the FrameViewer.
+
+        Args:
+            visualizer (DataVisualizer): The visualizer rendering the frames.
+            seq_df (pandas.DataFrame): Landmark data, one row per frame.
+            phrase (str, optional): The phrase of the sequence. Defaults to ''.
+            title (str, optional): Title drawn on the frames. Defaults to '' (no title).
+            max_frames (int, optional): Maximum number of memoized frames. Defaults to 64.
+            prefetch (int, optional): Number of frames rendered ahead of the viewed frame; the previous
+                frame is prefetched too. Defaults to 4; 0 disables prefetching.
+            target_size (tuple, optional): (width, height) of the frames. Defaults to (1280, 720).
+
+        Raises:
+            ValueError: If the sequence has no frames.
+        """
+        if len(seq_df) == 0:
+            raise ValueError("The sequence has no frames.")
+
+        self.visualizer = visualizer
+        self.seq_df = seq_df
+        self.phrase = phrase
+        self.title = title
+        self.max_frames = max_frames
+        self.prefetch = prefetch
+        self.target_size = target_size
+
+        self.frames = collections.OrderedDict()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1) if prefetch > 0 else None
+
+    def __len__(self):
+        return len(self.seq_df)
+
+    def __getitem__(self, index):
+        """
+        Returns a rendered frame, or a list of frames for a slice.
+
+        Args:
+            index (int or slice): Frame index; negative indices count from the end.
+
+        Returns:
+            numpy.ndarray: The uint8 frame, of shape (height, width, 3).
+
+        Raises:
+            IndexError: If the index is out of range.
+        """
+        if isinstance(index, slice):
+            return [self.get_frame(i, prefetch=False) for i in range(*index.indices(len(self)))]
+        return self.get_frame(index)
+
+    def render(self, index):
+        """Renders one frame, without memoization."""
+        frame = self.visualizer.render_frames(self.seq_df.iloc[index:index + 1], target_size=self.target_size)[0]
+        if self.title:
+            frame = self.visualizer.draw_title(frame, self.title)
+        return frame
+
+    def _remember(self, index, frame):
+        with self.lock:
+            self.frames[index] = frame
+            self.frames.move_to_end(index)
+            while len(self.frames) > self.max_frames:
+                self.frames.popitem(last=False)
+
+    def _prefetch_frame(self, index):
+        try:
+            self._remember(index, self.render(index))
+        finally:
+            with self.lock:
+                self.pending.pop(index, None)
+
+    def get_frame(self, index, prefetch=True):
+        """
+        Returns a rendered frame, memoized, and prefetches its neighbours.
+
+        Args:
+            index (int): Frame index; negative indices count from the end.
+            prefetch (bool, optional): Prefetch the neighbouring frames. Defaults to True.
+
+        Returns:
+            numpy.ndarray: The uint8 frame.
+
+        Raises:
+            IndexError: If the index is out of range.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Frame {index} out of range, the sequence has {len(self)} frames")
+
+        with self.lock:
+            frame = self.frames.get(index)
+            if frame is not None:
+                self.frames.move_to_end(index)
+            future = self.pending.get(index) if frame is None else None
+
+        if frame is None:
+            # A frame already being prefetched is awaited, anything else is rendered right away
+            if future is not None and not future.cancel():
+                future.result()
+                with self.lock:
+                    frame = self.frames.get(index)
+            elif future is not None:
+                with self.lock:
+                    self.pending.pop(index, None)
+            if frame is None:
+                frame = self.render(index)
+                self._remember(index, frame)
+
+        if prefetch and self.executor is not None:
+            self._schedule(index)
+        return frame
+
+    def _schedule(self, index):
+        window = [i for i in range(index + 1, index + 1 + self.prefetch) if i < len(self)]
+        if index > 0:
+            window.append(index - 1)
+        with self.lock:
+            # Drop the prefetches of frames the viewer moved away from
+            for i, future in list(self.pending.items()):
+                if i not in window and future.cancel():
+                    del self.pending[i]
+            for i in window:
+                if i not in self.frames and i not in self.pending:
+                    self.pending[i] = self.executor.submit(self._prefetch_frame, i)
+
+    def to_png(self, index):
+        """
+        Returns a frame encoded as PNG.
+
+        Args:
+            index (int): Frame index.
+
+        Returns:
+            bytes: The PNG image.
+        """
+        buffer = io.BytesIO()
+        Image.fromarray(self.get_frame(index)).save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def show(self, index=0):
+        """
+        Displays the frames in a notebook with a slider, rendering each frame when it is selected.
+
+        Args:
+            index (int, optional): The frame shown first. Defaults to 0.
+
+        Returns:
+            ipywidgets.VBox: The displayed widget.
+
+        Raises:
+            ImportError: If ipywidgets is not installed.
+        """
+        try:
+            import ipywidgets
+            from IPython.display import display
+        except ImportError as e:
+            raise ImportError("FrameViewer.show requires ipywidgets; index the viewer (viewer[i]) instead.") from e
+
+        image = ipywidgets.Image(value=self.to_png(index), format='png')
+        slider = ipywidgets.IntSlider(value=index, min=0, max=len(self) - 1, description='Frame',
+                                      continuous_update=True)
+        slider.observe(lambda change: setattr(image, 'value', self.to_png(change['new'])), names='value')
+        widget = ipywidgets.VBox([slider, image])
+        display(widget)
+        return widget
+
+    def close(self):
+        """Cancels pending prefetches and stops the prefetch thread."""
+        with self.lock:
+            for future in self.pending.values():
+                future.cancel()
+            self.pending.clear()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
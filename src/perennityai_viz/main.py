@@ -1,5 +1,6 @@
 import sys
 import os
+import json
 import argparse
 
 import webbrowser
@@ -12,6 +13,11 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 from perennityai_viz.data_visualization import DataVisualizer
 from perennityai_viz.utils import Log
+from perennityai_viz.utils import TFRecordConverter
+from perennityai_viz.utils import DatasetCompactor
+from perennityai_viz.utils import DatasetStats
+from perennityai_viz.utils.dataset_stats import select_files
+from perennityai_viz.utils.sharding import merge_shard_outputs
 
 def open_animation_in_browser(animation: FuncAnimation):
     """
@@ -105,8 +111,8 @@ def parse_arguments():
     parser.add_argument('--output_dir', type=str, required=True, help='Directory to save output animations.')
     
     # Format and file handling
-    parser.add_argument('--data_input_format', type=str, choices=['csv', 'tfrecord', 'parquet'], default='csv', 
-                        help='Input file format: "csv" or "tfrecord".')
+    parser.add_argument('--data_input_format', type=str, choices=['csv', 'tfrecord', 'parquet', 'npy', 'arrow'], default='csv', 
+                        help='Input file format: "csv", "tfrecord", "parquet", "npy" (.npy/.npz) or "arrow" (Arrow IPC/Feather).')
     
     # Visualization options
     parser.add_argument('--csv_file', type=str, default='', 
@@ -122,9 +128,17 @@ def parse_arguments():
                         help='Index of TFRecord file in input directory to visualize.')
     parser.add_argument('--parquet_file_index', type=int, default=-1, 
                         help='Index of Parquet file in input directory to visualize.')
+    parser.add_argument('--array_file', type=str, default='',
+                        help='Path to a specific .npy, .npz, .arrow or .feather file for visualization.')
+    parser.add_argument('--npy_file_index', type=int, default=-1,
+                        help='Index of NumPy file in input directory to visualize.')
+    parser.add_argument('--arrow_file_index', type=int, default=-1,
+                        help='Index of Arrow/Feather file in input directory to visualize.')
     parser.add_argument('--animation_name', type=str, default='', help='Custom name for the output animation file.')
-    parser.add_argument('--output_format', type=str, default='.gif', choices=['.gif', '.mp4'], 
+    parser.add_argument('--output_format', type=str, default='.gif', choices=['.gif', '.webp', '.mp4'], 
                         help='Format of the output animation, e.g., ".gif" or ".mp4".')
+    parser.add_argument('--gif_encoder', type=str, default='palette', choices=['palette', 'pillow'],
+                        help='GIF encoder: "palette" (shared palette, delta frames) or "pillow" (matplotlib PillowWriter).')
     parser.add_argument('--write',type=bool, default=True, help='Flag to save the animation to the output directory.')
     parser.add_argument('--verbose', type=str, default='INFO', choices=['DEBUG', 'ERROR', 'WARNING'], help='Set logging level for output')
     parser.add_argument('--show', type=bool, default=False, help='Set to show animation in browser')
@@ -133,7 +147,291 @@ def parse_arguments():
     
     return parser.parse_args()
 
+def add_common_arguments(parser):
+    """Adds the input, output and logging arguments shared by all commands."""
+    parser.add_argument('--input_file', type=str, default='', help='CSV, Parquet or TFRecord input file.')
+    parser.add_argument('--input_dir', type=str, default='', help='Directory containing multiple dataset files.')
+    parser.add_argument('--output_dir', type=str, required=True, help='Directory to save outputs.')
+    parser.add_argument('--verbose', type=str, default='INFO', choices=['DEBUG', 'INFO', 'ERROR', 'WARNING'], help='Set logging level for output')
+    parser.add_argument('--encoding', type=str, default='ISO-8859-1', help='Encoding format for CSV files.')
+    parser.add_argument('--frame_tolerance', type=float, default=0.0,
+                        help='Render runs of frames whose landmarks differ by at most this much once, as one longer '
+                             'frame (default: 0, exact duplicates). A negative value renders every frame.')
+    parser.add_argument('--include', type=str, nargs='+', default=None,
+                        help='Patterns of the input files, relative to --input_dir (default: every input format), '
+                             'e.g. "participant_1/*".')
+    parser.add_argument('--exclude', type=str, nargs='+', default=None,
+                        help='Patterns of the files and directories of --input_dir to skip.')
+    parser.add_argument('--top_level', action='store_true', help='Do not search the subdirectories of --input_dir.')
+
+
+def build_visualizer(args):
+    """Creates the DataVisualizer described by the common arguments."""
+    return DataVisualizer(
+        input_file=args.input_file,
+        input_dir=args.input_dir,
+        output_dir=args.output_dir,
+        encoding=args.encoding,
+        verbose=args.verbose,
+        frame_tolerance=args.frame_tolerance if args.frame_tolerance >= 0 else None,
+        include=args.include,
+        exclude=args.exclude,
+        recursive=not args.top_level
+    )
+
+
+def run_batch(argv):
+    parser = argparse.ArgumentParser(prog='perennityai-viz batch',
+                                     description="Render the animations of every file in the input directory.")
+    add_common_arguments(parser)
+    parser.add_argument('--max_workers', type=int, default=None, help='Number of worker processes (default: CPU count).')
+    parser.add_argument('--output_format', type=str, default='.gif', choices=['.gif', '.webp', '.mp4'],
+                        help='Format of the output animations.')
+    parser.add_argument('--gif_encoder', type=str, default='palette', choices=['palette', 'pillow'],
+                        help='GIF encoder: "palette" or "pillow".')
+    parser.add_argument('--prefetch_depth', type=int, default=2, help='Number of files read ahead of rendering.')
+    parser.add_argument('--prefetch_memory_mb', type=float, default=None,
+                        help='Memory budget in MB of the inputs read ahead or rendering (default: no limit).')
+    parser.add_argument('--force', action='store_true', help='Re-render inputs whose outputs are up to date.')
+    parser.add_argument('--manifest_hash', action='store_true',
+                        help='Detect changed inputs by content hash instead of size and modification time.')
+    parser.add_argument('--num_shards', type=int, default=1, help='Number of shards the inputs are split into.')
+    parser.add_argument('--shard_index', type=int, default=0, help='Shard processed by this node, in [0, num_shards).')
+    parser.add_argument('--balance_by_size', action='store_true', help='Balance shards by input file size.')
+    parser.add_argument('--records', action='store_true',
+                        help='Render every record of the (optionally GZIP/ZLIB compressed) TFRecord shards in input_dir.')
+    parser.add_argument('--num_parallel_reads', type=int, default=None,
+                        help='Number of TFRecord shards read concurrently with --records (default: autotune).')
+    parser.add_argument('--nondeterministic', action='store_true',
+                        help='With --records, yield records in arrival order rather than a fixed order.')
+    parser.add_argument('--schedule', type=str, default='longest', choices=['longest', 'input'],
+                        help='Render files with the most estimated frames first, or in input order.')
+    parser.add_argument('--chunk_frames', type=int, default=0,
+                        help='Split sequences longer than this many frames into chunks rendered in parallel (0: never).')
+    parser.add_argument('--shared_memory_mb', type=float, default=512,
+                        help='Size limit of the shared memory buffers passing landmarks and chunk frames to '
+                             'workers (0: pickle them instead).')
+    parser.add_argument('--metrics_interval', type=float, default=0,
+                        help='Write throughput and resource metrics (metrics.prom, Prometheus text format) and a '
+                             'progress line every this many seconds (0: off).')
+    parser.add_argument('--metrics_json', action='store_true', help='With --metrics_interval, also write metrics.json.')
+    parser.add_argument('--stats_file', type=str, default='',
+                        help='Summary written by the stats command; only its files are rendered.')
+    parser.add_argument('--stats_query', type=str, default='',
+                        help='With --stats_file, render only files with a sequence matching this query, '
+                             'e.g. "right_hand_presence > 0.8".')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and render files as they are added to or changed in input_dir.')
+    parser.add_argument('--settle_seconds', type=float, default=2.0,
+                        help='With --watch, time a file must stay unchanged before it is rendered.')
+    parser.add_argument('--poll_interval', type=float, default=1.0,
+                        help='With --watch, interval between directory rescans when inotify is unavailable.')
+    parser.add_argument('--max_pending', type=int, default=None,
+                        help='With --watch, maximum number of files in the worker pool (default: 2 * max_workers).')
+    parser.add_argument('--polling', action='store_true', help='With --watch, poll the directory instead of using inotify.')
+    args = parser.parse_args(argv)
+
+    visualizer = build_visualizer(args)
+    if args.watch:
+        visualizer.watch(max_workers=args.max_workers, max_pending=args.max_pending,
+                         settle_seconds=args.settle_seconds, poll_interval=args.poll_interval,
+                         use_inotify=not args.polling, output_format=args.output_format,
+                         gif_encoder=args.gif_encoder, force=args.force, use_hash=args.manifest_hash,
+                         metrics_interval=args.metrics_interval, metrics_json=args.metrics_json)
+        return
+    files = select_files(args.stats_file, args.stats_query) if args.stats_file else None
+    if args.records:
+        visualizer.visualize_records(num_parallel_reads=args.num_parallel_reads,
+                                     deterministic=not args.nondeterministic,
+                                     output_format=args.output_format, gif_encoder=args.gif_encoder)
+        return
+    visualizer.visualize_batch(files=files, max_workers=args.max_workers, output_format=args.output_format,
+                               gif_encoder=args.gif_encoder, prefetch_depth=args.prefetch_depth,
+                               prefetch_memory_mb=args.prefetch_memory_mb, force=args.force,
+                               use_hash=args.manifest_hash, num_shards=args.num_shards,
+                               shard_index=args.shard_index, balance_by_size=args.balance_by_size,
+                               longest_first=args.schedule == 'longest', chunk_frames=args.chunk_frames,
+                               shared_memory_mb=args.shared_memory_mb, metrics_interval=args.metrics_interval,
+                               metrics_json=args.metrics_json)
+
+
+def run_contact_sheet(argv):
+    parser = argparse.ArgumentParser(prog='perennityai-viz contact-sheet',
+                                     description="Render representative frames of many sequences into contact sheets.")
+    add_common_arguments(parser)
+    parser.add_argument('--max_workers', type=int, default=None, help='Number of worker processes (default: CPU count).')
+    parser.add_argument('--grid', type=int, nargs=2, default=[4, 4], metavar=('ROWS', 'COLS'), help='Grid of each sheet.')
+    parser.add_argument('--frame', type=str, default='middle', choices=['middle', 'keyframes'],
+                        help='"middle" writes PNG sheets, "keyframes" writes short GIF sheets.')
+    parser.add_argument('--num_keyframes', type=int, default=4, help='Number of keyframes per sequence.')
+    parser.add_argument('--thumbnail_size', type=int, nargs=2, default=[320, 180], metavar=('WIDTH', 'HEIGHT'),
+                        help='Size of each thumbnail.')
+    parser.add_argument('--sheet_name', type=str, default='contact_sheet', help='Base name of the sheet files.')
+    args = parser.parse_args(argv)
+
+    visualizer = build_visualizer(args)
+    visualizer.render_contact_sheet(grid=tuple(args.grid), frame=args.frame, num_keyframes=args.num_keyframes,
+                                    thumbnail_size=tuple(args.thumbnail_size), sheet_name=args.sheet_name,
+                                    max_workers=args.max_workers)
+
+
+def run_sprite_sheet(argv):
+    parser = argparse.ArgumentParser(prog='perennityai-viz sprite-sheet',
+                                     description="Tile every frame of one sequence into a single image.")
+    add_common_arguments(parser)
+    parser.add_argument('--columns', type=int, default=None, help='Number of columns (default: near-square grid).')
+    parser.add_argument('--thumbnail_size', type=int, nargs=2, default=[320, 180], metavar=('WIDTH', 'HEIGHT'),
+                        help='Size of each frame.')
+    args = parser.parse_args(argv)
+
+    visualizer = build_visualizer(args)
+    input_file = args.input_file if args.input_file else visualizer.get_dataset_files()[0]
+    visualizer.render_sprite_sheet(input_file, columns=args.columns, thumbnail_size=tuple(args.thumbnail_size))
+
+
+def run_convert(argv):
+    parser = argparse.ArgumentParser(prog='perennityai-viz convert',
+                                     description="Convert CSV/Parquet landmark files into sharded TFRecord files.")
+    parser.add_argument('--input_file', type=str, default='', help='CSV or Parquet input file.')
+    parser.add_argument('--input_dir', type=str, default='', help='Directory containing CSV/Parquet files.')
+    parser.add_argument('--output_dir', type=str, required=True, help='Directory to save shards and manifest.json.')
+    parser.add_argument('--shard_size_mb', type=float, default=100, help='Target size of each shard in MB.')
+    parser.add_argument('--layout', type=str, default='features', choices=['features', 'raw'],
+                        help='Record layout: one feature per column, or one raw float32 landmark buffer (faster to decode).')
+    parser.add_argument('--compression', type=str, default='none', choices=['none', 'GZIP', 'ZLIB'],
+                        help='Compression of the shards.')
+    parser.add_argument('--max_workers', type=int, default=None, help='Number of worker processes (default: CPU count).')
+    parser.add_argument('--verbose', type=str, default='INFO', choices=['DEBUG', 'INFO', 'ERROR', 'WARNING'], help='Set logging level for output')
+    parser.add_argument('--encoding', type=str, default='ISO-8859-1', help='Encoding format for CSV files.')
+    args = parser.parse_args(argv)
+
+    converter = TFRecordConverter(
+        output_dir=args.output_dir,
+        shard_size_mb=args.shard_size_mb,
+        compression_type=None if args.compression == 'none' else args.compression,
+        max_workers=args.max_workers,
+        encoding=args.encoding,
+        verbose=args.verbose,
+        layout=args.layout
+    )
+    converter.convert(input_dir=args.input_dir, input_file=args.input_file)
+
+
+def run_compact(argv):
+    parser = argparse.ArgumentParser(prog='perennityai-viz compact',
+                                     description="Rewrite CSV/Parquet landmark files into visualization-optimized Parquet.")
+    parser.add_argument('--input_file', type=str, default='', help='CSV or Parquet input file.')
+    parser.add_argument('--input_dir', type=str, default='', help='Directory containing CSV/Parquet files.')
+    parser.add_argument('--output_dir', type=str, required=True, help='Directory to save compacted files.')
+    parser.add_argument('--dtype', type=str, default='float32', choices=['float32', 'float16'],
+                        help='Storage type of the landmark columns.')
+    parser.add_argument('--compression', type=str, default='zstd', help='Parquet compression codec.')
+    parser.add_argument('--row_group_rows', type=int, default=0,
+                        help='Minimum rows per row group; row groups always hold whole sequences (0: one sequence each).')
+    parser.add_argument('--max_workers', type=int, default=None, help='Number of worker processes (default: CPU count).')
+    parser.add_argument('--verbose', type=str, default='INFO', choices=['DEBUG', 'INFO', 'ERROR', 'WARNING'], help='Set logging level for output')
+    parser.add_argument('--encoding', type=str, default='ISO-8859-1', help='Encoding format for CSV files.')
+    args = parser.parse_args(argv)
+
+    compactor = DatasetCompactor(
+        output_dir=args.output_dir,
+        dtype=args.dtype,
+        compression=args.compression,
+        row_group_rows=args.row_group_rows,
+        max_workers=args.max_workers,
+        encoding=args.encoding,
+        verbose=args.verbose
+    )
+    compactor.compact(input_dir=args.input_dir, input_file=args.input_file)
+
+
+def run_stats(argv):
+    parser = argparse.ArgumentParser(prog='perennityai-viz stats',
+                                     description="Compute per-sequence quality statistics into a Parquet summary.")
+    parser.add_argument('--input_file', type=str, default='', help='CSV, Parquet or TFRecord input file.')
+    parser.add_argument('--input_dir', type=str, default='', help='Directory containing dataset files.')
+    parser.add_argument('--output_dir', type=str, required=True, help='Directory to save dataset_stats.parquet.')
+    parser.add_argument('--max_workers', type=int, default=None, help='Number of worker processes (default: CPU count).')
+    parser.add_argument('--verbose', type=str, default='INFO', choices=['DEBUG', 'INFO', 'ERROR', 'WARNING'], help='Set logging level for output')
+    parser.add_argument('--encoding', type=str, default='ISO-8859-1', help='Encoding format for CSV files.')
+    args = parser.parse_args(argv)
+
+    dataset_stats = DatasetStats(
+        output_dir=args.output_dir,
+        max_workers=args.max_workers,
+        encoding=args.encoding,
+        verbose=args.verbose
+    )
+    dataset_stats.collect(input_dir=args.input_dir, input_file=args.input_file)
+
+
+def run_list(argv):
+    parser = argparse.ArgumentParser(prog='perennityai-viz list',
+                                     description="List the format, sequences, frames and phrases of every input file.")
+    add_common_arguments(parser)
+    parser.add_argument('--phrase', type=str, default='', help='Only list the records whose phrase contains this text.')
+    parser.add_argument('--exact', action='store_true', help='With --phrase, match whole phrases only.')
+    parser.add_argument('--max_workers', type=int, default=8, help='Number of threads probing files.')
+    parser.add_argument('--no_cache', action='store_true', help='Ignore and do not update probe_cache.json.')
+    parser.add_argument('--json', action='store_true', help='Print JSON instead of a table.')
+    args = parser.parse_args(argv)
+
+    visualizer = build_visualizer(args)
+    entries = visualizer.probe(max_workers=args.max_workers, use_cache=not args.no_cache)
+    if args.phrase:
+        files = {entry['file_path']: entry for entry in entries}
+        matches = visualizer.file_probe.search(args.phrase, files=list(files), exact=args.exact)
+        if args.json:
+            print(json.dumps(matches, indent=2))
+            return
+        print(f"{'format':<9}{'index':>6}{'record':>8}{'frames':>8}  {'phrase':<30} file")
+        for match in matches:
+            entry = files[match['file_path']]
+            print(f"{entry['format']:<9}{entry['file_index']:>6}{match['record_index']:>8}{match['frames']:>8}  "
+                  f"{match['phrase']:<30} {match['file_path']}")
+        return
+
+    if args.json:
+        print(json.dumps(entries, indent=2))
+        return
+    print(f"{'format':<9}{'index':>6}{'seqs':>6}{'frames':>8}  {'phrases':<30} file")
+    for entry in entries:
+        phrases = ', '.join(sorted({record['phrase'] for record in entry['records']}))
+        print(f"{entry['format']:<9}{entry['file_index']:>6}{entry['sequences']:>6}{entry['frames']:>8}  "
+              f"{phrases[:30]:<30} {entry['file_path']}")
+
+
+def run_merge(argv):
+    parser = argparse.ArgumentParser(prog='perennityai-viz merge',
+                                     description="Merge the per-shard manifests and batch reports of a sharded batch run.")
+    parser.add_argument('--output_dir', type=str, required=True, help='Output directory given to the sharded batch runs.')
+    args = parser.parse_args(argv)
+
+    report = merge_shard_outputs(os.path.join(args.output_dir, 'animations'))
+    print(json.dumps(report, indent=2))
+
+
+# Subcommands, selected by the first command-line argument
+COMMANDS = {
+    'batch': run_batch,
+    'contact-sheet': run_contact_sheet,
+    'sprite-sheet': run_sprite_sheet,
+    'convert': run_convert,
+    'compact': run_compact,
+    'stats': run_stats,
+    'list': run_list,
+    'merge': run_merge,
+}
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        try:
+            COMMANDS[sys.argv[1]](sys.argv[2:])
+        except ValueError as e:
+            print(f"Error: {e}")
+        return
+
     args = parse_arguments()
     animation = None
 
@@ -155,7 +453,8 @@ def main():
                     csv_file_index=args.csv_file_index,
                     animation_name=args.animation_name,
                     write=args.write,
-                    output_format=args.output_format
+                    output_format=args.output_format,
+                    gif_encoder=args.gif_encoder
                 )
 
             elif args.csv_file or '.csv' in args.input_file:
@@ -163,7 +462,8 @@ def main():
                     csv_file=args.csv_file,
                     animation_name=args.animation_name,
                     write=args.write,
-                    output_format=args.output_format
+                    output_format=args.output_format,
+                    gif_encoder=args.gif_encoder
                 )
             else:
                 print("CSV Invalid input!")
@@ -174,14 +474,16 @@ def main():
                     tf_file_index=args.tf_file_index,
                     animation_name=args.animation_name,
                     write=args.write,
-                    output_format=args.output_format
+                    output_format=args.output_format,
+                    gif_encoder=args.gif_encoder
                 )
             elif args.tfrecord_file or '.tfrecord' in args.input_file:
                 animation = visualizer.visualize_data(
                     tfrecord_file=args.tfrecord_file,
                     animation_name=args.animation_name,
                     write=args.write,
-                    output_format=args.output_format
+                    output_format=args.output_format,
+                    gif_encoder=args.gif_encoder
                 )
             else:
                 print("TFrecord_file Invalid input!")
@@ -191,17 +493,41 @@ def main():
                     parquet_file_index=args.parquet_file_index,
                     animation_name=args.animation_name,
                     write=args.write,
-                    output_format=args.output_format
+                    output_format=args.output_format,
+                    gif_encoder=args.gif_encoder
                 )
             elif args.tfrecord_file or '.parquet' in args.input_file:
                 animation = visualizer.visualize_data(
                     parquet_file=args.parquet_file,
                     animation_name=args.animation_name,
                     write=args.write,
-                    output_format=args.output_format
+                    output_format=args.output_format,
+                    gif_encoder=args.gif_encoder
                 )
             else:
                 print("Parquet_file Invalid input!")
+        elif args.data_input_format in ('npy', 'arrow'):
+            file_index = args.npy_file_index if args.data_input_format == 'npy' else args.arrow_file_index
+            extensions = ('.npy', '.npz') if args.data_input_format == 'npy' else ('.arrow', '.feather')
+            if file_index >= 0:
+                animation = visualizer.visualize_data(
+                    npy_file_index=args.npy_file_index,
+                    arrow_file_index=args.arrow_file_index,
+                    animation_name=args.animation_name,
+                    write=args.write,
+                    output_format=args.output_format,
+                    gif_encoder=args.gif_encoder
+                )
+            elif args.array_file or args.input_file.endswith(extensions):
+                animation = visualizer.visualize_data(
+                    array_file=args.array_file,
+                    animation_name=args.animation_name,
+                    write=args.write,
+                    output_format=args.output_format,
+                    gif_encoder=args.gif_encoder
+                )
+            else:
+                print("Array_file Invalid input!")
 
         # Display animation in browser
         if animation is not None:
@@ -16,6 +16,14 @@ from .csv_handler import CSVHandler
 from .logger import Log
 from .tfrecord_processor import TFRecordProcessor
 from .feature_header import get_header
+from .gif_encoder import GIFEncoder
+from .tfrecord_converter import TFRecordConverter
+from .dataset_compactor import DatasetCompactor
+from .prefetch_reader import PrefetchReader
+from .run_manifest import RunManifest
+from .dataset_stats import DatasetStats
+from .metrics import BatchMetrics
+from .landmark_dataset import LandmarkDataset
 
 
 # public classes that are available at the sub-package level
@@ -23,4 +31,12 @@ __all__ = [
            'CSVHandler',
            'Log',
            'TFRecordProcessor',
+           'GIFEncoder',
+           'TFRecordConverter',
+           'DatasetCompactor',
+           'PrefetchReader',
+           'RunManifest',
+           'DatasetStats',
+           'BatchMetrics',
+           'LandmarkDataset',
            ]
@@ -0,0 +1,538 @@
+import io
+import os
+import json
+import gzip
+import zlib
+import hashlib
+import tarfile
+import zipfile
+import threading
+import collections
+
+from .tfrecord_reader import INDEX_SUFFIX, iter_tfrecord
+from .array_reader import read_array_bytes, get_metadata_path
+from .file_discovery import INPUT_PATTERNS, matches_any
+
+# File extensions and name patterns of the shard archives read in place
+ARCHIVE_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.zip')
+ARCHIVE_PATTERNS = tuple('*' + ext for ext in ARCHIVE_EXTENSIONS)
+
+# Separates the archive path from the member name in a member path, e.g. 'shard-000.tar::0001.parquet'
+MEMBER_SEPARATOR = '::'
+
+# Number of archives kept open per process
+MAX_OPEN_ARCHIVES = 8
+
+# Bytes of the members skipped by a sequential read of a compressed tar that are kept for a later request
+READAHEAD_BYTES = 64 * 1024 * 1024
+
+# Directory of the index sidecars of this process, see set_index_dir
+_index_dir = None
+
+# Member indexes of the archives seen by this process, by absolute path: (size, mtime_ns, members)
+_indexes = {}
+
+# Magic numbers of the compressions of a compressed tar
+_COMPRESSION_MAGIC = (b'\x1f\x8b', b'BZh', b'\xfd7zXZ\x00')
+
+# (size, mtime_ns) of a member: the member's uncompressed size and its archive's modification time
+MemberStat = collections.namedtuple('MemberStat', ['st_size', 'st_mtime_ns'])
+
+
+def is_archive(path):
+    """Tells whether a path is a tar or zip archive, from its name."""
+    return MEMBER_SEPARATOR not in path and path.endswith(ARCHIVE_EXTENSIONS)
+
+
+def is_member_path(path):
+    """Tells whether a path designates a member of an archive, see make_member_path."""
+    return isinstance(path, str) and MEMBER_SEPARATOR in path
+
+
+def make_member_path(archive, name):
+    """Returns the path of an archive member, e.g. 'shards/shard-000.tar::0001.parquet'."""
+    return f'{archive}{MEMBER_SEPARATOR}{name}'
+
+
+def split_member_path(path):
+    """
+    Splits a member path into its archive path and member name.
+
+    Args:
+        path (str): A member path or a plain file path.
+
+    Returns:
+        tuple: (archive path, member name), or (path, None) for a plain file path.
+    """
+    if not is_member_path(path):
+        return path, None
+    archive, name = path.split(MEMBER_SEPARATOR, 1)
+    return archive, name
+
+
+def is_compressed_tar(archive):
+    """Tells whether a tar archive is compressed (gzip, bzip2 or xz), from its first bytes."""
+    with open(archive, 'rb') as file:
+        header = file.read(6)
+    return header.startswith(_COMPRESSION_MAGIC)
+
+
+def iter_archive_members(archive, patterns=None):
+    """
+    Iterates the regular file members of an archive in one sequential pass, without extracting them.
+
+    A tar archive, compressed or not, is read as a stream; the members of a zip archive are read in
+    the order they are stored.
+
+    Args:
+        archive (str): Path of a tar or zip archive.
+        patterns (iterable of str, optional): Only yield the members whose name matches one of these
+            fnmatch patterns; the others are skipped without being decompressed. Defaults to every member.
+
+    Yields:
+        tuple: (member name, bytes).
+    """
+    if archive.endswith('.zip'):
+        with zipfile.ZipFile(archive) as zip_file:
+            for info in sorted(zip_file.infolist(), key=lambda info: info.header_offset):
+                if not info.is_dir() and (patterns is None or matches_any(info.filename, patterns)):
+                    yield info.filename, zip_file.read(info)
+        return
+
+    with tarfile.open(archive, 'r|*') as tar:
+        for info in tar:
+            if info.isfile() and (patterns is None or matches_any(info.name, patterns)):
+                yield info.name, tar.extractfile(info).read()
+
+
+def build_archive_index(archive):
+    """
+    Scans an archive and returns the index entries of its regular file members.
+
+    Only the member headers are parsed; the data of a tar member is skipped. A compressed tar has no
+    random access, so it is still decompressed once from start to end, which is why indexes are kept
+    (see read_archive_index).
+
+    Args:
+        archive (str): Path of a tar or zip archive.
+
+    Returns:
+        list of dict: `name`, `size` and `offset` of every member, in archive order. The offset is that of
+            the member's data in an uncompressed tar, of its local header in a zip, and None in a
+            compressed tar, which can only be read sequentially.
+    """
+    members = []
+    if archive.endswith('.zip'):
+        with zipfile.ZipFile(archive) as zip_file:
+            for info in sorted(zip_file.infolist(), key=lambda info: info.header_offset):
+                if not info.is_dir():
+                    members.append({'name': info.filename, 'size': info.file_size, 'offset': info.header_offset})
+        return members
+
+    compressed = is_compressed_tar(archive)
+    # The stream mode moves from header to header, discarding member data instead of extracting it
+    with tarfile.open(archive, 'r|*') as tar:
+        for info in tar:
+            if info.isfile():
+                members.append({'name': info.name, 'size': info.size,
+                                'offset': None if compressed else info.offset_data})
+    return members
+
+
+def set_index_dir(index_dir):
+    """
+    Sets the directory of the archive index sidecars of this process, e.g. in the output directory.
+
+    Sidecars are never written next to the archives, so read-only datasets are indexed the same way.
+    Without an index directory, indexes are only kept in memory.
+
+    Args:
+        index_dir (str): Directory of the sidecars, created if needed, or None.
+    """
+    global _index_dir
+    if index_dir:
+        os.makedirs(index_dir, exist_ok=True)
+    _index_dir = index_dir or None
+
+
+def get_index_path(archive):
+    """
+    Returns the path of the index sidecar of an archive in the index directory, see set_index_dir.
+
+    Args:
+        archive (str): Path of the archive.
+
+    Returns:
+        str: E.g. '<index_dir>/shard-000.tar-3f2a9c0b1d4e.index.json', named after the archive and a hash of
+            its absolute path, or None without an index directory.
+    """
+    if _index_dir is None:
+        return None
+    digest = hashlib.sha1(os.path.abspath(archive).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(_index_dir, f'{os.path.basename(archive)}-{digest}{INDEX_SUFFIX}')
+
+
+def load_archive_index(archive, stat=None):
+    """
+    Loads the index sidecar of an archive, if it exists and is up to date.
+
+    Args:
+        archive (str): Path of the archive.
+        stat (os.stat_result, optional): Current stat of the archive. Defaults to a new stat.
+
+    Returns:
+        list of dict: The index entries of the members, or None.
+    """
+    index_path = get_index_path(archive)
+    if index_path is None:
+        return None
+    try:
+        stat = stat or os.stat(archive)
+        with open(index_path, 'r') as file:
+            index = json.load(file)
+        if index.get('size') == stat.st_size and index.get('mtime_ns') == stat.st_mtime_ns:
+            return index['members']
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def read_archive_index(archive, write=True):
+    """
+    Returns the index of an archive: from the memory of this process, else from its sidecar in the index
+    directory when up to date, else by scanning it (see build_archive_index).
+
+    Args:
+        archive (str): Path of the archive.
+        write (bool, optional): Write the sidecar after a scan. Failures are ignored. Defaults to True.
+
+    Returns:
+        list of dict: The index entries of the members, see build_archive_index.
+    """
+    stat = os.stat(archive)
+    key = os.path.abspath(archive)
+    cached = _indexes.get(key)
+    if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+
+    members = load_archive_index(archive, stat=stat)
+    if members is None:
+        members = build_archive_index(archive)
+        index_path = get_index_path(archive)
+        if write and index_path is not None:
+            temp_file = f'{index_path}.tmp-{os.getpid()}'
+            try:
+                with open(temp_file, 'w') as file:
+                    json.dump({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'members': members}, file)
+                os.replace(temp_file, index_path)
+            except OSError:
+                pass
+    _indexes[key] = (stat.st_size, stat.st_mtime_ns, members)
+    return members
+
+
+def list_archive_files(archive, exclude=()):
+    """
+    Lists the input files of an archive as member paths, in archive order.
+
+    Args:
+        archive (str): Path of a tar or zip archive.
+        exclude (iterable of str, optional): Patterns of the member names to skip. Defaults to none.
+
+    Returns:
+        list of str: Member paths of the CSV, Parquet, TFRecord, NumPy and Arrow members.
+    """
+    return [make_member_path(archive, entry['name']) for entry in read_archive_index(archive)
+            if matches_any(entry['name'], INPUT_PATTERNS) and not matches_any(entry['name'], exclude)]
+
+
+def expand_archives(files, exclude=(), logger=None):
+    """
+    Replaces every archive of a file list by the member paths of its input files.
+
+    Args:
+        files (list of str): Paths of input files and archives.
+        exclude (iterable of str, optional): Patterns of the member names to skip. Defaults to none.
+        logger (optional): Logger instance for logging. Defaults to None.
+
+    Returns:
+        list of str: The plain files and member paths, archives expanded in place.
+    """
+    expanded = []
+    for f in files:
+        if not is_archive(f):
+            expanded.append(f)
+            continue
+        try:
+            expanded.extend(list_archive_files(f, exclude=exclude))
+        except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+            if logger is not None:
+                logger.warning(f"Could not read archive : {f} : {e}")
+    return expanded
+
+
+class ArchiveReader:
+    """
+    Reads the members of one archive, keeping it open between reads.
+
+    Members of a zip or an uncompressed tar are read by seeking to them through the member index. A
+    compressed tar can only be decompressed from its start, so it is read through a sequential cursor:
+    requesting the members in archive order (see group_by_archive) decompresses the archive exactly
+    once. Members skipped on the way are kept, up to `readahead_bytes`, for requests that arrive slightly
+    out of order, e.g. from concurrent prefetch threads; an earlier member restarts the cursor. Thread-safe.
+
+    Attributes:
+        archive (str): Path of the archive.
+        members (dict): Index entries by member name.
+        positions (dict): Position of every member in archive order, by name.
+        stat (tuple): (size, mtime_ns) of the archive when opened.
+        readahead_bytes (int): Bytes of skipped members kept for later requests.
+    """
+
+    def __init__(self, archive, readahead_bytes=READAHEAD_BYTES):
+        """
+        Initializes the ArchiveReader and loads the member index.
+
+        Args:
+            archive (str): Path of a tar or zip archive.
+            readahead_bytes (int, optional): Bytes of skipped members kept for later requests. Defaults to 64 MB.
+        """
+        stat = os.stat(archive)
+        self.archive = archive
+        self.stat = (stat.st_size, stat.st_mtime_ns)
+        index = read_archive_index(archive)
+        self.members = {entry['name']: entry for entry in index}
+        self.positions = {entry['name']: position for position, entry in enumerate(index)}
+        self.readahead_bytes = readahead_bytes
+        self.lock = threading.Lock()
+        self.file = None
+        self.zip_file = None
+        self.stream = None
+        self.cursor = 0
+        self.skipped = collections.OrderedDict()
+        self.skipped_bytes = 0
+
+    def read(self, name):
+        """
+        Reads the bytes of a member.
+
+        Args:
+            name (str): Name of the member.
+
+        Returns:
+            bytes: The uncompressed member data.
+
+        Raises:
+            ValueError: If the archive has no such member.
+        """
+        entry = self.members.get(name)
+        if entry is None:
+            raise ValueError(f"Member {name} not found in {self.archive}")
+
+        with self.lock:
+            if self.archive.endswith('.zip'):
+                if self.zip_file is None:
+                    self.zip_file = zipfile.ZipFile(self.archive)
+                return self.zip_file.read(name)
+            if entry['offset'] is not None:
+                if self.file is None:
+                    self.file = open(self.archive, 'rb')
+                self.file.seek(entry['offset'])
+                return self.file.read(entry['size'])
+            return self._read_sequential(name)
+
+    def _read_sequential(self, name):
+        if name in self.skipped:
+            data = self.skipped.pop(name)
+            self.skipped_bytes -= len(data)
+            return data
+
+        if self.stream is None or self.positions[name] < self.cursor:
+            self._close_stream()
+            self.stream = iter_archive_members(self.archive)
+
+        for member_name, data in self.stream:
+            self.cursor = self.positions.get(member_name, self.cursor) + 1
+            if member_name == name:
+                return data
+            if len(data) <= self.readahead_bytes:
+                self.skipped[member_name] = data
+                self.skipped_bytes += len(data)
+                while self.skipped_bytes > self.readahead_bytes:
+                    self.skipped_bytes -= len(self.skipped.popitem(last=False)[1])
+        self._close_stream()
+        raise ValueError(f"Member {name} not found in {self.archive}")
+
+    def _close_stream(self):
+        if self.stream is not None:
+            self.stream.close()
+        self.stream = None
+        self.cursor = 0
+        self.skipped.clear()
+        self.skipped_bytes = 0
+
+    def close(self):
+        """Closes the archive."""
+        with self.lock:
+            self._close_stream()
+            for handle in (self.file, self.zip_file):
+                if handle is not None:
+                    handle.close()
+            self.file = self.zip_file = None
+
+
+# Open archive readers of this process, least recently used first
+_readers = collections.OrderedDict()
+_readers_lock = threading.Lock()
+
+
+def get_archive_reader(archive):
+    """
+    Returns the reader of an archive, shared by every read of this process.
+
+    Up to MAX_OPEN_ARCHIVES archives are kept open; a rewritten archive is reopened.
+
+    Args:
+        archive (str): Path of the archive.
+
+    Returns:
+        ArchiveReader: The reader.
+    """
+    key = os.path.abspath(archive)
+    stat = os.stat(archive)
+    with _readers_lock:
+        reader = _readers.get(key)
+        if reader is not None and reader.stat == (stat.st_size, stat.st_mtime_ns):
+            _readers.move_to_end(key)
+            return reader
+        if reader is not None:
+            reader.close()
+        reader = _readers[key] = ArchiveReader(archive)
+        while len(_readers) > MAX_OPEN_ARCHIVES:
+            _readers.popitem(last=False)[1].close()
+        return reader
+
+
+def read_member(path):
+    """
+    Reads the bytes of an archive member.
+
+    Args:
+        path (str): Member path, see make_member_path.
+
+    Returns:
+        bytes: The uncompressed member data.
+    """
+    archive, name = split_member_path(path)
+    return get_archive_reader(archive).read(name)
+
+
+def open_input(path):
+    """
+    Opens an input for the pandas and pyarrow readers.
+
+    Args:
+        path (str): Path of a file or an archive member.
+
+    Returns:
+        str or io.BytesIO: The path of a plain file, or the member decoded in memory.
+    """
+    if is_member_path(path):
+        return io.BytesIO(read_member(path))
+    return path
+
+
+def stat_path(path):
+    """
+    Returns the size and modification time of a file or an archive member.
+
+    Args:
+        path (str): Path of a file or an archive member.
+
+    Returns:
+        os.stat_result or MemberStat: With at least `st_size` and `st_mtime_ns`; a member has the size of
+            its data and the modification time of its archive.
+
+    Raises:
+        OSError: If the file or archive does not exist.
+        ValueError: If the archive has no such member.
+    """
+    if not is_member_path(path):
+        return os.stat(path)
+    archive, name = split_member_path(path)
+    reader = get_archive_reader(archive)
+    if name not in reader.members:
+        raise ValueError(f"Member {name} not found in {archive}")
+    return MemberStat(reader.members[name]['size'], reader.stat[1])
+
+
+def iter_member_records(path):
+    """
+    Iterates the records of a TFRecord archive member, decompressing it in memory by its extension.
+
+    Args:
+        path (str): Member path of a .tfrecord, .tfrecord.gz or .tfrecord.zlib member.
+
+    Yields:
+        bytes: The serialized records.
+    """
+    data = read_member(path)
+    if path.endswith('.gz'):
+        stream = gzip.GzipFile(fileobj=io.BytesIO(data))
+    elif path.endswith('.zlib'):
+        stream = io.BytesIO(zlib.decompress(data))
+    else:
+        stream = io.BytesIO(data)
+    with stream:
+        yield from iter_tfrecord(stream)
+
+
+def read_array_member(path):
+    """
+    Decodes the landmarks of a NumPy or Arrow archive member in memory.
+
+    The phrase comes from the file, as for read_array_file, or else from a sibling JSON member,
+    e.g. `0001.npy.json` next to `0001.npy`.
+
+    Args:
+        path (str): Member path of a .npy, .npz, .arrow or .feather member.
+
+    Returns:
+        tuple: (landmarks, metadata), see read_array_file.
+    """
+    archive, name = split_member_path(path)
+    reader = get_archive_reader(archive)
+    metadata = {}
+    if get_metadata_path(name) in reader.members:
+        try:
+            metadata = json.loads(reader.read(get_metadata_path(name)))
+        except ValueError:
+            metadata = {}
+    return read_array_bytes(reader.read(name), name, metadata)
+
+
+def group_by_archive(files):
+    """
+    Orders files so that the members of each archive are contiguous and in archive order.
+
+    Each archive takes the place of its first member in the list; plain files keep their place. Reading
+    the result in order reads every archive once, sequentially.
+
+    Args:
+        files (list of str): Paths of files and archive members.
+
+    Returns:
+        list of str: The same paths, reordered.
+    """
+    groups = collections.OrderedDict()
+    for f in files:
+        archive, name = split_member_path(f)
+        groups.setdefault((archive, name is not None), []).append(f)
+
+    ordered = []
+    for (archive, is_group), group in groups.items():
+        if is_group:
+            positions = get_archive_reader(archive).positions
+            group = sorted(group, key=lambda f: positions.get(split_member_path(f)[1], len(positions)))
+        ordered.extend(group)
+    return ordered
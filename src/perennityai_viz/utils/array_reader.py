@@ -0,0 +1,202 @@
+import io
+import os
+import json
+import numpy as np
+import pyarrow as pa
+
+from .landmark_layout import LANDMARK_COLUMNS, NUM_LANDMARKS
+
+# File extensions of the NumPy and Arrow IPC (Feather V2) input formats
+NPY_EXTENSIONS = ('.npy', '.npz')
+ARROW_EXTENSIONS = ('.arrow', '.feather')
+
+# Name of the landmark array in .npz files and of the fixed-size list column in Arrow files
+LANDMARKS_KEY = 'landmarks'
+
+
+def get_metadata_path(path):
+    """Returns the path of the JSON metadata sidecar of an array file, e.g. `sample.npy.json`."""
+    return path + '.json'
+
+
+def read_metadata_sidecar(path):
+    """
+    Reads the JSON metadata sidecar of an array file.
+
+    Args:
+        path (str): Path of the array file.
+
+    Returns:
+        dict: The metadata, e.g. `phrase` and `sequence_id`, or an empty dict when there is no sidecar.
+    """
+    try:
+        with open(get_metadata_path(path), 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def as_landmark_array(values):
+    """
+    Views an array of landmarks as (frames, 543, 3), without copying.
+
+    Args:
+        values (numpy.ndarray): Array of shape (frames, 543, 3) or (frames, 1629).
+
+    Returns:
+        numpy.ndarray: A view of shape (frames, 543, 3).
+
+    Raises:
+        ValueError: If the array has another shape.
+    """
+    if values.ndim == 3 and values.shape[1:] == (NUM_LANDMARKS, 3):
+        return values
+    if values.ndim == 2 and values.shape[1] == NUM_LANDMARKS * 3:
+        return values.reshape(len(values), NUM_LANDMARKS, 3)
+    raise ValueError(f"Expected landmarks of shape (frames, {NUM_LANDMARKS}, 3), got {values.shape}")
+
+
+def read_npy(path):
+    """
+    Opens the landmarks of a .npy or .npz file.
+
+    A .npy file is memory-mapped, so opening it only reads its header and frames are paged in when
+    accessed. Its phrase comes from the metadata sidecar. In a .npz file, the `landmarks` array (or the
+    first array) is read, and the phrase is taken from a `phrase` array when present, else the sidecar.
+
+    Args:
+        path (str): Path of the .npy or .npz file.
+
+    Returns:
+        tuple: A tuple containing:
+            - numpy.ndarray: Landmarks of shape (frames, 543, 3).
+            - dict: Metadata, with at least `phrase`.
+    """
+    metadata = read_metadata_sidecar(path)
+    if path.endswith('.npz'):
+        with np.load(path, mmap_mode='r') as archive:
+            landmarks = _read_npz(archive, metadata)
+    else:
+        landmarks = np.load(path, mmap_mode='r')
+    metadata.setdefault('phrase', '')
+    return as_landmark_array(landmarks), metadata
+
+
+def read_arrow(path):
+    """
+    Opens the landmarks of an Arrow IPC or Feather V2 file through a memory map.
+
+    The file either holds a `landmarks` column of fixed-size lists of 1629 float32 values, which is
+    viewed without copying, or one float column per landmark coordinate, as in the CSV header, which
+    is stacked. The phrase comes from the `phrase` schema metadata, a `phrase` column, or the sidecar.
+
+    Args:
+        path (str): Path of the Arrow or Feather file.
+
+    Returns:
+        tuple: A tuple containing:
+            - numpy.ndarray: Landmarks of shape (frames, 543, 3).
+            - dict: Metadata, with at least `phrase`.
+    """
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+
+    metadata = read_metadata_sidecar(path)
+    landmarks = _read_arrow_table(table, metadata)
+    metadata.setdefault('phrase', '')
+    return landmarks, metadata
+
+
+def _read_npz(archive, metadata):
+    """Returns the landmark array of an opened .npz file and stores its `phrase` array in metadata."""
+    key = LANDMARKS_KEY if LANDMARKS_KEY in archive.files else archive.files[0]
+    if 'phrase' in archive.files:
+        metadata['phrase'] = str(archive['phrase'])
+    return archive[key]
+
+
+def _read_arrow_table(table, metadata):
+    """Returns the landmarks of shape (frames, 543, 3) of an Arrow table and stores its phrase in metadata."""
+    schema_metadata = table.schema.metadata or {}
+    if b'phrase' in schema_metadata:
+        metadata['phrase'] = schema_metadata[b'phrase'].decode('utf-8')
+    elif 'phrase' in table.column_names and table.num_rows:
+        metadata['phrase'] = str(table.column('phrase')[0].as_py())
+
+    if LANDMARKS_KEY in table.column_names:
+        column = table.column(LANDMARKS_KEY).combine_chunks()
+        values = column.flatten().to_numpy(zero_copy_only=True)
+        return values.reshape(len(column), NUM_LANDMARKS, 3)
+    landmarks = np.stack([table.column(col).to_numpy() for col in LANDMARK_COLUMNS], axis=1)
+    return landmarks.astype(np.float32, copy=False).reshape(-1, NUM_LANDMARKS, 3)
+
+
+def read_array_bytes(data, name, metadata=None):
+    """
+    Decodes the landmarks of a NumPy or Arrow file held in memory, e.g. an archive member.
+
+    The layouts are those of read_npy and read_arrow; the arrays are copied out of `data`, except for
+    the `landmarks` column of an Arrow file, which is viewed in place.
+
+    Args:
+        data (bytes): Content of the file.
+        name (str): Name of the file, whose extension selects the format.
+        metadata (dict, optional): Metadata of the file, e.g. from a sidecar. Defaults to None.
+
+    Returns:
+        tuple: (landmarks, metadata), see read_array_file.
+
+    Raises:
+        ValueError: If the file format is not supported.
+    """
+    metadata = dict(metadata or {})
+    if name.endswith('.npz'):
+        with np.load(io.BytesIO(data)) as archive:
+            landmarks = _read_npz(archive, metadata)
+    elif name.endswith('.npy'):
+        landmarks = np.load(io.BytesIO(data))
+    elif name.endswith(ARROW_EXTENSIONS):
+        landmarks = _read_arrow_table(pa.ipc.open_file(pa.BufferReader(data)).read_all(), metadata)
+    else:
+        raise ValueError(f"Unsupported array file format : {name}")
+    metadata.setdefault('phrase', '')
+    return as_landmark_array(landmarks), metadata
+
+
+def read_array_file(path):
+    """
+    Opens the landmarks of a NumPy or Arrow file.
+
+    Args:
+        path (str): Path of a .npy, .npz, .arrow or .feather file.
+
+    Returns:
+        tuple: (landmarks, metadata), see read_npy and read_arrow.
+
+    Raises:
+        ValueError: If the file format is not supported.
+    """
+    if path.endswith(NPY_EXTENSIONS):
+        return read_npy(path)
+    elif path.endswith(ARROW_EXTENSIONS):
+        return read_arrow(path)
+    raise ValueError(f"Unsupported array file format : {path}")
+
+
+def count_frames(path):
+    """
+    Returns the number of frames of a NumPy or Arrow file from its header or footer.
+
+    Args:
+        path (str): Path of a .npy, .npz, .arrow or .feather file.
+
+    Returns:
+        int: The number of frames.
+    """
+    if path.endswith('.npy'):
+        return len(np.load(path, mmap_mode='r'))
+    elif path.endswith(ARROW_EXTENSIONS):
+        with pa.memory_map(path, 'r') as source:
+            reader = pa.ipc.open_file(source)
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    return len(read_npy(path)[0])
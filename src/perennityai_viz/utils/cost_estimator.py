@@ -0,0 +1,77 @@
+import pyarrow.parquet as pq
+
+from .landmark_layout import NUM_LANDMARKS
+from .tfrecord_reader import load_tfrecord_index
+from .array_reader import NPY_EXTENSIONS, ARROW_EXTENSIONS, count_frames
+from .archive_reader import is_member_path, stat_path
+
+# Approximate on-disk bytes per frame, used when the frame count is not stored in metadata:
+# float32 x, y and z of every landmark in a TFRecord, and about 10 characters per value in a CSV row.
+TFRECORD_BYTES_PER_FRAME = NUM_LANDMARKS * 3 * 4
+CSV_BYTES_PER_FRAME = NUM_LANDMARKS * 3 * 10
+
+# TFRecord compressors typically shrink landmark data by this factor
+COMPRESSED_TFRECORD_RATIO = 2
+
+
+def estimate_frames(input_file):
+    """
+    Estimates the number of frames of an input file without reading its data.
+
+    Parquet files use the row count of their footer metadata, TFRecord files the frame counts of an
+    up-to-date index sidecar and NumPy and Arrow files their array header, all exact. Other files are
+    estimated from their size on disk, as are archive members, so that estimating does not read the archives.
+
+    Args:
+        input_file (str): Path of a CSV, Parquet, TFRecord, NumPy or Arrow file, or of an archive member.
+
+    Returns:
+        int: The estimated number of frames, at least 1.
+    """
+    member = is_member_path(input_file)
+    if not member and input_file.endswith('.parquet'):
+        try:
+            return max(1, pq.ParquetFile(input_file).metadata.num_rows)
+        except Exception:
+            pass
+
+    if not member and input_file.endswith(NPY_EXTENSIONS + ARROW_EXTENSIONS):
+        return max(1, count_frames(input_file))
+
+    if not member and '.tfrecord' in input_file:
+        index = load_tfrecord_index(input_file)
+        if index is not None:
+            return max(1, sum(entry['frames'] for entry in index))
+
+    size = stat_path(input_file).st_size
+    if '.tfrecord' in input_file:
+        if input_file.endswith(('.gz', '.zlib')):
+            size *= COMPRESSED_TFRECORD_RATIO
+        return max(1, size // TFRECORD_BYTES_PER_FRAME)
+    if input_file.endswith(NPY_EXTENSIONS + ARROW_EXTENSIONS):
+        # float32 values, like a TFRecord
+        return max(1, size // TFRECORD_BYTES_PER_FRAME)
+    return max(1, size // CSV_BYTES_PER_FRAME)
+
+
+def schedule_longest_first(files, estimate_fn=estimate_frames):
+    """
+    Orders files by decreasing estimated cost, so that the longest renders start first and the
+    shortest ones fill the workers at the end of a run.
+
+    Args:
+        files (list of str): Input files.
+        estimate_fn (callable, optional): Cost of one file. Defaults to estimate_frames.
+
+    Returns:
+        tuple: A tuple containing:
+            - list of str: The files, longest first, ties broken by path.
+            - dict: The estimated cost of each file.
+    """
+    costs = {}
+    for f in files:
+        try:
+            costs[f] = estimate_fn(f)
+        except OSError:
+            costs[f] = 0
+    return sorted(files, key=lambda f: (-costs[f], f)), costs
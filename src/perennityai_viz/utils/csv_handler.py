@@ -1,13 +1,17 @@
+import io
 import os
+import collections
+import numpy as np
 import pandas as pd
 import pyarrow.parquet as pq
 import pyarrow as pa
 from concurrent.futures import ThreadPoolExecutor
 
 class CSVHandler:
-    def __init__(self,  encoding='ISO-8859-1', max_workers=4, chunk_size=150000, logger=None):
+    def __init__(self,  encoding='ISO-8859-1', max_workers=4, chunk_size=150000, block_mb=64, logger=None):
         self.encoding =  encoding
         self.chunk_size = chunk_size
+        self.block_mb = block_mb  # Maximum size of the blocks read by iter_csv_sequences
         self.max_workers = max_workers  # Maximum number of threads
         self.logger=logger
 
@@ -39,6 +43,117 @@ class CSVHandler:
         except Exception as e:
             print(f"An error occurred: {e}")
 
+    def _parse_block(self, block, columns, usecols):
+        """Parses a block of complete CSV lines, without header, into a DataFrame."""
+        return pd.read_csv(io.BytesIO(block), header=None, names=columns, usecols=usecols, encoding=self.encoding)
+
+    def iter_csv_blocks(self, csv_file, block_bytes):
+        """
+        Reads a CSV file as blocks of complete lines.
+
+        Args:
+            csv_file (str): The path to the CSV file.
+            block_bytes (int): Approximate size of each block in bytes.
+
+        Yields:
+            bytes: The header line first, then blocks of complete lines.
+        """
+        with open(csv_file, 'rb') as file:
+            yield file.readline()
+            while True:
+                block = file.read(block_bytes)
+                if not block:
+                    return
+                if not block.endswith(b'\n'):
+                    # Extend to the end of the current line so that no row is split
+                    block += file.readline()
+                yield block
+
+    def iter_csv_sequences(self, csv_file, usecols=None, sequence_column='sequence_id', required=None):
+        """
+        Streams the sequences of a multi-sequence CSV file, one complete sequence at a time.
+
+        The file is read in blocks of about `chunk_size` rows, and at most `block_mb` megabytes (wide
+        landmark rows are ~16 KB each), that are parsed on `max_workers` threads,
+        with at most `max_workers` blocks read ahead, so memory use is bounded by a few blocks plus the
+        largest sequence whatever the size of the file. Rows of the last sequence of a block are carried
+        over to the next block, so a sequence spanning block edges is yielded whole.
+
+        Rows of a sequence must be contiguous, and quoted values must not contain line breaks. Without a
+        sequence column, the whole file is yielded as one sequence.
+
+        Args:
+            csv_file (str): The path to the CSV file.
+            usecols (list of str, optional): Columns to parse. The sequence column is always parsed.
+                Defaults to None (all columns).
+            sequence_column (str, optional): Column identifying sequences. Defaults to 'sequence_id'.
+            required (list of str, optional): Columns the header must contain, checked before any row is
+                read. Defaults to None.
+
+        Yields:
+            tuple: (sequence_id, pandas.DataFrame) for every sequence, in file order.
+
+        Raises:
+            ValueError: If required columns are missing.
+        """
+        # Estimate the row size from the start of the file to turn chunk_size rows into bytes
+        with open(csv_file, 'rb') as file:
+            header = file.readline()
+            sample = file.read(1024 * 1024)
+        sample_rows = max(sample.count(b'\n'), 1)
+        block_bytes = max(len(sample) // sample_rows, 1) * self.chunk_size
+        if self.block_mb:
+            block_bytes = min(block_bytes, int(self.block_mb * 1024 * 1024))
+
+        columns = pd.read_csv(io.BytesIO(header), encoding=self.encoding).columns.tolist()
+        missing_columns = [col for col in required or [] if col not in columns]
+        if missing_columns:
+            raise ValueError(f"Missing columns : {missing_columns}")
+        if usecols:
+            usecols = list(usecols) + [sequence_column] if sequence_column not in usecols else list(usecols)
+            usecols = [col for col in usecols if col in columns]
+        else:
+            usecols = None
+
+        blocks = self.iter_csv_blocks(csv_file, block_bytes)
+        next(blocks)
+        carry = None
+        pending = collections.deque()
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            exhausted = False
+            while not exhausted or pending:
+                # Keep max_workers blocks parsing ahead of the consumer
+                while not exhausted and len(pending) < max(1, self.max_workers):
+                    block = next(blocks, None)
+                    if block is None:
+                        exhausted = True
+                    else:
+                        pending.append(executor.submit(self._parse_block, block, columns, usecols))
+                if not pending:
+                    break
+
+                chunk_df = pending.popleft().result()
+                if carry is not None:
+                    chunk_df = pd.concat([carry, chunk_df], ignore_index=True)
+                if sequence_column not in chunk_df.columns or chunk_df.empty:
+                    carry = chunk_df
+                    continue
+
+                # The last sequence of the chunk may continue in the next block
+                sequence_ids = chunk_df[sequence_column].to_numpy()
+                boundaries = np.flatnonzero(sequence_ids != sequence_ids[-1])
+                last_start = boundaries[-1] + 1 if len(boundaries) else 0
+                carry = chunk_df.iloc[last_start:]
+                complete_df = chunk_df.iloc[:last_start]
+                for sequence_id, seq_df in complete_df.groupby(sequence_column, sort=False):
+                    yield sequence_id, seq_df
+
+        if carry is not None and not carry.empty:
+            if sequence_column in carry.columns:
+                yield carry[sequence_column].iloc[0], carry
+            else:
+                yield None, carry
+
     def read_parquet_file(self, file_path, columns=[]):
         """
         Reads a Parquet file and returns a DataFrame.
@@ -75,6 +190,18 @@ class CSVHandler:
         except Exception as e:
             print(f"Error reading the Parquet file: {e}")
             raise ValueError(f"Could not read file {file_path}")
+
+    def get_parquet_columns(self, file_path):
+        """
+        Returns the column names of a Parquet file, read from its footer only.
+
+        Parameters:
+        file_path (str): The path to the Parquet file.
+
+        Returns:
+        list of str: The column names.
+        """
+        return pq.ParquetFile(file_path).schema_arrow.names
             
     def write_parquet_file(self, df, output_file, encoding_col=[]):
         if encoding_col:        
@@ -82,11 +209,60 @@ class CSVHandler:
             for col in encoding_col:
                 df[col] = df[col].astype(str).str.encode(self.encoding).str.decode(self.encoding)
         
-        # Create a ParquetWriter outside the loop for appending
-        with pq.ParquetWriter(output_file, pa.Table.from_pandas(df.iloc[0:1]).schema, compression='snappy') as writer:
-            # Write the DataFrame to a Parquet file in chunks
-            for i in range(0, len(df), self.chunk_size):
-                chunk = df.iloc[i:i + self.chunk_size]
-                table = pa.Table.from_pandas(chunk)
-                writer.write_table(table)
-        print("Successfully written : ", os.path.basename(output_file))
\ No newline at end of file
+        # Convert once and let the writer split the table into row groups of chunk_size rows
+        table = pa.Table.from_pandas(df)
+        pq.write_table(table, output_file, row_group_size=self.chunk_size, compression='snappy')
+        print("Successfully written : ", os.path.basename(output_file))
+
+    def write_compact_parquet(self, df, output_file, dtype='float32', compression='zstd', row_group_rows=0,
+                              landmark_columns=None):
+        """
+        Writes landmark frames to a Parquet file laid out for part-projected reads of whole sequences.
+
+        Landmark columns are cast to `dtype` and kept in body-part order after the metadata columns, and
+        every row group holds whole sequences only: sequences are appended to a row group until it reaches
+        `row_group_rows` rows, so a sequence never straddles two row groups.
+
+        Parameters:
+        df (pd.DataFrame): Frames with landmark columns, `phrase` and optionally `sequence_id` and `frame`.
+        output_file (str): The path to the Parquet file to write.
+        dtype (str): 'float32' or 'float16' for the landmark columns.
+        compression (str): Parquet compression codec.
+        row_group_rows (int): Minimum number of rows per row group. 0 writes one sequence per row group.
+        landmark_columns (list of str): Landmark columns in the desired order. Defaults to all other columns.
+
+        Returns:
+        int: The number of row groups written.
+        """
+        meta_columns = [col for col in ['sequence_id', 'phrase', 'frame'] if col in df.columns]
+        if landmark_columns is None:
+            landmark_columns = [col for col in df.columns if col not in meta_columns]
+        landmark_columns = [col for col in landmark_columns if col in df.columns]
+        df = df[meta_columns + landmark_columns]
+        df = df.astype({col: dtype for col in landmark_columns})
+        if 'phrase' in df.columns:
+            df = df.astype({'phrase': str})
+
+        if 'sequence_id' in df.columns:
+            groups = [group for _, group in df.groupby('sequence_id', sort=False)]
+        else:
+            groups = [df]
+
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        row_groups = 0
+        with pq.ParquetWriter(output_file, schema, compression=compression) as writer:
+            pending = []
+            pending_rows = 0
+            for group in groups:
+                pending.append(group)
+                pending_rows += len(group)
+                if pending_rows >= row_group_rows:
+                    table = pa.Table.from_pandas(pd.concat(pending), schema=schema, preserve_index=False)
+                    writer.write_table(table, row_group_size=len(table))
+                    row_groups += 1
+                    pending, pending_rows = [], 0
+            if pending:
+                table = pa.Table.from_pandas(pd.concat(pending), schema=schema, preserve_index=False)
+                writer.write_table(table, row_group_size=len(table))
+                row_groups += 1
+        return row_groups
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import functools
+import multiprocessing
+import pandas as pd
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor
+
+from .csv_handler import CSVHandler
+from .logger import Log
+from .file_discovery import find_files, get_output_stem
+from .landmark_layout import LANDMARK_COLUMNS, PART_SLICES
+
+
+def _compact_file(compactor, input_file, root=None):
+    """Compacts one file in a worker process. Module-level so it can be sent to the pool."""
+    return compactor.compact_file(input_file, root=root)
+
+
+def get_part_columns(part):
+    """
+    Returns the landmark columns of a body part.
+
+    Args:
+        part (str): A key of PART_SLICES.
+
+    Returns:
+        list of str: The x, y and z columns of the part's landmarks, in header order.
+    """
+    part_slice = PART_SLICES[part]
+    return LANDMARK_COLUMNS[part_slice.start * 3:part_slice.stop * 3]
+
+
+class DatasetCompactor:
+    """
+    Rewrites CSV and Parquet landmark files into Parquet files tuned for visualization reads.
+
+    Landmark columns are stored as float32 (or float16) in body-part order, row groups are aligned to
+    `sequence_id` boundaries and zstd compression is used, so that reading the columns of one body part
+    for one sequence touches contiguous column chunks of a single row group. For every file the size and
+    the time of a part-projected read are measured before and after, and the results are written to
+    `compaction_report.json` in the output directory.
+
+    Attributes:
+        output_dir (str): Directory where the compacted files are written.
+        dtype (str): 'float32' or 'float16'.
+        compression (str): Parquet compression codec.
+        row_group_rows (int): Minimum number of rows per row group; 0 writes one sequence per row group.
+        max_workers (int): Number of worker processes.
+        encoding (str): Encoding of the CSV files.
+        benchmark_part (str): Body part whose columns are read to measure read times.
+    """
+
+    def __init__(self, output_dir, dtype='float32', compression='zstd', row_group_rows=0, max_workers=None,
+                 encoding='ISO-8859-1', benchmark_part='right_hand', verbose='INFO'):
+        """
+        Initializes the DatasetCompactor.
+
+        Args:
+            output_dir (str): Directory where the compacted files are written.
+            dtype (str, optional): 'float32' or 'float16'. Defaults to 'float32'.
+            compression (str, optional): Parquet compression codec. Defaults to 'zstd'.
+            row_group_rows (int, optional): Minimum number of rows per row group. Defaults to 0.
+            max_workers (int, optional): Number of worker processes. Defaults to the CPU count.
+            encoding (str, optional): Encoding of the CSV files. Defaults to 'ISO-8859-1'.
+            benchmark_part (str, optional): Body part read to measure read times. Defaults to 'right_hand'.
+            verbose (str, optional): Logging level. Defaults to 'INFO'.
+
+        Raises:
+            ValueError: If the output directory does not exist or dtype is invalid.
+        """
+        if not os.path.exists(output_dir):
+            raise ValueError("Please, provide output_dir!")
+        if dtype not in ('float32', 'float16'):
+            raise ValueError(f"dtype must be 'float32' or 'float16', got {dtype}")
+
+        self.output_dir = output_dir
+        self.dtype = dtype
+        self.compression = compression
+        self.row_group_rows = row_group_rows
+        self.max_workers = max_workers if max_workers is not None else multiprocessing.cpu_count()
+        self.encoding = encoding
+        self.benchmark_part = benchmark_part
+        self.logger = Log(log_file=os.path.join(output_dir, "dataset_compactor.log"), verbose=verbose)
+
+    def time_part_read(self, input_file):
+        """
+        Measures the time needed to read the phrase and the benchmark part columns of a file.
+
+        Args:
+            input_file (str): Path of a CSV or Parquet file.
+
+        Returns:
+            float: The read time in seconds.
+        """
+        columns = ['phrase'] + get_part_columns(self.benchmark_part)
+        start = time.perf_counter()
+        if input_file.endswith('.csv'):
+            pd.read_csv(input_file, usecols=columns, encoding=self.encoding)
+        else:
+            pq.read_table(input_file, columns=columns)
+        return time.perf_counter() - start
+
+    def compact_file(self, input_file, root=None):
+        """
+        Compacts one input file.
+
+        The output is named after the file's path relative to root and its extension (see
+        get_output_stem), e.g. 'x_csv.parquet', so x.csv and x.parquet do not overwrite each other.
+
+        Args:
+            input_file (str): Path of a CSV or Parquet file.
+            root (str, optional): Directory the file was found in. Defaults to None (base name only).
+
+        Returns:
+            dict: Report with the input and output paths, sizes in bytes, part read times in seconds and
+                the number of row groups.
+
+        Raises:
+            ValueError: If the file format is not supported or the output would overwrite the input.
+        """
+        csv = CSVHandler(encoding=self.encoding, logger=self.logger)
+        if input_file.endswith('.csv'):
+            df = csv.read_csv_file(input_file)
+        elif input_file.endswith('.parquet'):
+            df = csv.read_parquet_file(input_file, columns=None)
+        else:
+            raise ValueError(f"Unsupported input file format : {input_file}")
+
+        output_file = os.path.join(self.output_dir, get_output_stem(input_file, root) + '.parquet')
+        if os.path.abspath(output_file) == os.path.abspath(input_file):
+            raise ValueError(f"Output would overwrite the input file : {input_file}")
+
+        row_groups = csv.write_compact_parquet(df, output_file, dtype=self.dtype, compression=self.compression,
+                                               row_group_rows=self.row_group_rows, landmark_columns=LANDMARK_COLUMNS)
+
+        report = {
+            'input_file': input_file,
+            'output_file': output_file,
+            'input_bytes': os.path.getsize(input_file),
+            'output_bytes': os.path.getsize(output_file),
+            'input_read_seconds': self.time_part_read(input_file),
+            'output_read_seconds': self.time_part_read(output_file),
+            'row_groups': row_groups,
+        }
+        self.logger.info(
+            f"Compacted {os.path.basename(input_file)} : "
+            f"{report['input_bytes'] / 1e6:.1f} MB -> {report['output_bytes'] / 1e6:.1f} MB, "
+            f"{self.benchmark_part} read {report['input_read_seconds'] * 1e3:.1f} ms -> "
+            f"{report['output_read_seconds'] * 1e3:.1f} ms")
+        return report
+
+    def compact(self, input_dir='', input_file=''):
+        """
+        Compacts every CSV and Parquet file of a directory tree, or a single file, and writes the report.
+
+        Files are found recursively with FileDiscovery, like the batch command does. An output directory
+        inside input_dir is skipped, so compacted files are not compacted again.
+
+        Args:
+            input_dir (str, optional): Directory of input files.
+            input_file (str, optional): A single input file, used when input_dir is not given.
+
+        Returns:
+            list of dict: The per-file reports.
+
+        Raises:
+            ValueError: If no input files are found.
+        """
+        if input_dir:
+            exclude = ()
+            output_rel = os.path.relpath(os.path.abspath(self.output_dir), os.path.abspath(input_dir))
+            if output_rel != os.curdir and not output_rel.startswith(os.pardir):
+                exclude = (output_rel.replace(os.sep, '/'),)
+            files = find_files(input_dir, include=('*.csv', '*.parquet'), exclude=exclude, logger=self.logger)
+        else:
+            files = [input_file] if input_file and os.path.exists(input_file) else []
+        if not files:
+            raise ValueError("No CSV or Parquet input files found!")
+
+        root = input_dir or None
+        reports = []
+        executor = None
+        if self.max_workers > 1 and len(files) > 1:
+            executor = ProcessPoolExecutor(max_workers=min(self.max_workers, len(files)),
+                                           mp_context=multiprocessing.get_context('spawn'))
+        try:
+            # Serial and pool compactions report failures the same way
+            if executor is None:
+                calls = [functools.partial(self.compact_file, f, root=root) for f in files]
+            else:
+                calls = [executor.submit(_compact_file, self, f, root).result for f in files]
+            for f, call in zip(files, calls):
+                try:
+                    reports.append(call())
+                except Exception as e:
+                    self.logger.error(f"Failed compacting : {f} : {e}")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        report_file = os.path.join(self.output_dir, 'compaction_report.json')
+        with open(report_file, 'w') as file:
+            json.dump(reports, file, indent=2)
+
+        input_bytes = sum(r['input_bytes'] for r in reports)
+        output_bytes = sum(r['output_bytes'] for r in reports)
+        self.logger.info(f"Compacted {len(reports)} files : {input_bytes / 1e6:.1f} MB -> {output_bytes / 1e6:.1f} MB")
+        return reports
@@ -0,0 +1,274 @@
+import os
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from .csv_handler import CSVHandler
+from .logger import Log
+from .landmark_layout import (LANDMARK_COLUMNS, PART_SLICES, to_landmark_array,
+                              get_presence_mask, get_part_presence)
+from .tfrecord_reader import open_tfrecord, iter_tfrecord, decode_example
+from .array_reader import NPY_EXTENSIONS, ARROW_EXTENSIONS, read_array_file
+from .file_discovery import INPUT_PATTERNS, find_files
+from .archive_reader import (ARCHIVE_PATTERNS, is_member_path, open_input, iter_member_records,
+                             read_array_member, expand_archives)
+
+
+def _stats_file(dataset_stats, input_file):
+    """Computes the statistics of one file in a worker process. Module-level so it can be sent to the pool."""
+    return dataset_stats.stats_file(input_file)
+
+
+def _finite_min_max(values):
+    # nanmin/nanmax warn on all-NaN input, so empty selections are handled explicitly
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return np.nan, np.nan
+    return float(values.min()), float(values.max())
+
+
+def compute_sequence_stats(landmarks):
+    """
+    Computes quality metrics of one sequence with whole-array NumPy operations.
+
+    Metrics:
+        - `frames`: number of frames.
+        - `<part>_presence`: fraction of frames in which any landmark of the part is present.
+        - `x_min` ... `z_max`: bounding box of all present coordinates.
+        - `out_of_range_ratio`: fraction of present x and y coordinates outside [0, 1].
+        - `<part>_jitter`: mean x/y displacement of the part's landmarks between consecutive frames,
+          over landmarks present in both frames (NaN when there are none).
+
+    Args:
+        landmarks (numpy.ndarray): Landmark coordinates of shape (frames, 543, 3).
+
+    Returns:
+        dict: The metrics.
+    """
+    num_frames = len(landmarks)
+    stats = {'frames': num_frames}
+
+    part_presence = get_part_presence(get_presence_mask(landmarks))
+    for part in PART_SLICES:
+        stats[f'{part}_presence'] = float(part_presence[part].mean()) if num_frames else 0.0
+
+    for axis, name in enumerate('xyz'):
+        stats[f'{name}_min'], stats[f'{name}_max'] = _finite_min_max(landmarks[:, :, axis])
+
+    xy = landmarks[:, :, :2]
+    valid = ~np.isnan(xy)
+    with np.errstate(invalid='ignore'):
+        out_of_range = ((xy < 0) | (xy > 1)) & valid
+    stats['out_of_range_ratio'] = float(out_of_range.sum() / max(int(valid.sum()), 1))
+
+    # Displacements are NaN wherever a landmark is missing in either frame
+    displacement = np.linalg.norm(np.diff(xy, axis=0), axis=2)
+    for part, part_slice in PART_SLICES.items():
+        part_displacement = displacement[:, part_slice]
+        part_displacement = part_displacement[~np.isnan(part_displacement)]
+        stats[f'{part}_jitter'] = float(part_displacement.mean()) if part_displacement.size else np.nan
+    return stats
+
+
+def iter_file_sequences(input_file, encoding='ISO-8859-1', logger=None):
+    """
+    Iterates the sequences of a file.
+
+    CSV and Parquet files are split by `sequence_id` when the column exists and are otherwise a
+    single sequence. Every record of a TFRecord file is a sequence, decoded without TensorFlow.
+    NumPy and Arrow files hold one sequence. Archive members are decoded in memory.
+
+    Args:
+        input_file (str): Path of a CSV, Parquet, TFRecord, NumPy or Arrow file, or of an archive member.
+        encoding (str, optional): Encoding of CSV files. Defaults to 'ISO-8859-1'.
+        logger (optional): Logger instance for logging. Defaults to None.
+
+    Yields:
+        tuple: (sequence_id, phrase, landmarks) with landmarks of shape (frames, 543, 3).
+
+    Raises:
+        ValueError: If the file format is not supported.
+    """
+    member = is_member_path(input_file)
+    if '.tfrecord' in input_file and member:
+        for record in iter_member_records(input_file):
+            landmarks, phrase, sequence_id = decode_example(record)
+            yield sequence_id, phrase, landmarks
+        return
+    if '.tfrecord' in input_file:
+        with open_tfrecord(input_file) as file:
+            for record in iter_tfrecord(file):
+                landmarks, phrase, sequence_id = decode_example(record)
+                yield sequence_id, phrase, landmarks
+        return
+    if input_file.endswith(NPY_EXTENSIONS + ARROW_EXTENSIONS):
+        landmarks, metadata = read_array_member(input_file) if member else read_array_file(input_file)
+        yield metadata.get('sequence_id'), metadata['phrase'], landmarks
+        return
+
+    csv = CSVHandler(encoding=encoding, logger=logger)
+    if input_file.endswith('.csv') and member:
+        columns = {'sequence_id', 'phrase'}.union(LANDMARK_COLUMNS)
+        frames_df = pd.read_csv(open_input(input_file), usecols=lambda col: col in columns, encoding=encoding)
+    elif input_file.endswith('.csv'):
+        # Streamed one sequence at a time, so memory stays bounded on multi-GB exports
+        for sequence_id, seq_df in csv.iter_csv_sequences(input_file, usecols=['phrase'] + LANDMARK_COLUMNS):
+            phrase = str(seq_df['phrase'].iloc[0]) if 'phrase' in seq_df.columns else ''
+            yield sequence_id, phrase, to_landmark_array(seq_df)
+        return
+    elif input_file.endswith('.parquet'):
+        source = open_input(input_file)
+        columns = csv.get_parquet_columns(source)
+        columns = [col for col in ['sequence_id', 'phrase'] + LANDMARK_COLUMNS if col in columns]
+        frames_df = csv.read_parquet_file(source, columns=columns)
+    else:
+        raise ValueError(f"Unsupported input file format : {input_file}")
+
+    groups = frames_df.groupby('sequence_id', sort=False) if 'sequence_id' in frames_df.columns else [(None, frames_df)]
+    for sequence_id, seq_df in groups:
+        phrase = str(seq_df['phrase'].iloc[0]) if 'phrase' in seq_df.columns and len(seq_df) else ''
+        yield sequence_id, phrase, to_landmark_array(seq_df)
+
+
+class DatasetStats:
+    """
+    Computes per-sequence quality statistics over every CSV, Parquet, TFRecord, NumPy and Arrow file of a directory.
+
+    Files are processed in parallel worker processes, and the statistics of every sequence (see
+    compute_sequence_stats), together with its file path, sequence index, sequence id and phrase, are
+    written to a single Parquet summary. The summary can then be queried to select the files to
+    render, e.g. `right_hand_presence > 0.8 and out_of_range_ratio < 0.01`.
+
+    Attributes:
+        output_dir (str): Directory where the summary is written.
+        max_workers (int): Number of worker processes.
+        encoding (str): Encoding of the CSV files.
+        verbose (str): Logging level.
+    """
+
+    def __init__(self, output_dir, max_workers=None, encoding='ISO-8859-1', verbose='INFO'):
+        """
+        Initializes the DatasetStats.
+
+        Args:
+            output_dir (str): Directory where the summary is written.
+            max_workers (int, optional): Number of worker processes. Defaults to the CPU count.
+            encoding (str, optional): Encoding of the CSV files. Defaults to 'ISO-8859-1'.
+            verbose (str, optional): Logging level. Defaults to 'INFO'.
+
+        Raises:
+            ValueError: If the output directory does not exist.
+        """
+        if not os.path.exists(output_dir):
+            raise ValueError("Please, provide output_dir!")
+
+        self.output_dir = output_dir
+        self.max_workers = max_workers if max_workers is not None else multiprocessing.cpu_count()
+        self.encoding = encoding
+        self.verbose = verbose
+        self.logger = Log(log_file=os.path.join(output_dir, "dataset_stats.log"), verbose=verbose)
+
+    @staticmethod
+    def find_files(input_dir):
+        """
+        Finds the CSV, Parquet, TFRecord, NumPy and Arrow files of a directory tree, including the
+        members of its tar and zip archives.
+
+        Args:
+            input_dir (str): Directory of input files, possibly in subdirectories.
+
+        Returns:
+            list of str: The files, sorted, each archive replaced by its member paths in archive order.
+        """
+        return expand_archives(find_files(input_dir, include=INPUT_PATTERNS + ARCHIVE_PATTERNS))
+
+    def iter_file_sequences(self, input_file):
+        """Iterates the (sequence_id, phrase, landmarks) sequences of a file, see iter_file_sequences."""
+        return iter_file_sequences(input_file, encoding=self.encoding, logger=self.logger)
+
+    def stats_file(self, input_file):
+        """
+        Computes the statistics of every sequence of a file.
+
+        Args:
+            input_file (str): Path of a CSV, Parquet, TFRecord, NumPy or Arrow file.
+
+        Returns:
+            list of dict: One row per sequence.
+        """
+        rows = []
+        for idx, (sequence_id, phrase, landmarks) in enumerate(self.iter_file_sequences(input_file)):
+            row = {
+                'file_path': input_file,
+                'sequence_index': idx,
+                'sequence_id': None if sequence_id is None else int(sequence_id),
+                'phrase': phrase,
+            }
+            row.update(compute_sequence_stats(landmarks))
+            rows.append(row)
+        self.logger.debug(f"Computed statistics of {len(rows)} sequences : {input_file}")
+        return rows
+
+    def collect(self, input_dir='', input_file='', output_name='dataset_stats.parquet'):
+        """
+        Computes the statistics of every file of a directory, or a single file, and writes the summary.
+
+        Args:
+            input_dir (str, optional): Directory of input files.
+            input_file (str, optional): A single input file or archive, used when input_dir is not given.
+            output_name (str, optional): File name of the summary. Defaults to 'dataset_stats.parquet'.
+
+        Returns:
+            pandas.DataFrame: The summary, one row per sequence.
+
+        Raises:
+            ValueError: If no input files are found.
+        """
+        if input_dir:
+            files = self.find_files(input_dir)
+        else:
+            files = expand_archives([input_file]) if input_file and os.path.exists(input_file) else []
+        if not files:
+            raise ValueError("No CSV, Parquet, TFRecord, NumPy or Arrow input files found!")
+
+        rows = []
+        if self.max_workers <= 1 or len(files) == 1:
+            for f in files:
+                rows.extend(self.stats_file(f))
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(files)),
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                futures = [executor.submit(_stats_file, self, f) for f in files]
+                for f, future in zip(files, futures):
+                    try:
+                        rows.extend(future.result())
+                    except Exception as e:
+                        self.logger.error(f"Failed computing statistics : {f} : {e}")
+
+        summary = pd.DataFrame(rows)
+        if 'sequence_id' in summary.columns:
+            summary['sequence_id'] = summary['sequence_id'].astype('Int64')
+        output_file = os.path.join(self.output_dir, output_name)
+        summary.to_parquet(output_file, index=False)
+
+        self.logger.info(f"Computed statistics of {len(summary)} sequences in {len(files)} files : {output_file}")
+        return summary
+
+
+def select_files(stats_file, query):
+    """
+    Selects the input files of a statistics summary that have at least one sequence matching a query.
+
+    Args:
+        stats_file (str): Path of a summary written by DatasetStats.collect.
+        query (str): A pandas.DataFrame.query expression over the summary columns,
+            e.g. 'right_hand_presence > 0.8'.
+
+    Returns:
+        list of str: The matching file paths, sorted.
+    """
+    summary = pd.read_parquet(stats_file)
+    if query:
+        summary = summary.query(query)
+    return sorted(summary['file_path'].unique().tolist())
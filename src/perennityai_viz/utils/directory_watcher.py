@@ -0,0 +1,239 @@
+import os
+import time
+import errno
+import select
+import struct
+import fnmatch
+import ctypes
+import ctypes.util
+
+from .tfrecord_reader import TFRECORD_PATTERNS
+from .array_reader import NPY_EXTENSIONS, ARROW_EXTENSIONS
+
+# File name patterns of the inputs watched by default
+WATCH_PATTERNS = ('*.csv', '*.parquet') + TFRECORD_PATTERNS + tuple('*' + ext for ext in NPY_EXTENSIONS + ARROW_EXTENSIONS)
+
+# inotify event masks, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# struct inotify_event header: wd, mask, cookie, len
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class Inotify:
+    """
+    A minimal non-blocking inotify watch of one directory, through the C library.
+
+    Attributes:
+        fd (int): The inotify file descriptor.
+    """
+
+    def __init__(self, path, mask=IN_WATCH_MASK):
+        """
+        Creates the inotify instance and watches a directory.
+
+        Args:
+            path (str): Directory to watch.
+            mask (int, optional): Events to watch. Defaults to modifications, creations and moves into the directory.
+
+        Raises:
+            OSError: If inotify is not available or the watch cannot be added.
+        """
+        libc_name = ctypes.util.find_library('c')
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask)) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch failed : {path}")
+
+    def read(self, timeout):
+        """
+        Waits for events.
+
+        Args:
+            timeout (float): Maximum wait in seconds.
+
+        Returns:
+            tuple: A tuple containing:
+                - list of str: File names of the events.
+                - bool: True if the kernel event queue overflowed and events were lost.
+        """
+        readable, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if not readable:
+            return [], False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+
+        names, overflow, pos = [], False, 0
+        while pos + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, pos)
+            pos += _EVENT_HEADER.size
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+            elif length:
+                names.append(os.fsdecode(data[pos:pos + length].rstrip(b'\0')))
+            pos += length
+        return names, overflow
+
+    def close(self):
+        """Closes the inotify file descriptor."""
+        os.close(self.fd)
+
+
+class DirectoryWatcher:
+    """
+    Detects new or changed input files of a directory once their writes have settled.
+
+    Changes are detected with inotify where available, and otherwise (or with use_inotify=False) by
+    rescanning the directory every poll interval. A changed file is pending until its size and
+    modification time have been stable for `settle_seconds`; every further change restarts the wait,
+    and any number of changes to the same file before it settles is reported once.
+
+    Attributes:
+        input_dir (str): The watched directory.
+        patterns (tuple of str): File name patterns of the watched files.
+        settle_seconds (float): Time a file must stay unchanged before it is reported.
+        poll_interval (float): Interval between rescans when polling.
+        logger (Log): Optional logger.
+    """
+
+    def __init__(self, input_dir, patterns=WATCH_PATTERNS, settle_seconds=2.0, poll_interval=1.0,
+                 use_inotify=True, include_existing=True, logger=None):
+        """
+        Initializes the DirectoryWatcher.
+
+        Args:
+            input_dir (str): Directory to watch.
+            patterns (tuple of str, optional): File name patterns of the watched files. Defaults to WATCH_PATTERNS.
+            settle_seconds (float, optional): Time a file must stay unchanged before it is reported. Defaults to 2.
+            poll_interval (float, optional): Interval between rescans when polling. Defaults to 1.
+            use_inotify (bool, optional): Use inotify when available. Defaults to True.
+            include_existing (bool, optional): Report the files already in the directory. Defaults to True.
+            logger (optional): Logger instance for logging. Defaults to None.
+
+        Raises:
+            ValueError: If the directory does not exist.
+        """
+        if not os.path.isdir(input_dir):
+            raise ValueError(f"Please, provide an existing input_dir to watch! {input_dir}")
+
+        self.input_dir = input_dir
+        self.patterns = tuple(patterns)
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.logger = logger
+
+        # Last reported (size, mtime_ns) of each file, and (signature, since) of files waiting to settle
+        self.reported = {}
+        self.pending = {}
+        self.last_scan = 0.0
+
+        self.inotify = None
+        if use_inotify:
+            try:
+                self.inotify = Inotify(input_dir)
+            except (OSError, AttributeError) as e:
+                if self.logger is not None:
+                    self.logger.warning(f"inotify unavailable, polling {input_dir} instead : {e}")
+
+        if include_existing:
+            self.scan()
+        else:
+            for path, signature in self._list_files():
+                self.reported[path] = signature
+
+    def matches(self, name):
+        """Tells whether a file name matches the watched patterns."""
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns)
+
+    def _list_files(self):
+        with os.scandir(self.input_dir) as entries:
+            for entry in entries:
+                if self.matches(entry.name) and entry.is_file():
+                    stat = entry.stat()
+                    yield entry.path, (stat.st_size, stat.st_mtime_ns)
+
+    def _update(self, path, signature, now):
+        if signature is None:
+            # Deleted before settling
+            self.pending.pop(path, None)
+            self.reported.pop(path, None)
+        elif signature == self.reported.get(path):
+            self.pending.pop(path, None)
+        elif path not in self.pending or self.pending[path][0] != signature:
+            self.pending[path] = (signature, now)
+
+    def _check(self, path, now):
+        try:
+            stat = os.stat(path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            signature = None
+        self._update(path, signature, now)
+
+    def scan(self):
+        """Rescans the whole directory for new or changed files."""
+        now = time.monotonic()
+        for path, signature in self._list_files():
+            self._update(path, signature, now)
+        self.last_scan = now
+
+    def poll(self, timeout=None):
+        """
+        Waits for changes and returns the files that have settled.
+
+        Args:
+            timeout (float, optional): Maximum wait in seconds. Defaults to the poll interval.
+
+        Returns:
+            list of str: Paths of the new or changed files that settled, sorted.
+        """
+        timeout = self.poll_interval if timeout is None else timeout
+        if self.pending:
+            # Wake up in time to report the next file that settles
+            next_settle = min(since for _, since in self.pending.values()) + self.settle_seconds
+            timeout = max(0.0, min(timeout, next_settle - time.monotonic()))
+
+        if self.inotify is not None:
+            names, overflow = self.inotify.read(timeout)
+            if overflow:
+                if self.logger is not None:
+                    self.logger.warning("inotify event queue overflowed, rescanning")
+                self.scan()
+            now = time.monotonic()
+            for name in set(names):
+                if self.matches(name):
+                    self._check(os.path.join(self.input_dir, name), now)
+        else:
+            time.sleep(timeout)
+            if time.monotonic() - self.last_scan >= self.poll_interval:
+                self.scan()
+
+        # Re-check pending files, so that a file still being written restarts its wait
+        now = time.monotonic()
+        for path in list(self.pending):
+            self._check(path, now)
+
+        settled = sorted(path for path, (_, since) in self.pending.items() if now - since >= self.settle_seconds)
+        for path in settled:
+            self.reported[path] = self.pending.pop(path)[0]
+        return settled
+
+    def close(self):
+        """Stops watching."""
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
@@ -0,0 +1,240 @@
+import re
+import os
+import json
+import time
+import fnmatch
+import functools
+
+from .tfrecord_reader import TFRECORD_PATTERNS
+from .array_reader import NPY_EXTENSIONS, ARROW_EXTENSIONS
+
+# File name patterns of every supported input format
+INPUT_PATTERNS = ('*.csv', '*.parquet') + TFRECORD_PATTERNS + tuple('*' + ext for ext in NPY_EXTENSIONS + ARROW_EXTENSIONS)
+
+# Compression suffixes completing the extension of a file, e.g. '.tfrecord.gz' or '.tar.gz'
+COMPRESSION_EXTENSIONS = ('.gz', '.zlib', '.bz2', '.xz')
+
+# A cached listing is only trusted once its directory's mtime is older than this when listed: changes made
+# within the same mtime tick (seconds on some network filesystems) would otherwise go unnoticed
+RACY_NANOSECONDS = 2 * 10 ** 9
+
+
+@functools.lru_cache(maxsize=64)
+def compile_patterns(patterns):
+    """Compiles fnmatch patterns into one regular expression, or None when there are none."""
+    if not patterns:
+        return None
+    return re.compile('|'.join(f'(?:{fnmatch.translate(pattern)})' for pattern in patterns))
+
+
+def matches_any(rel_path, patterns):
+    """
+    Tells whether a path relative to the discovery root, or its base name, matches any pattern.
+
+    Args:
+        rel_path (str): Relative path with '/' separators, e.g. 'participant/session/0.parquet'.
+        patterns (iterable of str): fnmatch patterns, e.g. '*.parquet' or 'participant/*'.
+
+    Returns:
+        bool: True when a pattern matches.
+    """
+    regex = compile_patterns(tuple(patterns))
+    if regex is None:
+        return False
+    return regex.match(rel_path) is not None or regex.match(rel_path.rsplit('/', 1)[-1]) is not None
+
+
+def get_output_stem(path, root=None):
+    """
+    Derives a flat output name from an input path that tells apart inputs of the same base name.
+
+    The name is the path relative to root, or the base name without root, with its directories and
+    extension joined by '_', e.g. 'participant_1/0001.csv' -> 'participant_1_0001_csv', so that x.csv and
+    x.parquet, or files of the same name in two subdirectories, never write to the same outputs. Compound
+    extensions of compressed files are kept whole, e.g. 'x.tfrecord.gz' -> 'x_tfrecord_gz'.
+
+    Args:
+        path (str): Path of the input file.
+        root (str, optional): Directory the inputs were found in. Defaults to None.
+
+    Returns:
+        str: The output stem.
+    """
+    rel_path = os.path.relpath(os.path.abspath(path), os.path.abspath(root)) if root else os.path.basename(path)
+    if rel_path.startswith(os.pardir):
+        rel_path = os.path.basename(path)
+    stem, extension = os.path.splitext(rel_path.replace(os.sep, '/'))
+    while extension in COMPRESSION_EXTENSIONS:
+        stem, inner_extension = os.path.splitext(stem)
+        extension = inner_extension + extension
+    return (stem + extension.replace('.', '_')).replace('/', '_')
+
+
+class FileDiscovery:
+    """
+    Lists the files of a directory tree in a single os.scandir pass, with include and exclude patterns.
+
+    Patterns are matched against the path relative to the root (with '/' separators) and against the
+    base name, so '*.parquet' matches at any depth and 'participant_1/*' selects a subtree. Excluded
+    directories are not entered. Results are sorted by path, so the order is stable across runs and
+    filesystems.
+
+    With a cache file, the listing of every directory is stored with its modification time. A directory
+    whose mtime is unchanged on the next run (files were neither added, removed nor renamed in it) is
+    not listed again: discovering an unchanged tree then costs one stat per directory instead of one
+    listing per directory, which dominates on large network filesystems.
+
+    Attributes:
+        include (tuple): Patterns of the files to list.
+        exclude (tuple): Patterns of the files and directories to skip.
+        recursive (bool): Descend into subdirectories.
+        cache_file (str): Path of the listing cache, or None to disable it.
+        logger (Log): Optional logger.
+        listings (dict): Cached listings by absolute directory path: [mtime_ns, listed_ns, files, subdirs].
+        scanned_dirs (int): Directories listed by the last find_files.
+        cached_dirs (int): Directories served from the cache by the last find_files.
+    """
+
+    def __init__(self, include=INPUT_PATTERNS, exclude=(), recursive=True, cache_file=None, logger=None):
+        """
+        Initializes the FileDiscovery and loads the listing cache.
+
+        Args:
+            include (iterable of str, optional): Patterns of the files to list. Defaults to every input format.
+            exclude (iterable of str, optional): Patterns of the files and directories to skip. Defaults to none.
+            recursive (bool, optional): Descend into subdirectories. Defaults to True.
+            cache_file (str, optional): Path of the listing cache. Defaults to None (no cache).
+            logger (optional): Logger instance for logging. Defaults to None.
+        """
+        self.include = tuple(include)
+        self.exclude = tuple(exclude or ())
+        self.recursive = recursive
+        self.cache_file = cache_file
+        self.logger = logger
+        self.listings = {}
+        self.dirty = False
+        self.scanned_dirs = 0
+        self.cached_dirs = 0
+
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r') as file:
+                    self.listings = json.load(file)
+            except (OSError, ValueError):
+                self.listings = {}
+
+    def list_directory(self, path):
+        """
+        Lists the files and subdirectories of one directory, from the cache when it is unchanged.
+
+        Args:
+            path (str): Absolute path of the directory.
+
+        Returns:
+            tuple: (file names, subdirectory names). Symbolic links to directories are not followed.
+
+        Raises:
+            OSError: If the directory cannot be read.
+        """
+        mtime_ns = os.stat(path).st_mtime_ns
+        cached = self.listings.get(path)
+        if cached is not None and cached[0] == mtime_ns and cached[1] - mtime_ns > RACY_NANOSECONDS:
+            self.cached_dirs += 1
+            return cached[2], cached[3]
+
+        listed_ns = time.time_ns()
+        files, subdirs = [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file():
+                        files.append(entry.name)
+                except OSError:
+                    continue
+        self.listings[path] = [mtime_ns, listed_ns, files, subdirs]
+        self.dirty = True
+        self.scanned_dirs += 1
+        return files, subdirs
+
+    def find_files(self, root):
+        """
+        Lists the files of a directory tree that match the include patterns and none of the exclude patterns.
+
+        Args:
+            root (str): The directory to search.
+
+        Returns:
+            list of str: Paths of the files (prefixed with root as given), sorted.
+        """
+        self.scanned_dirs = self.cached_dirs = 0
+        root_abs = os.path.abspath(root)
+        files = []
+        visited = set()
+        stack = [(root, root_abs, '')]
+        while stack:
+            path, path_abs, rel_dir = stack.pop()
+            try:
+                names, subdirs = self.list_directory(path_abs)
+            except OSError as e:
+                if self.logger is not None:
+                    self.logger.warning(f"Could not list directory : {path} : {e}")
+                continue
+            visited.add(path_abs)
+
+            for name in names:
+                rel_path = f'{rel_dir}/{name}' if rel_dir else name
+                if matches_any(rel_path, self.include) and not matches_any(rel_path, self.exclude):
+                    files.append(os.path.join(path, name))
+            if self.recursive:
+                for name in subdirs:
+                    rel_path = f'{rel_dir}/{name}' if rel_dir else name
+                    if not matches_any(rel_path, self.exclude):
+                        stack.append((os.path.join(path, name), os.path.join(path_abs, name), rel_path))
+
+        # Forget directories of this tree that were removed or are no longer visited
+        prefix = os.path.join(root_abs, '')
+        for path_abs in [p for p in self.listings if (p == root_abs or p.startswith(prefix)) and p not in visited]:
+            del self.listings[path_abs]
+            self.dirty = True
+        self.save()
+
+        if self.logger is not None:
+            self.logger.debug(f"Discovered {len(files)} files in {root} : {self.scanned_dirs} directories listed, "
+                              f"{self.cached_dirs} from cache")
+        return sorted(files)
+
+    def save(self):
+        """Writes the listing cache atomically, when it changed."""
+        if not self.cache_file or not self.dirty:
+            return
+        temp_file = f'{self.cache_file}.tmp-{os.getpid()}'
+        try:
+            with open(temp_file, 'w') as file:
+                json.dump(self.listings, file)
+            os.replace(temp_file, self.cache_file)
+            self.dirty = False
+        except OSError as e:
+            if self.logger is not None:
+                self.logger.warning(f"Could not write the listing cache : {e}")
+
+
+def find_files(root, include=INPUT_PATTERNS, exclude=(), recursive=True, cache_file=None, logger=None):
+    """
+    Lists the files of a directory tree matching include patterns, see FileDiscovery.
+
+    Args:
+        root (str): The directory to search.
+        include (iterable of str, optional): Patterns of the files to list. Defaults to every input format.
+        exclude (iterable of str, optional): Patterns of the files and directories to skip. Defaults to none.
+        recursive (bool, optional): Descend into subdirectories. Defaults to True.
+        cache_file (str, optional): Path of the listing cache. Defaults to None (no cache).
+        logger (optional): Logger instance for logging. Defaults to None.
+
+    Returns:
+        list of str: Paths of the files, sorted.
+    """
+    discovery = FileDiscovery(include=include, exclude=exclude, recursive=recursive, cache_file=cache_file,
+                              logger=logger)
+    return discovery.find_files(root)
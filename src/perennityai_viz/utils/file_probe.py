@@ -0,0 +1,228 @@
+import os
+import json
+import pandas as pd
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+
+from .tfrecord_reader import read_tfrecord_index, summarize_example
+from .array_reader import NPY_EXTENSIONS, ARROW_EXTENSIONS, read_array_file
+from .archive_reader import (is_member_path, open_input, stat_path, iter_member_records,
+                             read_array_member)
+
+
+def get_file_format(input_file):
+    """
+    Returns the data format of an input file from its name.
+
+    Args:
+        input_file (str): Path of the input file.
+
+    Returns:
+        str: 'tfrecord', 'csv', 'parquet', 'npy', 'arrow', or None for other files.
+    """
+    if '.tfrecord' in input_file:
+        return 'tfrecord'
+    elif input_file.endswith('.csv'):
+        return 'csv'
+    elif input_file.endswith('.parquet'):
+        return 'parquet'
+    elif input_file.endswith(NPY_EXTENSIONS):
+        return 'npy'
+    elif input_file.endswith(ARROW_EXTENSIONS):
+        return 'arrow'
+    return None
+
+
+def _summarize_frames(frames_df, num_frames):
+    """Builds the record entries of a CSV or Parquet file from its `phrase` and `sequence_id` columns."""
+    if 'sequence_id' not in frames_df.columns:
+        phrase = str(frames_df['phrase'].iloc[0]) if 'phrase' in frames_df.columns and len(frames_df) else ''
+        return [{'phrase': phrase, 'sequence_id': None, 'frames': num_frames}]
+
+    if 'phrase' not in frames_df.columns:
+        frames_df = frames_df.assign(phrase='')
+    groups = frames_df.groupby('sequence_id', sort=False)['phrase'].agg(['first', 'size'])
+    return [{'phrase': str(phrase), 'sequence_id': int(sequence_id), 'frames': int(size)}
+            for sequence_id, (phrase, size) in groups.iterrows()]
+
+
+class FileProbe:
+    """
+    Reads the metadata of landmark files without decoding their landmarks.
+
+    For each file, the format, the sequences (records) with their phrase, sequence id and frame count,
+    and the totals are read from the cheapest source available: the footer and the `phrase` and
+    `sequence_id` columns of a Parquet file, the `phrase` and `sequence_id` columns of a CSV file, or the
+    index sidecar of a TFRecord file (built by scanning the file when missing or stale). NumPy and Arrow
+    files hold one sequence, whose length comes from the array header and phrase from the metadata.
+    Archive members are read once, in memory, through the same readers.
+
+    Results are cached in a JSON file keyed by path and validated by size and modification time, so a
+    repeated probe of an unchanged dataset only stats the files. Phrases are indexed in memory for
+    case-insensitive search.
+
+    Attributes:
+        cache_file (str): Path of the cache file, or None to disable caching.
+        encoding (str): Encoding of the CSV files.
+        max_workers (int): Number of threads probing files concurrently.
+        logger (Log): Optional logger.
+        entries (dict): Probe results by path.
+    """
+
+    def __init__(self, cache_file=None, encoding='ISO-8859-1', max_workers=8, logger=None):
+        """
+        Initializes the FileProbe and loads the cache.
+
+        Args:
+            cache_file (str, optional): Path of the cache file. Defaults to None (no cache).
+            encoding (str, optional): Encoding of the CSV files. Defaults to 'ISO-8859-1'.
+            max_workers (int, optional): Number of threads probing files concurrently. Defaults to 8.
+            logger (optional): Logger instance for logging. Defaults to None.
+        """
+        self.cache_file = cache_file
+        self.encoding = encoding
+        self.max_workers = max_workers
+        self.logger = logger
+        self.entries = {}
+        self.phrase_index = None
+
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r') as file:
+                    self.entries = json.load(file)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def probe_file(self, input_file):
+        """
+        Reads the metadata of one file.
+
+        Args:
+            input_file (str): Path of a CSV, Parquet, TFRecord, NumPy or Arrow file, or of an archive member.
+
+        Returns:
+            dict: `file_path`, `format`, `size`, `mtime_ns`, `sequences`, `frames` and `records`, one
+                entry per sequence with its `phrase`, `sequence_id` and `frames`.
+
+        Raises:
+            ValueError: If the file format is not supported.
+        """
+        file_format = get_file_format(input_file)
+        stat = stat_path(input_file)
+        member = is_member_path(input_file)
+
+        if file_format == 'tfrecord' and member:
+            records = [summarize_example(record) for record in iter_member_records(input_file)]
+        elif file_format == 'tfrecord':
+            records = [{key: entry[key] for key in ('phrase', 'sequence_id', 'frames')}
+                       for entry in read_tfrecord_index(input_file)]
+        elif file_format == 'parquet':
+            parquet_file = pq.ParquetFile(open_input(input_file))
+            columns = [col for col in ('sequence_id', 'phrase') if col in parquet_file.schema_arrow.names]
+            frames_df = parquet_file.read(columns=columns).to_pandas() if columns else pd.DataFrame()
+            records = _summarize_frames(frames_df, parquet_file.metadata.num_rows)
+        elif file_format == 'csv':
+            source = open_input(input_file)
+            header = pd.read_csv(source, nrows=0, encoding=self.encoding).columns
+            columns = [col for col in ('sequence_id', 'phrase') if col in header]
+            if member:
+                source.seek(0)
+            frames_df = pd.read_csv(source, usecols=columns or [header[0]], encoding=self.encoding)
+            records = _summarize_frames(frames_df, len(frames_df))
+        elif file_format in ('npy', 'arrow'):
+            landmarks, metadata = read_array_member(input_file) if member else read_array_file(input_file)
+            records = [{'phrase': metadata['phrase'], 'sequence_id': metadata.get('sequence_id'),
+                        'frames': len(landmarks)}]
+        else:
+            raise ValueError(f"Unsupported input file format : {input_file}")
+
+        return {
+            'file_path': input_file,
+            'format': file_format,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sequences': len(records),
+            'frames': sum(record['frames'] for record in records),
+            'records': records,
+        }
+
+    def is_cached(self, input_file):
+        """Tells whether the cached entry of a file is up to date."""
+        entry = self.entries.get(input_file)
+        if entry is None:
+            return False
+        try:
+            stat = stat_path(input_file)
+        except (OSError, ValueError):
+            return False
+        return entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns
+
+    def probe(self, files):
+        """
+        Reads the metadata of many files, from the cache when up to date, and saves the cache.
+
+        Args:
+            files (list of str): Input files.
+
+        Returns:
+            list of dict: One entry per file that could be probed, in the order of files.
+        """
+        stale = [f for f in files if not self.is_cached(f)]
+        if stale:
+            with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+                futures = [executor.submit(self.probe_file, f) for f in stale]
+                for f, future in zip(stale, futures):
+                    try:
+                        self.entries[f] = future.result()
+                    except Exception as e:
+                        self.entries.pop(f, None)
+                        if self.logger is not None:
+                            self.logger.error(f"Failed probing : {f} : {e}")
+            self.phrase_index = None
+            self.save()
+        return [self.entries[f] for f in files if f in self.entries]
+
+    def save(self):
+        """Writes the cache file atomically."""
+        if not self.cache_file:
+            return
+        temp_file = f'{self.cache_file}.tmp-{os.getpid()}'
+        with open(temp_file, 'w') as file:
+            json.dump(self.entries, file)
+        os.replace(temp_file, self.cache_file)
+
+    def search(self, phrase, files=None, exact=False):
+        """
+        Finds the sequences whose phrase matches, across the probed files.
+
+        Args:
+            phrase (str): The phrase to search, case-insensitive.
+            files (list of str, optional): Restrict the search to these files. Defaults to every probed file.
+            exact (bool, optional): Match whole phrases instead of substrings. Defaults to False.
+
+        Returns:
+            list of dict: `file_path`, `record_index`, `phrase`, `sequence_id` and `frames` of every match,
+                by file path and record index.
+        """
+        if self.phrase_index is None:
+            # Lower-cased phrase -> (file path, record index) pairs, built once per probe
+            self.phrase_index = {}
+            for file_path, entry in self.entries.items():
+                for record_index, record in enumerate(entry['records']):
+                    self.phrase_index.setdefault(record['phrase'].lower(), []).append((file_path, record_index))
+
+        query = phrase.lower()
+        if exact:
+            keys = [query] if query in self.phrase_index else []
+        else:
+            keys = [key for key in self.phrase_index if query in key]
+
+        allowed = set(files) if files is not None else None
+        matches = []
+        for key in keys:
+            for file_path, record_index in self.phrase_index[key]:
+                if allowed is not None and file_path not in allowed:
+                    continue
+                record = self.entries[file_path]['records'][record_index]
+                matches.append(dict(record, file_path=file_path, record_index=record_index))
+        return sorted(matches, key=lambda match: (match['file_path'], match['record_index']))
@@ -0,0 +1,151 @@
+import os
+import numpy as np
+from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    DITHER_NONE = Image.Dither.NONE
+except AttributeError:  # Pillow < 9.1
+    DITHER_NONE = Image.NONE
+
+
+class GIFEncoder:
+    """
+    A GIF encoder for landmark frames that share a fixed background and a small set of drawing colors.
+
+    Instead of letting each frame pick its own adaptive palette, the encoder builds one global palette
+    from the known colors (plus the intensity ramps created by anti-aliasing and resizing against the
+    background) and maps every frame onto it. Because all frames share the palette, consecutive frames
+    can be compared index-by-index: Pillow then writes only the bounding rectangle that changed since the
+    previous frame (disposal method 1, "do not dispose"), and runs of identical frames are collapsed into
+    a single frame with a longer delay.
+
+    Attributes:
+        colors (list of tuple): RGB colors used by the drawings.
+        background (tuple): RGB background color of the frames.
+        fps (int): Playback speed of the animation.
+        max_workers (int): Number of threads used to quantize frames in parallel.
+        palette_image (PIL.Image.Image): 'P' mode image carrying the global palette.
+    """
+
+    def __init__(self, colors, background=(0, 0, 0), fps=3, max_workers=4, logger=None):
+        """
+        Initializes the GIFEncoder and builds the global palette.
+
+        Args:
+            colors (list of tuple): RGB colors used by the drawings.
+            background (tuple, optional): RGB background color. Defaults to black.
+            fps (int, optional): Frames per second. Defaults to 3.
+            max_workers (int, optional): Number of quantization threads. Defaults to 4.
+            logger (optional): Logger instance for logging. Defaults to None.
+        """
+        self.colors = [tuple(int(c) for c in color) for color in colors]
+        self.background = tuple(int(c) for c in background)
+        self.fps = fps
+        self.max_workers = max_workers
+        self.logger = logger
+        self.palette = self.build_palette(self.colors, self.background)
+
+        self.palette_image = Image.new('P', (1, 1))
+        flat_palette = [channel for color in self.palette for channel in color]
+        # Pad to 256 entries by repeating the background so padding never wins a nearest-color match
+        flat_palette += list(self.background) * (256 - len(self.palette))
+        self.palette_image.putpalette(flat_palette)
+
+    @staticmethod
+    def build_palette(colors, background, size=256):
+        """
+        Builds a palette holding the background, every drawing color and its blends towards the background.
+
+        Args:
+            colors (list of tuple): RGB drawing colors.
+            background (tuple): RGB background color.
+            size (int, optional): Maximum palette size. Defaults to 256.
+
+        Returns:
+            list of tuple: Unique RGB palette entries, background first.
+        """
+        colors = [color for color in dict.fromkeys(colors) if color != background]
+        palette = [background] + colors
+        if not colors:
+            return palette
+
+        # Spread the remaining entries evenly over the blend ramps of each color
+        levels = max(1, (size - len(palette)) // len(colors))
+        bg = np.array(background, dtype=np.float32)
+        for color in colors:
+            fg = np.array(color, dtype=np.float32)
+            for step in range(1, levels + 1):
+                blend = tuple(int(v) for v in np.rint(bg + (fg - bg) * step / (levels + 1)))
+                palette.append(blend)
+
+        return list(dict.fromkeys(palette))[:size]
+
+    def quantize(self, frame):
+        """
+        Maps an RGB frame onto the global palette without dithering.
+
+        Args:
+            frame (numpy.ndarray): RGB frame of shape (height, width, 3).
+
+        Returns:
+            PIL.Image.Image: The frame as a 'P' mode image.
+        """
+        image = Image.fromarray(np.ascontiguousarray(frame, dtype=np.uint8), mode='RGB')
+        return image.quantize(palette=self.palette_image, dither=DITHER_NONE)
+
+    def write(self, frames, out_file, durations=None):
+        """
+        Encodes frames into a GIF file.
+
+        Args:
+            frames (list of numpy.ndarray): RGB frames of identical shape.
+            out_file (str or file object): Destination path or binary file object.
+            durations (list of int, optional): Per-frame durations in milliseconds. Defaults to 1000 / fps.
+
+        Returns:
+            str or file object: The destination that was written.
+
+        Raises:
+            ValueError: If frames is empty or durations does not match the number of frames.
+        """
+        if len(frames) == 0:
+            raise ValueError("The frames list cannot be empty.")
+
+        if durations is None:
+            durations = [int(round(1000 / self.fps))] * len(frames)
+        if len(durations) != len(frames):
+            raise ValueError("durations must contain one entry per frame.")
+
+        # Quantization is independent per frame
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            indexed = list(executor.map(self.quantize, frames))
+
+        # Collapse runs of identical frames so that each unchanged stretch is stored once
+        images = [indexed[0]]
+        merged_durations = [durations[0]]
+        previous = np.asarray(indexed[0])
+        for image, duration in zip(indexed[1:], durations[1:]):
+            current = np.asarray(image)
+            if np.array_equal(current, previous):
+                merged_durations[-1] += duration
+                continue
+            images.append(image)
+            merged_durations.append(duration)
+            previous = current
+
+        images[0].save(
+            out_file,
+            format='GIF',
+            save_all=True,
+            append_images=images[1:],
+            duration=merged_durations if len(images) > 1 else merged_durations[0],
+            loop=0,
+            disposal=1,
+            optimize=False,
+        )
+
+        if self.logger is not None and isinstance(out_file, (str, os.PathLike)):
+            self.logger.debug(f"GIF written with {len(images)} of {len(frames)} frames : {out_file}")
+
+        return out_file
@@ -0,0 +1,351 @@
+import copy
+import bisect
+import collections
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from .landmark_layout import NUM_LANDMARKS
+from .dataset_stats import DatasetStats, iter_file_sequences
+
+
+def _decode_file(input_file, encoding, max_frames):
+    """Decodes every sequence of one file in a worker process. Module-level so it can be sent to the pool."""
+    sequences = []
+    for _, phrase, landmarks in iter_file_sequences(input_file, encoding=encoding):
+        if max_frames:
+            landmarks = landmarks[:max_frames]
+        # Memory-mapped inputs are materialized here, in the worker
+        sequences.append((phrase, np.ascontiguousarray(landmarks, dtype=np.float32)))
+    return sequences
+
+
+def pad_batch(sequences, pad_value=0.0, num_frames=None):
+    """
+    Stacks sequences of different lengths into one padded batch.
+
+    Args:
+        sequences (list): (phrase, landmarks) tuples, landmarks of shape (frames, 543, 3).
+        pad_value (float, optional): Value of the padding frames. Defaults to 0.0.
+        num_frames (int, optional): Frames of the batch. Defaults to the longest sequence.
+
+    Returns:
+        dict: A batch with:
+            - `landmarks`: float32 array of shape (batch, frames, 543, 3).
+            - `lengths`: int32 array of the number of frames of each sequence.
+            - `phrases`: list of the phrases.
+    """
+    lengths = np.array([len(landmarks) for _, landmarks in sequences], dtype=np.int32)
+    num_frames = num_frames or int(lengths.max(initial=0))
+    batch = np.empty((len(sequences), num_frames, NUM_LANDMARKS, 3), dtype=np.float32)
+    for i, (_, landmarks) in enumerate(sequences):
+        batch[i, :len(landmarks)] = landmarks
+        batch[i, len(landmarks):] = pad_value
+    return {'landmarks': batch, 'lengths': lengths, 'phrases': [phrase for phrase, _ in sequences]}
+
+
+class LandmarkDataset:
+    """
+    Streams padded batches of landmark sequences from a directory of CSV, Parquet, TFRecord, NumPy and Arrow files.
+
+    Files are decoded by a pool of worker processes (TensorFlow is not needed), `prefetch` files ahead
+    of the consumer. Sequences then go through an optional shuffle buffer and are grouped into batches,
+    optionally bucketed by length so that sequences of similar length are padded together. Each batch
+    is a dict of a float32 `landmarks` array of shape (batch, frames, 543, 3), padded to the longest
+    sequence of the batch, the int32 `lengths` of the sequences and their `phrases`. Missing landmarks
+    stay NaN, as in the input files.
+
+    Iterating the dataset yields NumPy batches, one epoch per iteration; with shuffling, the file order
+    and the shuffle buffer are reseeded every epoch. to_tf_dataset() and to_torch() wrap the same
+    iteration as a tf.data.Dataset and a PyTorch IterableDataset.
+
+    Attributes:
+        files (list of str): The input files.
+        batch_size (int): Number of sequences per batch.
+        max_frames (int): Sequences are truncated to this many frames, or None.
+        pad_to_max_frames (bool): Pad every batch to max_frames rather than its longest sequence.
+        bucket_boundaries (list of int): Upper frame counts of the length buckets, or None.
+        shuffle_buffer (int): Size of the shuffle buffer; 0 disables shuffling.
+        seed (int): Seed of the shuffling, or None.
+        num_workers (int): Number of decoding processes; 0 decodes in the calling process.
+        prefetch (int): Number of files decoded ahead of the consumer.
+        deterministic (bool): Produce the files' sequences in file order rather than decode completion order.
+        drop_remainder (bool): Drop the last, incomplete batches.
+        pad_value (float): Value of the padding frames.
+        encoding (str): Encoding of the CSV files.
+        logger (Log): Optional logger.
+    """
+
+    def __init__(self, input_dir='', files=None, batch_size=32, max_frames=None, pad_to_max_frames=False,
+                 bucket_boundaries=None, shuffle_buffer=0, seed=None, num_workers=None, prefetch=None,
+                 deterministic=True, drop_remainder=False, pad_value=0.0, encoding='ISO-8859-1', logger=None):
+        """
+        Initializes the LandmarkDataset.
+
+        Args:
+            input_dir (str, optional): Directory of input files.
+            files (list of str, optional): The input files, used instead of input_dir.
+            batch_size (int, optional): Number of sequences per batch. Defaults to 32.
+            max_frames (int, optional): Truncate sequences to this many frames. Defaults to None.
+            pad_to_max_frames (bool, optional): Pad every batch to max_frames, for fixed shapes. Defaults to False.
+            bucket_boundaries (list of int, optional): Frame counts separating the length buckets, e.g.
+                [32, 64, 128]. Batches only hold sequences of one bucket. Defaults to None (no bucketing).
+            shuffle_buffer (int, optional): Size of the shuffle buffer; the file order is shuffled too.
+                Defaults to 0 (no shuffling).
+            seed (int, optional): Seed of the shuffling. Defaults to None.
+            num_workers (int, optional): Number of decoding processes. Defaults to the CPU count; 0 decodes
+                in the calling process.
+            prefetch (int, optional): Number of files decoded ahead of the consumer. Defaults to twice the
+                number of workers.
+            deterministic (bool, optional): Produce sequences in file order. Defaults to True.
+            drop_remainder (bool, optional): Drop the last, incomplete batches. Defaults to False.
+            pad_value (float, optional): Value of the padding frames. Defaults to 0.0.
+            encoding (str, optional): Encoding of the CSV files. Defaults to 'ISO-8859-1'.
+            logger (optional): Logger instance for logging. Defaults to None.
+
+        Raises:
+            ValueError: If no input files are found, batch_size is not positive, or pad_to_max_frames is
+                set without max_frames.
+        """
+        self.files = list(files) if files is not None else DatasetStats.find_files(input_dir)
+        if not self.files:
+            raise ValueError("No CSV, Parquet, TFRecord, NumPy or Arrow input files found!")
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive!")
+        if pad_to_max_frames and not max_frames:
+            raise ValueError("pad_to_max_frames requires max_frames!")
+
+        self.batch_size = batch_size
+        self.max_frames = max_frames
+        self.pad_to_max_frames = pad_to_max_frames
+        self.bucket_boundaries = sorted(bucket_boundaries) if bucket_boundaries else None
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.num_workers = num_workers if num_workers is not None else multiprocessing.cpu_count()
+        self.prefetch = prefetch if prefetch is not None else 2 * max(self.num_workers, 1)
+        self.deterministic = deterministic
+        self.drop_remainder = drop_remainder
+        self.pad_value = pad_value
+        self.encoding = encoding
+        self.logger = logger
+
+        self.epoch = 0
+        self.executor = None
+
+    def __getstate__(self):
+        # The pool stays with the process that created it, e.g. when sent to DataLoader workers
+        state = self.__dict__.copy()
+        state['executor'] = None
+        return state
+
+    def _get_executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.num_workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+        return self.executor
+
+    def _decode(self, input_file, future=None):
+        try:
+            if future is not None:
+                return future.result()
+            return _decode_file(input_file, self.encoding, self.max_frames)
+        except Exception as e:
+            if self.logger is not None:
+                self.logger.error(f"Failed decoding : {input_file} : {e}")
+            return []
+
+    def iter_sequences(self, files=None):
+        """
+        Decodes the sequences of the input files, in parallel and ahead of the consumer.
+
+        Files that fail to decode are logged and skipped.
+
+        Args:
+            files (list of str, optional): The files to decode. Defaults to all input files.
+
+        Yields:
+            tuple: (phrase, landmarks) with float32 landmarks of shape (frames, 543, 3).
+        """
+        files = self.files if files is None else files
+        if self.num_workers == 0:
+            for f in files:
+                yield from self._decode(f)
+            return
+
+        executor = self._get_executor()
+        remaining = iter(files)
+        pending = collections.deque()
+        try:
+            while True:
+                # Keep the workers busy and `prefetch` files decoding ahead
+                while len(pending) < self.num_workers + self.prefetch:
+                    f = next(remaining, None)
+                    if f is None:
+                        break
+                    pending.append((f, executor.submit(_decode_file, f, self.encoding, self.max_frames)))
+                if not pending:
+                    return
+                if self.deterministic:
+                    f, future = pending.popleft()
+                else:
+                    wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+                    f, future = next(item for item in pending if item[1].done())
+                    pending.remove((f, future))
+                yield from self._decode(f, future)
+        finally:
+            # The consumer stopped early: drop the files not yet started
+            for _, future in pending:
+                future.cancel()
+
+    def _shuffle(self, sequences, rng):
+        buffer = []
+        for sequence in sequences:
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(sequence)
+                continue
+            i = rng.integers(len(buffer))
+            yield buffer[i]
+            buffer[i] = sequence
+        rng.shuffle(buffer)
+        yield from buffer
+
+    def _pad(self, sequences):
+        return pad_batch(sequences, pad_value=self.pad_value,
+                         num_frames=self.max_frames if self.pad_to_max_frames else None)
+
+    def set_epoch(self, epoch):
+        """
+        Sets the epoch of the next iteration, which seeds the shuffling.
+
+        Iterating advances the epoch by itself, but processes iterating copies of the dataset, such as
+        DataLoader workers, cannot advance it for the next epoch: call set_epoch() before each epoch, as
+        with torch's DistributedSampler.
+
+        Args:
+            epoch (int): The epoch number.
+        """
+        self.epoch = epoch
+
+    def iter_batches(self, files=None, epoch=None, worker_id=0):
+        """
+        Iterates the padded batches of one epoch.
+
+        Args:
+            files (list of str, optional): The files to read. Defaults to all input files.
+            epoch (int, optional): Epoch number, which seeds the shuffling. Defaults to the next epoch.
+            worker_id (int, optional): Index of the loader worker reading `files`, which also seeds the
+                shuffling so that workers do not shuffle alike. Defaults to 0.
+
+        Yields:
+            dict: A batch, see pad_batch.
+        """
+        if epoch is None:
+            epoch = self.epoch
+            self.epoch += 1
+        files = list(self.files if files is None else files)
+
+        if self.shuffle_buffer > 0:
+            rng = np.random.default_rng(None if self.seed is None else [self.seed, epoch, worker_id])
+            rng.shuffle(files)
+            sequences = self._shuffle(self.iter_sequences(files), rng)
+        else:
+            sequences = self.iter_sequences(files)
+
+        buckets = collections.defaultdict(list)
+        for sequence in sequences:
+            key = bisect.bisect_left(self.bucket_boundaries, len(sequence[1])) if self.bucket_boundaries else 0
+            bucket = buckets[key]
+            bucket.append(sequence)
+            if len(bucket) == self.batch_size:
+                yield self._pad(bucket)
+                buckets[key] = []
+        if not self.drop_remainder:
+            for key in sorted(buckets):
+                if buckets[key]:
+                    yield self._pad(buckets[key])
+
+    def __iter__(self):
+        return self.iter_batches()
+
+    def to_tf_dataset(self):
+        """
+        Wraps the batches as a prefetched tf.data.Dataset; every iteration over it is a new epoch.
+
+        Returns:
+            tf.data.Dataset: Dicts of `landmarks` (float32), `lengths` (int32) and `phrases` (string) tensors.
+        """
+        import tensorflow as tf
+
+        batch_size = self.batch_size if self.drop_remainder else None
+        num_frames = self.max_frames if self.pad_to_max_frames else None
+        signature = {
+            'landmarks': tf.TensorSpec((batch_size, num_frames, NUM_LANDMARKS, 3), tf.float32),
+            'lengths': tf.TensorSpec((batch_size,), tf.int32),
+            'phrases': tf.TensorSpec((batch_size,), tf.string),
+        }
+
+        def generator():
+            for batch in self:
+                yield {**batch, 'phrases': np.array(batch['phrases'], dtype=object)}
+
+        return tf.data.Dataset.from_generator(generator, output_signature=signature).prefetch(tf.data.AUTOTUNE)
+
+    def to_torch(self):
+        """
+        Wraps the batches as a PyTorch IterableDataset, to be loaded with `DataLoader(dataset, batch_size=None)`.
+
+        In DataLoader worker processes, each worker decodes its own share of the files in-process, so
+        num_workers of the DataLoader replaces the decoding pool. Workers iterate copies of the dataset, so
+        call set_epoch() on the returned dataset before each epoch to reseed the shuffling.
+
+        Returns:
+            torch.utils.data.IterableDataset: Dicts of `landmarks` and `lengths` tensors and `phrases` lists.
+        """
+        return _make_torch_dataset(self)
+
+    def close(self):
+        """Shuts down the decoding processes."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+# Subclass of torch.utils.data.IterableDataset, created on first use as PyTorch is optional
+_torch_dataset_class = None
+
+
+def _make_torch_dataset(dataset):
+    """Wraps a LandmarkDataset as a PyTorch IterableDataset. Module-level so the wrapper can be pickled."""
+    global _torch_dataset_class
+    if _torch_dataset_class is None:
+        import torch
+        from torch.utils.data import IterableDataset, get_worker_info
+
+        class TorchLandmarkDataset(IterableDataset):
+            def __init__(self, dataset):
+                self.dataset = dataset
+
+            def set_epoch(self, epoch):
+                self.dataset.set_epoch(epoch)
+
+            def __iter__(self):
+                # In DataLoader workers this is a copy, whose epoch the main process sets with set_epoch()
+                dataset = self.dataset
+                epoch = dataset.epoch
+                dataset.epoch += 1
+                worker = get_worker_info()
+                files, worker_id = None, 0
+                if worker is not None:
+                    dataset = copy.copy(dataset)
+                    dataset.num_workers = 0
+                    files, worker_id = dataset.files[worker.id::worker.num_workers], worker.id
+                for batch in dataset.iter_batches(files=files, epoch=epoch, worker_id=worker_id):
+                    yield {'landmarks': torch.from_numpy(batch['landmarks']),
+                           'lengths': torch.from_numpy(batch['lengths']),
+                           'phrases': batch['phrases']}
+
+            def __reduce__(self):
+                return _make_torch_dataset, (self.dataset,)
+
+        _torch_dataset_class = TorchLandmarkDataset
+    return _torch_dataset_class(dataset)
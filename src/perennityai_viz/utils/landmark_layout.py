@@ -0,0 +1,120 @@
+import numpy as np
+
+from .feature_header import get_header
+
+# Landmark columns of the feature header, without the leading 'frame' column.
+# Columns are interleaved per landmark: x_face_0, y_face_0, z_face_0, x_face_1, ...
+LANDMARK_COLUMNS = get_header().split('\t')[1:]
+
+NUM_LANDMARKS = len(LANDMARK_COLUMNS) // 3  # 543
+
+# Landmark index ranges of each body part, in header order
+PART_SLICES = {
+    'face': slice(0, 468),
+    'pose': slice(468, 501),
+    'right_hand': slice(501, 522),
+    'left_hand': slice(522, 543),
+}
+
+
+def to_landmark_array(seq_df):
+    """
+    Extracts the landmarks of a DataFrame as a (frames, 543, 3) float32 array.
+
+    Args:
+        seq_df (pandas.DataFrame): Frames with (at least) the landmark columns of the feature header.
+
+    Returns:
+        numpy.ndarray: Landmark coordinates of shape (frames, 543, 3).
+    """
+    values = seq_df[LANDMARK_COLUMNS].to_numpy(dtype=np.float32)
+    return values.reshape(len(seq_df), NUM_LANDMARKS, 3)
+
+
+def get_presence_mask(landmarks):
+    """
+    Computes which landmarks are present (x and y not NaN) in every frame.
+
+    Args:
+        landmarks (numpy.ndarray): Landmark coordinates of shape (frames, 543, 3).
+
+    Returns:
+        dict: Maps each body part name to a boolean array of shape (frames, part landmarks).
+    """
+    present = ~np.isnan(landmarks[:, :, :2]).any(axis=2)
+    return {part: present[:, part_slice] for part, part_slice in PART_SLICES.items()}
+
+
+def get_part_presence(presence_mask):
+    """
+    Reduces a landmark presence mask to body part presence.
+
+    Args:
+        presence_mask (dict): Output of get_presence_mask.
+
+    Returns:
+        dict: Maps each body part name to a boolean array of shape (frames,), True when any landmark is present.
+    """
+    return {part: mask.any(axis=1) for part, mask in presence_mask.items()}
+
+
+def _frames_within(frames, reference, tolerance):
+    """Returns, per frame, whether every coordinate is within tolerance of the reference (NaN in both counts as equal)."""
+    with np.errstate(invalid='ignore'):
+        same = (np.abs(frames - reference) <= tolerance) | (np.isnan(frames) & np.isnan(reference))
+    return same.reshape(len(frames), -1).all(axis=1)
+
+
+def find_frame_runs(landmarks, tolerance=0.0, scan_frames=16):
+    """
+    Finds the runs of consecutive frames with identical landmarks, within a tolerance.
+
+    Every frame of a run is within the tolerance of the run's first frame (its anchor), so slow motion
+    never merges into one run by small steps. Exact duplicates (tolerance 0) are found in a single
+    vectorized pass over consecutive frames. Otherwise, consecutive frames more than twice the tolerance
+    apart always start a new run; in between, each run is grown from its anchor over windows of doubling
+    size. Coordinates missing (NaN) in both frames compare equal, so stretches of empty frames form runs too.
+
+    Args:
+        landmarks (numpy.ndarray): Landmark coordinates of shape (frames, 543, 3).
+        tolerance (float, optional): Maximum absolute difference of every coordinate between a frame and
+            the first frame of its run. Defaults to 0.0 (exact duplicates).
+        scan_frames (int, optional): Frames compared with the anchor in the first window of a run.
+            Defaults to 16.
+
+    Returns:
+        tuple: A tuple containing:
+            - numpy.ndarray: Index of the first frame of every run.
+            - numpy.ndarray: Number of frames of every run.
+    """
+    num_frames = len(landmarks)
+    if num_frames == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    if tolerance == 0:
+        same = _frames_within(landmarks[1:], landmarks[:-1], 0.0)
+        starts = np.flatnonzero(np.concatenate(([True], ~same)))
+        return starts, np.diff(np.append(starts, num_frames))
+
+    # Frames that cannot share an anchor with their predecessor always start a run
+    breaks = np.append(np.flatnonzero(~_frames_within(landmarks[1:], landmarks[:-1], 2 * tolerance)) + 1, num_frames)
+    starts = []
+    start = 0
+    while start < num_frames:
+        starts.append(start)
+        end = breaks[np.searchsorted(breaks, start, side='right')]
+        anchor, position, window = landmarks[start], start + 1, scan_frames
+        while position < end:
+            stop = min(position + window, end)
+            differs = np.flatnonzero(~_frames_within(landmarks[position:stop], anchor, tolerance))
+            if len(differs):
+                end = position + differs[0]
+                break
+            position, window = stop, window * 2
+        start = end
+    starts = np.asarray(starts, dtype=np.int64)
+    return starts, np.diff(np.append(starts, num_frames))
+
+
+def expand_runs(items, counts):
+    """Repeats every item (e.g. the rendered frame of a run) by its count, restoring one item per frame."""
+    return [item for item, count in zip(items, counts) for _ in range(count)]
@@ -0,0 +1,330 @@
+import os
+import sys
+import json
+import time
+import queue
+import bisect
+import threading
+
+# Upper bounds, in seconds, of the stage latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Prefix of every exported metric name
+METRIC_PREFIX = 'perennityai_viz'
+
+# Destination of observe/increment calls in this process: a BatchMetrics, a QueueSink, or None
+_sink = None
+
+
+def set_metrics_sink(sink):
+    """
+    Sets where the metrics recorded in this process go.
+
+    Args:
+        sink: A BatchMetrics (in the process that exports), a QueueSink (in worker processes), or None
+            to stop recording.
+    """
+    global _sink
+    _sink = sink
+
+
+def observe(stage, seconds):
+    """Records the latency of a processing stage, e.g. 'read', 'render' or 'encode'. No-op without a sink."""
+    if _sink is not None:
+        _sink.observe(stage, seconds)
+
+
+def increment(name, value=1):
+    """Increments a counter, e.g. 'frames'. No-op without a sink."""
+    if _sink is not None:
+        _sink.increment(name, value)
+
+
+def get_rss():
+    """
+    Returns the resident set size of this process.
+
+    Returns:
+        int: Bytes, read from /proc where available, otherwise the peak RSS, or 0 if unknown.
+    """
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+def format_duration(seconds):
+    """Formats seconds as H:MM:SS."""
+    seconds = int(max(seconds, 0))
+    return f'{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}'
+
+
+class QueueSink:
+    """
+    Forwards the metrics of a worker process to the exporting process through a multiprocessing queue.
+
+    Only small tuples are sent, and a full queue drops the update rather than blocking the worker.
+
+    Attributes:
+        queue (multiprocessing.Queue): The aggregation channel, see BatchMetrics.queue.
+    """
+
+    def __init__(self, metrics_queue):
+        self.queue = metrics_queue
+        self.pid = os.getpid()
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            pass
+
+    def observe(self, stage, seconds):
+        self._put(('observe', stage, seconds))
+
+    def increment(self, name, value=1):
+        self._put(('increment', name, value))
+
+    def report_rss(self):
+        """Sends the current RSS of this worker."""
+        self._put(('rss', self.pid, get_rss()))
+
+
+class BatchMetrics:
+    """
+    Aggregates the throughput and resource metrics of a batch run and exports them periodically.
+
+    Counters (processed, failed and skipped files, rendered frames), the queue depth, stage latency
+    histograms and the RSS of every worker process are kept here. Worker processes send their updates
+    through `queue` (see QueueSink); this process records directly. A background thread drains the queue
+    and, every `interval` seconds and at stop(), writes a Prometheus text-format file (e.g. for the node
+    exporter's textfile collector), optionally a JSON snapshot, and prints a progress line with the ETA.
+    No server is involved.
+
+    Attributes:
+        output_dir (str): Directory of the metrics files.
+        name (str): Base name of the metrics files, e.g. 'metrics' for metrics.prom and metrics.json.
+        interval (float): Seconds between exports.
+        write_json (bool): Also write the JSON snapshot.
+        progress (bool): Print a progress line at every export.
+        total (int): Number of files expected, for the progress and ETA, or None.
+        queue (multiprocessing.Queue): Aggregation channel of the worker processes.
+    """
+
+    def __init__(self, output_dir, name='metrics', interval=10.0, write_json=False, progress=True, logger=None):
+        """
+        Initializes the BatchMetrics.
+
+        Args:
+            output_dir (str): Directory of the metrics files.
+            name (str, optional): Base name of the metrics files. Defaults to 'metrics'.
+            interval (float, optional): Seconds between exports. Defaults to 10.
+            write_json (bool, optional): Also write a JSON snapshot. Defaults to False.
+            progress (bool, optional): Print a progress line at every export. Defaults to True.
+            logger (optional): Logger instance for logging. Defaults to None.
+        """
+        self.output_dir = output_dir
+        self.name = name
+        self.interval = interval
+        self.write_json = write_json
+        self.progress = progress
+        self.logger = logger
+        self.total = None
+        self.queue = None
+
+        self.lock = threading.Lock()
+        self.start_time = time.monotonic()
+        self.counters = {'processed': 0, 'failed': 0, 'skipped': 0, 'frames': 0, 'rendered_frames': 0}
+        self.queue_depth = 0
+        # stage -> [bucket counts, sum, count]
+        self.histograms = {}
+        self.worker_rss = {}
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def observe(self, stage, seconds):
+        """Records the latency of a processing stage."""
+        with self.lock:
+            histogram = self.histograms.setdefault(stage, [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0])
+            histogram[0][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def increment(self, name, value=1):
+        """Increments a counter: 'processed', 'failed', 'skipped', 'frames', 'rendered_frames', or a new one."""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_queue_depth(self, depth):
+        """Sets the number of inputs read or submitted but not yet completed."""
+        self.queue_depth = depth
+
+    def set_total(self, total):
+        """Sets the number of files expected, for the progress line and the ETA."""
+        self.total = total
+
+    def start(self, context=None):
+        """
+        Starts the export thread.
+
+        Args:
+            context (multiprocessing context, optional): Context of the worker processes. When given,
+                `queue` is created for them. Defaults to None (no workers).
+
+        Returns:
+            BatchMetrics: self.
+        """
+        if context is not None and self.queue is None:
+            self.queue = context.Queue(maxsize=10000)
+        self.start_time = time.monotonic()
+        set_metrics_sink(self)
+        self.thread = threading.Thread(target=self._run, name='metrics-exporter', daemon=True)
+        self.thread.start()
+        return self
+
+    def _drain(self):
+        while self.queue is not None:
+            try:
+                message = self.queue.get_nowait()
+            except (queue.Empty, OSError, ValueError):
+                return
+            kind = message[0]
+            if kind == 'observe':
+                self.observe(message[1], message[2])
+            elif kind == 'increment':
+                self.increment(message[1], message[2])
+            elif kind == 'rss':
+                self.worker_rss[message[1]] = message[2]
+
+    def _run(self):
+        next_export = time.monotonic() + self.interval
+        while not self.stop_event.wait(0.2):
+            self._drain()
+            if time.monotonic() >= next_export:
+                self.export()
+                next_export = time.monotonic() + self.interval
+
+    def snapshot(self):
+        """
+        Returns the current metrics.
+
+        Returns:
+            dict: Counters, rates, ETA, queue depth, stage histograms and worker RSS.
+        """
+        with self.lock:
+            elapsed = time.monotonic() - self.start_time
+            counters = dict(self.counters)
+            histograms = {stage: {'buckets': list(buckets), 'sum': total, 'count': count}
+                          for stage, (buckets, total, count) in self.histograms.items()}
+        completed = counters['processed'] + counters['failed']
+        files_per_second = completed / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - completed - counters['skipped'] if self.total is not None else None
+        return {
+            'elapsed_seconds': elapsed,
+            'total': self.total,
+            'counters': counters,
+            'files_per_second': files_per_second,
+            'frames_per_second': counters['frames'] / elapsed if elapsed > 0 else 0.0,
+            'eta_seconds': remaining / files_per_second if remaining is not None and files_per_second > 0 else None,
+            'queue_depth': self.queue_depth,
+            'stages': histograms,
+            'worker_rss_bytes': {**self.worker_rss, os.getpid(): get_rss()},
+        }
+
+    def to_prometheus(self, snapshot):
+        """
+        Formats a snapshot in the Prometheus text exposition format.
+
+        Args:
+            snapshot (dict): A snapshot, see snapshot.
+
+        Returns:
+            str: The metrics text.
+        """
+        p = METRIC_PREFIX
+        lines = [f'# TYPE {p}_files_total counter']
+        for status in ('processed', 'failed', 'skipped'):
+            lines.append(f'{p}_files_total{{status="{status}"}} {snapshot["counters"][status]}')
+        lines += [
+            f'# TYPE {p}_frames_total counter',
+            f'{p}_frames_total {snapshot["counters"]["frames"]}',
+            f'# TYPE {p}_rendered_frames_total counter',
+            f'{p}_rendered_frames_total {snapshot["counters"]["rendered_frames"]}',
+            f'# TYPE {p}_files_per_second gauge',
+            f'{p}_files_per_second {snapshot["files_per_second"]:.6g}',
+            f'# TYPE {p}_frames_per_second gauge',
+            f'{p}_frames_per_second {snapshot["frames_per_second"]:.6g}',
+            f'# TYPE {p}_queue_depth gauge',
+            f'{p}_queue_depth {snapshot["queue_depth"]}',
+            f'# TYPE {p}_elapsed_seconds gauge',
+            f'{p}_elapsed_seconds {snapshot["elapsed_seconds"]:.3f}',
+        ]
+        if snapshot['total'] is not None:
+            lines += [f'# TYPE {p}_files_expected gauge', f'{p}_files_expected {snapshot["total"]}']
+
+        lines.append(f'# TYPE {p}_stage_seconds histogram')
+        for stage, histogram in sorted(snapshot['stages'].items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), histogram['buckets']):
+                cumulative += count
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]:.6f}')
+            lines.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+
+        lines.append(f'# TYPE {p}_worker_rss_bytes gauge')
+        for pid, rss in sorted(snapshot['worker_rss_bytes'].items()):
+            lines.append(f'{p}_worker_rss_bytes{{pid="{pid}"}} {rss}')
+        return '\n'.join(lines) + '\n'
+
+    def format_progress(self, snapshot):
+        """Formats the progress line of a snapshot."""
+        counters = snapshot['counters']
+        done = counters['processed'] + counters['failed'] + counters['skipped']
+        if snapshot['total']:
+            progress = f'{done}/{snapshot["total"]} files ({done / snapshot["total"]:.1%})'
+        else:
+            progress = f'{done} files'
+        eta = format_duration(snapshot['eta_seconds']) if snapshot['eta_seconds'] is not None else '?'
+        return (f"Progress: {progress}, {snapshot['files_per_second']:.2f} files/s, "
+                f"{snapshot['frames_per_second']:.1f} frames/s, queue {snapshot['queue_depth']}, "
+                f"failed {counters['failed']}, elapsed {format_duration(snapshot['elapsed_seconds'])}, ETA {eta}")
+
+    def _write(self, file_name, text):
+        path = os.path.join(self.output_dir, file_name)
+        temp_file = f'{path}.tmp-{os.getpid()}'
+        with open(temp_file, 'w') as file:
+            file.write(text)
+        os.replace(temp_file, path)
+
+    def export(self):
+        """Writes the metrics files and prints the progress line."""
+        snapshot = self.snapshot()
+        try:
+            self._write(f'{self.name}.prom', self.to_prometheus(snapshot))
+            if self.write_json:
+                self._write(f'{self.name}.json', json.dumps(snapshot, indent=2))
+        except OSError as e:
+            if self.logger is not None:
+                self.logger.warning(f"Could not write metrics : {e}")
+        if self.progress:
+            print(self.format_progress(snapshot), file=sys.stderr, flush=True)
+        return snapshot
+
+    def stop(self):
+        """Stops the export thread, drains the workers' updates and writes the final metrics."""
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+        self._drain()
+        if _sink is self:
+            set_metrics_sink(None)
+        return self.export()
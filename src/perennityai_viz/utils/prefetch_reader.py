@@ -0,0 +1,130 @@
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+from .archive_reader import stat_path
+
+
+def get_nbytes(result):
+    """
+    Estimates the memory held by a read result.
+
+    Args:
+        result: A pandas DataFrame, a NumPy array, or a tuple/list of them.
+
+    Returns:
+        int: The number of bytes, 0 for unknown types.
+    """
+    if isinstance(result, (tuple, list)):
+        return sum(get_nbytes(item) for item in result)
+    if hasattr(result, 'memory_usage'):
+        return int(result.memory_usage(index=False).sum())
+    return int(getattr(result, 'nbytes', 0))
+
+
+def get_file_size(item):
+    """Returns the size of a file or archive member, or 0 when it is neither."""
+    try:
+        return stat_path(item).st_size
+    except (OSError, TypeError, ValueError):
+        return 0
+
+
+class PrefetchReader:
+    """
+    Reads the next inputs on background threads while the current one is being processed.
+
+    Up to `depth` reads are in flight or waiting in a bounded queue. When a memory budget is given,
+    no new read is started while the results held in the queue (or, before they complete, the on-disk
+    size of the pending inputs) would exceed it; the next input is always read, so a single input
+    larger than the budget still goes through. Results are produced in input order.
+
+    With `hold_results`, the results already produced stay counted against the budget until the
+    consumer calls release(), so inputs handed on (e.g. submitted to a process pool) share the budget
+    with the read-ahead queue; within_budget() tells the consumer when to stop handing on more.
+
+    Attributes:
+        read_fn (callable): Function reading one input.
+        items (list): The inputs to read.
+        depth (int): Maximum number of inputs read ahead.
+        memory_budget (int): Maximum bytes held by read-ahead results, or None for no limit.
+        hold_results (bool): Whether produced results are counted until released.
+        held (dict): Bytes of the produced, unreleased results, by input.
+        logger (Log): Optional logger.
+    """
+
+    def __init__(self, read_fn, items, depth=2, memory_budget_mb=None, hold_results=False, logger=None):
+        """
+        Initializes the PrefetchReader.
+
+        Args:
+            read_fn (callable): Function reading one input and returning its decoded content.
+            items (iterable): The inputs to read.
+            depth (int, optional): Maximum number of inputs read ahead. Defaults to 2.
+            memory_budget_mb (float, optional): Memory budget of the read-ahead queue in megabytes.
+                Defaults to None (no limit).
+            hold_results (bool, optional): Count the produced results against the budget until
+                release() is called for them. Defaults to False.
+            logger (optional): Logger instance for logging. Defaults to None.
+        """
+        self.read_fn = read_fn
+        self.items = list(items)
+        self.depth = max(1, depth)
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024) if memory_budget_mb else None
+        self.hold_results = hold_results
+        self.held = {}
+        self.lock = threading.Lock()
+        self.logger = logger
+
+    def release(self, item):
+        """Stops counting the result of an input against the memory budget, see hold_results."""
+        with self.lock:
+            self.held.pop(item, None)
+
+    def within_budget(self):
+        """Tells whether the produced, unreleased results leave room in the memory budget."""
+        if self.memory_budget is None:
+            return True
+        with self.lock:
+            return sum(self.held.values()) < self.memory_budget
+
+    def _held_bytes(self, queue):
+        # Completed reads count their actual size, pending ones their on-disk size
+        with self.lock:
+            held = sum(self.held.values())
+        return held + sum(get_nbytes(future.result()) if future.done() and not future.exception() else size
+                          for _, future, size in queue)
+
+    def __iter__(self):
+        """
+        Reads the inputs ahead of the consumer.
+
+        Yields:
+            tuple: (item, result, error) in input order. `error` is the raised exception or None.
+        """
+        queue = collections.deque()
+        next_idx = 0
+        with ThreadPoolExecutor(max_workers=self.depth) as executor:
+            while next_idx < len(self.items) or queue:
+                # Fill the queue up to the depth and the memory budget
+                while next_idx < len(self.items) and len(queue) < self.depth:
+                    size = get_file_size(self.items[next_idx])
+                    if (queue and self.memory_budget is not None
+                            and self._held_bytes(queue) + size > self.memory_budget):
+                        break
+                    item = self.items[next_idx]
+                    queue.append((item, executor.submit(self.read_fn, item), size))
+                    next_idx += 1
+
+                item, future, _ = queue.popleft()
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if self.logger is not None:
+                        self.logger.error(f"Failed reading : {item} : {e}")
+                    yield item, None, e
+                    continue
+                if self.hold_results:
+                    with self.lock:
+                        self.held[item] = get_nbytes(result)
+                yield item, result, None
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+
+from .archive_reader import is_member_path, read_member, stat_path
+
+
+def get_file_hash(path, chunk_size=1024 * 1024):
+    """
+    Computes the SHA-1 digest of a file's content.
+
+    Args:
+        path (str): Path of the file or archive member.
+        chunk_size (int, optional): Read size in bytes. Defaults to 1 MB.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    if is_member_path(path):
+        return hashlib.sha1(read_member(path)).hexdigest()
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_temp_path(out_file):
+    """
+    Returns a temporary path next to out_file that keeps its extension, for atomic writes.
+
+    The path is unique to each call, not only to the process, so concurrent writes of the same output
+    (e.g. from the threads of an AsyncVisualizer) never share a temporary file.
+
+    Args:
+        out_file (str): The final output path.
+
+    Returns:
+        str: The temporary path.
+    """
+    root, extension = os.path.splitext(out_file)
+    return f'{root}.tmp-{os.getpid()}-{uuid.uuid4().hex}{extension}'
+
+
+class RunManifest:
+    """
+    A JSON-lines manifest of batch outputs that makes batch runs incremental and resumable.
+
+    Every processed input appends one line with its path, size, modification time (or content hash),
+    the render settings, its output path and status. When the manifest is loaded, the last line of each
+    input wins. An input is up to date when its last entry succeeded with the same settings, the input
+    has not changed since, and the output file still exists.
+
+    Attributes:
+        manifest_file (str): Path of the manifest file.
+        use_hash (bool): Whether inputs are compared by content hash instead of size and mtime.
+        entries (dict): Last entry of each input path.
+    """
+
+    def __init__(self, output_dir, use_hash=False, name='manifest.jsonl'):
+        """
+        Initializes the RunManifest and loads existing entries.
+
+        Args:
+            output_dir (str): Directory holding the manifest.
+            use_hash (bool, optional): Compare inputs by content hash. Defaults to False.
+            name (str, optional): File name of the manifest. Defaults to 'manifest.jsonl'.
+        """
+        self.manifest_file = os.path.join(output_dir, name)
+        self.use_hash = use_hash
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        """Loads the manifest, ignoring a truncated last line left by an interrupted run."""
+        self.entries = {}
+        if not os.path.exists(self.manifest_file):
+            return
+        with open(self.manifest_file, 'r') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.entries[entry['input_file']] = entry
+
+    def get_fingerprint(self, input_file):
+        """
+        Describes the current state of an input file.
+
+        Args:
+            input_file (str): Path of the input file.
+
+        Returns:
+            dict: `size` and `mtime_ns`, plus `sha1` when hashing is enabled.
+        """
+        stat = stat_path(input_file)
+        fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        if self.use_hash:
+            fingerprint['sha1'] = get_file_hash(input_file)
+        return fingerprint
+
+    def is_up_to_date(self, input_file, settings, output_file=None):
+        """
+        Tells whether an input's output is up to date.
+
+        Args:
+            input_file (str): Path of the input file.
+            settings (dict): Render settings of the current run.
+            output_file (str, optional): Path the input's output is written to in the current run. An entry
+                recorded with another output (e.g. one shared with another input under an older naming)
+                is not up to date. Defaults to None (any output).
+
+        Returns:
+            bool: True if the input can be skipped.
+        """
+        entry = self.entries.get(input_file)
+        if entry is None or entry.get('status') != 'done' or entry.get('settings') != settings:
+            return False
+        if not entry.get('output_file') or not os.path.exists(entry['output_file']):
+            return False
+        if output_file is not None and os.path.abspath(entry['output_file']) != os.path.abspath(output_file):
+            return False
+        try:
+            fingerprint = self.get_fingerprint(input_file)
+        except (OSError, ValueError):
+            return False
+        if self.use_hash and 'sha1' in entry:
+            return entry['sha1'] == fingerprint['sha1']
+        return entry.get('size') == fingerprint['size'] and entry.get('mtime_ns') == fingerprint['mtime_ns']
+
+    def record(self, input_file, settings, output_file=None, status='done', error=None, fingerprint=None):
+        """
+        Appends the outcome of an input to the manifest.
+
+        Args:
+            input_file (str): Path of the input file.
+            settings (dict): Render settings of the run.
+            output_file (str, optional): Path of the output file.
+            status (str, optional): 'done' or 'failed'. Defaults to 'done'.
+            error (str, optional): Error message of a failed input.
+            fingerprint (dict, optional): Fingerprint of the input taken before it was read (see
+                get_fingerprint), so an input rewritten during its render is not recorded as up to date.
+                Defaults to the input's current fingerprint.
+
+        Returns:
+            dict: The recorded entry.
+        """
+        entry = {'input_file': input_file}
+        try:
+            entry.update(fingerprint if fingerprint is not None else self.get_fingerprint(input_file))
+        except (OSError, ValueError):
+            pass
+        entry.update({
+            'settings': settings,
+            'output_file': output_file,
+            'status': status,
+            'error': error,
+            'timestamp': time.time(),
+        })
+
+        with open(self.manifest_file, 'a') as file:
+            file.write(json.dumps(entry) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        self.entries[input_file] = entry
+        return entry
@@ -0,0 +1,128 @@
+import os
+import threading
+import collections
+
+from .prefetch_reader import get_nbytes
+from .archive_reader import stat_path
+
+
+def get_cache_key(path, record_index=None):
+    """
+    Builds the cache key of a file (or one record of it) from its path and modification time.
+
+    Args:
+        path (str): Path of the input file or archive member.
+        record_index (int, optional): Index of the record in the file, or None for the whole file.
+
+    Returns:
+        tuple: (absolute path, mtime_ns, size, record_index). A rewritten file gets a new key.
+    """
+    stat = stat_path(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size, record_index
+
+
+class SequenceCache:
+    """
+    A least-recently-used cache of decoded sequences, bounded by the bytes they hold.
+
+    Values are stored as returned by the loader and shared by every hit, so callers must not modify
+    them in place. A value larger than the whole budget is returned but not cached. Thread-safe.
+
+    Attributes:
+        max_bytes (int): Maximum bytes held by the cached values.
+        nbytes (int): Bytes currently held.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that loaded the value.
+        evictions (int): Number of values evicted to stay within the budget.
+    """
+
+    def __init__(self, max_bytes):
+        """
+        Initializes the SequenceCache.
+
+        Args:
+            max_bytes (int): Maximum bytes held by the cached values; 0 disables caching.
+        """
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached value of a key and marks it most recently used, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """
+        Caches a value, evicting the least recently used ones to stay within the budget.
+
+        Args:
+            key (tuple): The cache key, see get_cache_key.
+            value: The decoded sequence, e.g. a (DataFrame, phrase) tuple.
+        """
+        nbytes = get_nbytes(value)
+        with self.lock:
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key)[1]
+            if nbytes > self.max_bytes:
+                return
+            while self.entries and self.nbytes + nbytes > self.max_bytes:
+                _, (_, evicted_nbytes) = self.entries.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+                self.evictions += 1
+            self.entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+
+    def get_or_load(self, path, load_fn, record_index=None):
+        """
+        Returns the decoded sequence of a file (or record) from the cache, loading it on a miss.
+
+        Args:
+            path (str): Path of the input file.
+            load_fn (callable): Called without arguments to decode the sequence on a miss.
+            record_index (int, optional): Index of the record in the file, or None for the whole file.
+
+        Returns:
+            The cached or loaded value.
+        """
+        key = get_cache_key(path, record_index)
+        value = self.get(key)
+        if value is None:
+            value = load_fn()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Empties the cache; statistics are kept."""
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        """
+        Returns the cache statistics.
+
+        Returns:
+            dict: `hits`, `misses`, `hit_rate`, `evictions`, `entries`, `nbytes` and `max_bytes`.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'nbytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,148 @@
+import os
+import glob
+import json
+import zlib
+
+from .run_manifest import RunManifest
+from .archive_reader import split_member_path, stat_path
+
+
+def get_shard_suffix(num_shards, shard_index):
+    """
+    Returns the file name suffix of a shard's outputs.
+
+    Args:
+        num_shards (int): Total number of shards.
+        shard_index (int): Index of the shard.
+
+    Returns:
+        str: '' for an unsharded run, otherwise e.g. '-shard-002-of-008'.
+    """
+    if num_shards <= 1:
+        return ''
+    return f'-shard-{shard_index:03d}-of-{num_shards:03d}'
+
+
+def get_shard_key(path, root=None):
+    """
+    Returns the key a file is sharded by: its path relative to the input root, with '/' separators.
+
+    The key does not depend on where the shared filesystem is mounted or on whether the root was given
+    as a relative or absolute path, so every node computes the same key. Archive members are keyed by
+    their archive.
+
+    Args:
+        path (str): Path of an input file or archive member.
+        root (str, optional): The input directory. Defaults to None (the normalized path itself).
+
+    Returns:
+        str: The shard key.
+    """
+    path = split_member_path(path)[0]
+    if root:
+        path = os.path.relpath(os.path.abspath(path), os.path.abspath(root))
+    return os.path.normpath(path).replace(os.sep, '/')
+
+
+def shard_files(files, num_shards, shard_index, balance_by_size=False, root=None):
+    """
+    Selects the files of one shard, identically on every node that sees the same files.
+
+    By default a file belongs to shard `crc32(key) % num_shards`, where the key is its path relative to
+    `root` (see get_shard_key), so adding or removing files does not move the other files between shards.
+    With `balance_by_size`, files are assigned largest first to the shard with the smallest total size
+    (ties broken by key and shard index), which evens out the work but depends on the whole file list.
+    The members of an archive all go to the shard of the archive, so each archive is read by a single node.
+
+    Args:
+        files (list of str): All input files.
+        num_shards (int): Total number of shards.
+        shard_index (int): Index of the shard to select, in [0, num_shards).
+        balance_by_size (bool, optional): Balance shards by file size. Defaults to False.
+        root (str, optional): The input directory the keys are relative to. Defaults to None.
+
+    Returns:
+        list of str: The files of the shard, sorted by path.
+
+    Raises:
+        ValueError: If shard_index is out of range.
+    """
+    if num_shards <= 1:
+        return sorted(files)
+    if not 0 <= shard_index < num_shards:
+        raise ValueError(f"shard_index must be in [0, {num_shards}), got {shard_index}")
+
+    # Archive members are assigned by archive
+    groups = {}
+    for f in sorted(set(files)):
+        groups.setdefault(get_shard_key(f, root), []).append(f)
+    if not balance_by_size:
+        return sorted(f for key, group in groups.items()
+                      if zlib.crc32(key.encode('utf-8')) % num_shards == shard_index for f in group)
+
+    sizes = {key: sum(stat_path(f).st_size for f in group) for key, group in groups.items()}
+    loads = [0] * num_shards
+    selected = []
+    for key in sorted(groups, key=lambda key: (-sizes[key], key)):
+        target = min(range(num_shards), key=lambda i: (loads[i], i))
+        loads[target] += sizes[key]
+        if target == shard_index:
+            selected.extend(groups[key])
+    return sorted(selected)
+
+
+def merge_shard_outputs(output_dir):
+    """
+    Merges the per-shard manifests and batch reports of a sharded run.
+
+    `manifest-shard-*.jsonl` files are merged into `manifest.jsonl` (keeping the latest entry of each
+    input, including entries already in `manifest.jsonl`), and `batch_report-shard-*.json` files into
+    `batch_report.json`, with counts and busy times summed, the wall time of the slowest shard and the
+    scheduler efficiency over the workers of all shards.
+
+    Args:
+        output_dir (str): Directory holding the shard outputs.
+
+    Returns:
+        dict: The merged batch report.
+    """
+    entries = {}
+    manifest_files = [os.path.join(output_dir, 'manifest.jsonl')]
+    manifest_files += sorted(glob.glob(os.path.join(output_dir, 'manifest-shard-*.jsonl')))
+    for manifest_file in manifest_files:
+        if not os.path.exists(manifest_file):
+            continue
+        manifest = RunManifest(output_dir, name=os.path.basename(manifest_file))
+        for input_file, entry in manifest.entries.items():
+            if input_file not in entries or entry['timestamp'] >= entries[input_file]['timestamp']:
+                entries[input_file] = entry
+
+    merged_manifest = os.path.join(output_dir, 'manifest.jsonl')
+    temp_file = merged_manifest + '.tmp'
+    with open(temp_file, 'w') as file:
+        for input_file in sorted(entries):
+            file.write(json.dumps(entries[input_file]) + '\n')
+    os.replace(temp_file, merged_manifest)
+
+    reports = []
+    for report_file in sorted(glob.glob(os.path.join(output_dir, 'batch_report-shard-*.json'))):
+        with open(report_file, 'r') as file:
+            reports.append(json.load(file))
+
+    merged_report = {'shards': len(reports)}
+    for report in reports:
+        for key, value in report.items():
+            if key == 'wall_seconds':
+                merged_report[key] = max(merged_report.get(key, 0), value)
+            elif key == 'max_workers':
+                merged_report['workers'] = merged_report.get('workers', 0) + max(value, 1)
+            elif isinstance(value, (int, float)) and key not in ('num_shards', 'shard_index', 'efficiency'):
+                merged_report[key] = merged_report.get(key, 0) + value
+    if 'busy_seconds' in merged_report and merged_report.get('wall_seconds'):
+        # Efficiency of the whole run, over the workers of every shard
+        merged_report['efficiency'] = merged_report['busy_seconds'] / (merged_report['wall_seconds'] * merged_report['workers'])
+    merged_report['manifest_entries'] = len(entries)
+
+    with open(os.path.join(output_dir, 'batch_report.json'), 'w') as file:
+        json.dump(merged_report, file, indent=2)
+    return merged_report
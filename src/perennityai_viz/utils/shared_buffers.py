@@ -0,0 +1,214 @@
+import weakref
+import collections
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+# Shared memory segments attached by this (worker) process, by name, least recently used first.
+# Owners replace segments over time, so only the most recent ones are kept mapped.
+_attached = collections.OrderedDict()
+MAX_ATTACHED = 32
+
+
+def attach_segment(name):
+    """
+    Attaches an existing shared memory segment without taking ownership of it.
+
+    The segment is not registered with the resource tracker of this process, so a worker exiting (or
+    crashing) never unlinks a segment that its owner still uses. Attachments are cached per process.
+
+    Args:
+        name (str): Name of the segment.
+
+    Returns:
+        multiprocessing.shared_memory.SharedMemory: The attached segment.
+    """
+    segment = _attached.get(name)
+    if segment is not None:
+        _attached.move_to_end(name)
+    else:
+        try:
+            segment = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13 always registers attached segments. Unregistering afterwards would also drop
+            # the owner's registration when both share a tracker (spawned workers do), so skip it instead.
+            register = resource_tracker.register
+            resource_tracker.register = lambda *args, **kwargs: None
+            try:
+                segment = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        _attached[name] = segment
+        while len(_attached) > MAX_ATTACHED:
+            _, stale = _attached.popitem(last=False)
+            try:
+                stale.close()
+            except BufferError:
+                pass
+    return segment
+
+
+def _discard(segment):
+    """Unlinks and closes an owned segment; views still alive keep their mapping until collected."""
+    try:
+        segment.unlink()
+    except OSError:
+        pass
+    try:
+        segment.close()
+    except BufferError:
+        pass
+
+
+class SharedArrayRef:
+    """
+    A small, picklable descriptor of a NumPy array held in a shared memory segment.
+
+    Only the descriptor crosses process boundaries; the array itself is read and written in place.
+
+    Attributes:
+        name (str): Name of the shared memory segment.
+        shape (tuple): Shape of the array.
+        dtype (str): NumPy dtype of the array.
+    """
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype).str
+
+    @property
+    def nbytes(self):
+        """Size of the array in bytes."""
+        return int(np.prod(self.shape)) * np.dtype(self.dtype).itemsize
+
+    def open(self):
+        """
+        Returns the array as a view of the shared segment, attaching it if needed.
+
+        Returns:
+            numpy.ndarray: The shared array. It stays valid until its buffer is released by the owner.
+        """
+        segment = attach_segment(self.name)
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=segment.buf)
+
+    def __repr__(self):
+        return f'SharedArrayRef({self.name!r}, {self.shape}, {self.dtype!r})'
+
+
+class SharedBufferPool:
+    """
+    A fixed-capacity pool of reusable shared memory segments owned by the parent of a process pool.
+
+    Buffers cycle through the pool: the owner acquires a free segment (reusing one large enough, or
+    creating one sized to the request), hands a SharedArrayRef to a worker, and releases the segment
+    when the worker's result is back. When all `max_buffers` segments are in use, or a new segment would
+    exceed `max_bytes`, allocate returns None and the caller falls back to pickling, so the pool never
+    blocks the pipeline and never overcommits /dev/shm.
+
+    Only the owner creates and unlinks segments. Workers attach without registering them (see
+    attach_segment), every segment is unlinked by close(), and close() also runs when the pool is
+    garbage collected or the interpreter exits; if the owner itself dies, its resource tracker
+    unlinks the segments.
+
+    Attributes:
+        max_buffers (int): Maximum number of segments.
+        max_bytes (int): Maximum total size of the segments, or None for no limit.
+        logger (Log): Optional logger.
+    """
+
+    def __init__(self, max_buffers, max_bytes=None, logger=None):
+        """
+        Initializes the SharedBufferPool.
+
+        Args:
+            max_buffers (int): Maximum number of segments, typically the number of in-flight tasks.
+            max_bytes (int, optional): Maximum total size of the segments. Defaults to None (no limit).
+            logger (optional): Logger instance for logging. Defaults to None.
+        """
+        self.max_buffers = max_buffers
+        self.max_bytes = max_bytes
+        self.logger = logger
+        self.free = []
+        self.in_use = {}
+        self._finalizer = weakref.finalize(self, SharedBufferPool._unlink_all, self.free, self.in_use)
+
+    @staticmethod
+    def _unlink_all(free, in_use):
+        for segment in list(free) + list(in_use.values()):
+            _discard(segment)
+        free.clear()
+        in_use.clear()
+
+    @property
+    def nbytes(self):
+        """Total size of the segments of the pool."""
+        return sum(segment.size for segment in self.free) + sum(segment.size for segment in self.in_use.values())
+
+    def allocate(self, shape, dtype):
+        """
+        Acquires a segment for an array of the given shape and dtype.
+
+        Args:
+            shape (tuple): Shape of the array.
+            dtype: NumPy dtype of the array.
+
+        Returns:
+            SharedArrayRef: The descriptor of the (uninitialized) array, or None when the pool is full
+                or the segment cannot be created.
+        """
+        nbytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        # Reuse the smallest free segment that is large enough
+        candidates = [segment for segment in self.free if segment.size >= nbytes]
+        if candidates:
+            segment = min(candidates, key=lambda segment: segment.size)
+            self.free.remove(segment)
+        else:
+            # Drop free segments, all too small, until the new one fits the count and size limits
+            while (len(self.free) + len(self.in_use) >= self.max_buffers or
+                   (self.max_bytes is not None and self.nbytes + nbytes > self.max_bytes)):
+                if not self.free:
+                    return None
+                small = max(self.free, key=lambda segment: segment.size)
+                self.free.remove(small)
+                _discard(small)
+            try:
+                segment = shared_memory.SharedMemory(create=True, size=nbytes)
+            except OSError as e:
+                if self.logger is not None:
+                    self.logger.warning(f"Could not create a shared memory segment of {nbytes} bytes : {e}")
+                return None
+        self.in_use[segment.name] = segment
+        return SharedArrayRef(segment.name, shape, dtype)
+
+    def put(self, array):
+        """
+        Copies an array into a shared segment.
+
+        Args:
+            array (numpy.ndarray): The array to share.
+
+        Returns:
+            SharedArrayRef: The descriptor of the shared copy, or None when the pool is full.
+        """
+        ref = self.allocate(array.shape, array.dtype)
+        if ref is not None:
+            self.view(ref)[...] = array
+        return ref
+
+    def view(self, ref):
+        """Returns the array of a descriptor acquired from this pool, without attaching it again."""
+        return np.ndarray(ref.shape, dtype=ref.dtype, buffer=self.in_use[ref.name].buf)
+
+    def release(self, ref):
+        """
+        Returns the segment of a descriptor to the pool for reuse.
+
+        Args:
+            ref (SharedArrayRef): A descriptor acquired from this pool. None is ignored.
+        """
+        if ref is not None and ref.name in self.in_use:
+            self.free.append(self.in_use.pop(ref.name))
+
+    def close(self):
+        """Unlinks every segment of the pool."""
+        self._finalizer()
@@ -0,0 +1,273 @@
+import os
+import json
+import functools
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from .csv_handler import CSVHandler
+from .logger import Log
+from .file_discovery import find_files
+from .tfrecord_processor import TFRecordProcessor, ALL_FEATURE_COLUMNS, FEATURES_LAYOUT
+
+
+def _convert_files(converter, files, stream):
+    """Converts a slice of the input files in a worker process. Module-level so it can be sent to the pool."""
+    return converter.convert_files(files, stream)
+
+
+def split_files(files, num_slices):
+    """
+    Splits a list of files into contiguous slices of about the same total size on disk.
+
+    Args:
+        files (list of str): Paths of the files, in order.
+        num_slices (int): Number of slices.
+
+    Returns:
+        list of list of str: The non-empty slices, in order.
+    """
+    sizes = [os.path.getsize(f) if os.path.exists(f) else 0 for f in files]
+    target = max(sum(sizes), 1) / max(num_slices, 1)
+    slices, current, current_size = [], [], 0
+    for i, (f, size) in enumerate(zip(files, sizes)):
+        # Start the next slice once this one is full, or when the files left are just enough for the slices left
+        slices_left = num_slices - len(slices) - 1
+        if current and slices_left > 0 and (current_size + size / 2 > target or len(files) - i <= slices_left):
+            slices.append(current)
+            current, current_size = [], 0
+        current.append(f)
+        current_size += size
+    if current:
+        slices.append(current)
+    return slices
+
+
+class TFRecordConverter:
+    """
+    Converts CSV and Parquet landmark files into sharded TFRecord files.
+
+    Every sequence (grouped by `sequence_id`) becomes exactly one tf.train.Example. The input files are
+    split between the workers, and each worker writes the records of its files to one stream of shards
+    of a target size, optionally GZIP or ZLIB compressed. A `manifest.json` listing every shard with its
+    record count and source files is written to the output directory.
+
+    Attributes:
+        output_dir (str): Directory where shards and the manifest are written.
+        shard_size_mb (float): Target size of each shard in megabytes (uncompressed).
+        compression_type (str): None, 'GZIP' or 'ZLIB'.
+        max_workers (int): Number of worker processes.
+        encoding (str): Encoding of the CSV files.
+        verbose (str): Logging level.
+        layout (str): Record layout, 'features' (one FloatList per column) or 'raw' (one float32 buffer).
+    """
+
+    def __init__(self, output_dir, shard_size_mb=100, compression_type=None, max_workers=None,
+                 encoding='ISO-8859-1', verbose='INFO', layout=FEATURES_LAYOUT):
+        """
+        Initializes the TFRecordConverter.
+
+        Args:
+            output_dir (str): Directory where shards and the manifest are written.
+            shard_size_mb (float, optional): Target shard size in megabytes. Defaults to 100.
+            compression_type (str, optional): None, 'GZIP' or 'ZLIB'. Defaults to None.
+            max_workers (int, optional): Number of worker processes. Defaults to the CPU count.
+            encoding (str, optional): Encoding of the CSV files. Defaults to 'ISO-8859-1'.
+            verbose (str, optional): Logging level. Defaults to 'INFO'.
+            layout (str, optional): Record layout, 'features' or 'raw'. Defaults to 'features'.
+
+        Raises:
+            ValueError: If the output directory does not exist or the compression type is invalid.
+        """
+        if not os.path.exists(output_dir):
+            raise ValueError("Please, provide output_dir!")
+        if compression_type not in (None, '', 'GZIP', 'ZLIB'):
+            raise ValueError(f"Invalid compression type : {compression_type}")
+
+        self.output_dir = output_dir
+        self.shard_size_mb = shard_size_mb
+        self.compression_type = compression_type or None
+        self.max_workers = max_workers if max_workers is not None else multiprocessing.cpu_count()
+        self.encoding = encoding
+        self.verbose = verbose
+        self.layout = layout
+        self.logger = Log(log_file=os.path.join(output_dir, "tfrecord_converter.log"), verbose=verbose)
+
+    def read_frames(self, input_file):
+        """
+        Reads the frames of a CSV or Parquet file.
+
+        Args:
+            input_file (str): Path of the input file.
+
+        Returns:
+            pandas.DataFrame: The frames, with landmark, `phrase` and (if present) `sequence_id` columns.
+
+        Raises:
+            ValueError: If the file format is not supported.
+        """
+        csv = CSVHandler(encoding=self.encoding, logger=self.logger)
+        if input_file.endswith('.csv'):
+            return csv.read_csv_file(input_file)
+        elif input_file.endswith('.parquet'):
+            columns = csv.get_parquet_columns(input_file)
+            columns = [col for col in ['sequence_id', 'phrase'] + ALL_FEATURE_COLUMNS if col in columns]
+            return csv.read_parquet_file(input_file, columns=columns)
+        raise ValueError(f"Unsupported input file format : {input_file}")
+
+    def iter_csv_sequences(self, input_file):
+        """
+        Streams the sequences of a CSV file with CSVHandler.iter_csv_sequences.
+
+        Args:
+            input_file (str): Path of the CSV file.
+
+        Yields:
+            tuple: (sequence_id, phrase, frames_np), as yielded by TFRecordProcessor.iter_sequences.
+
+        Raises:
+            ValueError: If the phrase or landmark columns are missing.
+        """
+        csv = CSVHandler(encoding=self.encoding, logger=self.logger)
+        columns = ['phrase'] + ALL_FEATURE_COLUMNS
+        for sequence_id, seq_df in csv.iter_csv_sequences(input_file, usecols=columns, required=columns):
+            frames_np = seq_df[ALL_FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+            yield sequence_id, seq_df['phrase'].iloc[0], frames_np
+
+    def iter_file_sequences(self, input_file, processor):
+        """
+        Streams the sequences of one CSV or Parquet file.
+
+        Args:
+            input_file (str): Path of a CSV or Parquet file.
+            processor (TFRecordProcessor): Processor grouping the frames of Parquet files into sequences.
+
+        Yields:
+            tuple: (sequence_id, phrase, frames_np), as yielded by TFRecordProcessor.iter_sequences.
+        """
+        if input_file.endswith('.csv'):
+            # Stream CSV files one sequence at a time, so their size is not bounded by memory
+            return self.iter_csv_sequences(input_file)
+        return processor.iter_sequences(self.read_frames(input_file))
+
+    def convert_files(self, files, stream):
+        """
+        Converts a list of input files into one stream of TFRecord shards.
+
+        The sequences of all the files are written one after the other to the same shards, and a shard is
+        only closed once it reaches the target size, so many small files do not give many small shards:
+        only the last shard of the stream can be smaller. Shards are named after the stream, e.g.
+        'part-000-00000.tfrecord'. A file that fails is logged and skipped; the records it yielded before
+        failing are kept.
+
+        Args:
+            files (list of str): Paths of CSV or Parquet files, in order.
+            stream (int): Number of the shard stream, used in the shard names.
+
+        Returns:
+            tuple: (shards, failed). `shards` has one entry per shard with its `path`, `records`, `bytes` and
+                `sources`, the input files with records in the shard; `failed` lists the files that failed.
+        """
+        processor = TFRecordProcessor(logger=self.logger, layout=self.layout)
+        records = []
+        failed = []
+
+        def sequences():
+            for input_file in files:
+                records.append([input_file, 0])
+                try:
+                    for sequence in self.iter_file_sequences(input_file, processor):
+                        records[-1][1] += 1
+                        yield sequence
+                except Exception as e:
+                    self.logger.error(f"Failed converting : {input_file} : {e}")
+                    failed.append(input_file)
+                else:
+                    self.logger.info("Finished converting : ", input_file)
+
+        shards = processor.write_sharded(
+            sequences(),
+            os.path.join(self.output_dir, f'part-{stream:03d}'),
+            shard_size_bytes=int(self.shard_size_mb * 1024 * 1024),
+            compression_type=self.compression_type
+        )
+
+        # Files fill the shards in order: assign each shard the files of its range of records
+        file_index, file_left = 0, records[0][1] if records else 0
+        for shard in shards:
+            shard['sources'] = []
+            shard_left = shard['records']
+            while shard_left > 0:
+                while file_left == 0:
+                    file_index += 1
+                    file_left = records[file_index][1]
+                shard['sources'].append(records[file_index][0])
+                taken = min(shard_left, file_left)
+                shard_left -= taken
+                file_left -= taken
+        return shards, failed
+
+    def convert(self, input_dir='', input_file=''):
+        """
+        Converts every CSV and Parquet file of a directory tree, or a single file, and writes the manifest.
+
+        Files are found recursively with FileDiscovery, like the batch command does, and split into up to
+        max_workers slices of about the same size; each slice is converted by one worker into its own shard
+        stream (see convert_files).
+
+        Args:
+            input_dir (str, optional): Directory of input files.
+            input_file (str, optional): A single input file, used when input_dir is not given.
+
+        Returns:
+            dict: The manifest, with the list of `shards` and the `total_records`.
+
+        Raises:
+            ValueError: If no input files are found.
+        """
+        if input_dir:
+            files = find_files(input_dir, include=('*.csv', '*.parquet'), logger=self.logger)
+        else:
+            files = [input_file] if input_file and os.path.exists(input_file) else []
+        if not files:
+            raise ValueError("No CSV or Parquet input files found!")
+
+        slices = split_files(files, max(self.max_workers, 1))
+        shards = []
+        failed = []
+        executor = None
+        if len(slices) > 1:
+            executor = ProcessPoolExecutor(max_workers=len(slices), mp_context=multiprocessing.get_context('spawn'))
+        try:
+            # Serial and pool conversions report failures the same way
+            if executor is None:
+                calls = [functools.partial(self.convert_files, part, i) for i, part in enumerate(slices)]
+            else:
+                calls = [executor.submit(_convert_files, self, part, i).result for i, part in enumerate(slices)]
+            for part, call in zip(slices, calls):
+                try:
+                    part_shards, part_failed = call()
+                    shards.extend(part_shards)
+                    failed.extend(part_failed)
+                except Exception as e:
+                    self.logger.error(f"Failed converting {len(part)} files from : {part[0]} : {e}")
+                    failed.extend(part)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        manifest = {
+            'compression_type': self.compression_type,
+            'layout': self.layout,
+            'shard_size_mb': self.shard_size_mb,
+            'total_records': sum(shard['records'] for shard in shards),
+            'shards': [dict(shard, path=os.path.basename(shard['path'])) for shard in shards],
+            'failed': failed,
+        }
+        manifest_file = os.path.join(self.output_dir, 'manifest.json')
+        with open(manifest_file, 'w') as file:
+            json.dump(manifest, file, indent=2)
+
+        self.logger.info(f"Converted {len(files) - len(failed)} of {len(files)} files into {len(shards)} shards : "
+                         f"{manifest_file}")
+        return manifest
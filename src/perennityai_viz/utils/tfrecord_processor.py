@@ -1,7 +1,6 @@
 
 import os
 import sys
-import glob
 import numpy as np
 import tensorflow as tf
 
@@ -9,9 +8,17 @@ import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
 from .feature_header import get_header
+from .tfrecord_reader import (RAW_LANDMARKS_FEATURE, RAW_SHAPE_FEATURE, TFRECORD_PATTERNS, detect_compression,
+                              open_tfrecord, iter_tfrecord, is_raw_example, decode_raw_example,
+                              write_tfrecord_index)
+from .file_discovery import find_files
 
 ALL_FEATURE_COLUMNS = get_header().split('\t')
 
+# Record layouts: one FloatList feature per column, or one raw float32 (frames, 543, 3) buffer
+FEATURES_LAYOUT = 'features'
+RAW_LAYOUT = 'raw'
+
 
 class TFRecordProcessor:
     """
@@ -30,7 +37,7 @@ class TFRecordProcessor:
         ValueError: If the TFRecord path does not exist, no TFRecord files are found, or if an invalid file format is provided.
     """
 
-    def __init__(self, input_file='', input_path='', logger=None):
+    def __init__(self, input_file='', input_path='', logger=None, layout=FEATURES_LAYOUT, files=None):
         """
         Initializes the TFRecordReader with necessary parameters for handling TFRecord data.
 
@@ -38,6 +45,10 @@ class TFRecordProcessor:
             input_file (str, optional): Path to a single TFRecord file. Defaults to an empty string.
             input_path (str, optional): Path to a directory containing TFRecord or CSV files. Defaults to an empty string.
             logger (optional): Logger instance for logging. Defaults to None.
+            layout (str, optional): Record layout used when writing, 'features' or 'raw'. Reading detects
+                the layout of each file. Defaults to 'features'.
+            files (list of str, optional): TFRecord files of input_path already discovered by the caller,
+                so the directory is not listed again. Defaults to None.
 
         Raises:
             ValueError: If the specified TFRecord path does not exist or no TFRecord files are found.
@@ -47,6 +58,11 @@ class TFRecordProcessor:
         self.file_pattern = None
         self.input_path = input_path
         self.logger = logger
+        if layout not in (FEATURES_LAYOUT, RAW_LAYOUT):
+            raise ValueError(f"Invalid TFRecord layout : {layout}")
+        self.layout = layout
+        # Detected record layouts by file: ((size, mtime_ns), layout)
+        self.layout_cache = {}
 
         # Handling single TFRecord file or converting CSV path to TFRecord paths
         if os.path.isfile(input_file):
@@ -58,8 +74,8 @@ class TFRecordProcessor:
             if os.path.exists(self.input_path):
                 self.file_pattern = f'{self.input_path}/*.tfrecord'
 
-                # Use glob to match files and verify
-                self.input_file = glob.glob(self.file_pattern)
+                # Search the directory tree unless the caller already did
+                self.input_file = list(files) if files is not None else self.find_tfrecord_files(self.input_path)
                 if not self.input_file:
                     self.logger.debug(f"No TFRecord files found in {self.input_path}")
 
@@ -67,6 +83,13 @@ class TFRecordProcessor:
         self.feature_description = {COL: tf.io.VarLenFeature(dtype=tf.float32) for COL in ALL_FEATURE_COLUMNS}
         self.feature_description["phrase"] = tf.io.FixedLenFeature([], dtype=tf.string)
 
+        # Feature descriptions of the raw-tensor layout
+        self.raw_feature_description = {
+            RAW_LANDMARKS_FEATURE: tf.io.FixedLenFeature([], dtype=tf.string),
+            RAW_SHAPE_FEATURE: tf.io.FixedLenFeature([3], dtype=tf.int64),
+            "phrase": tf.io.FixedLenFeature([], dtype=tf.string),
+        }
+
     def set_shape(self, num_features, channels):
         """
         Updates the shape configuration for features and channels.
@@ -113,8 +136,20 @@ class TFRecordProcessor:
         """
         self.input_path = tfrecord_path
         self.file_pattern = f'{tfrecord_path}/*.tfrecord'
-        # Use glob to match files and verify
-        self.input_file = glob.glob(self.file_pattern)
+        self.input_file = self.find_tfrecord_files(tfrecord_path)
+
+    @staticmethod
+    def find_tfrecord_files(tfrecord_path):
+        """
+        Lists the uncompressed and compressed (.tfrecord.gz, .tfrecord.zlib) TFRecord files of a directory tree.
+
+        Args:
+            tfrecord_path (str): Path to the directory containing TFRecord files, possibly in subdirectories.
+
+        Returns:
+            list of str: The files, sorted by path.
+        """
+        return find_files(tfrecord_path, include=TFRECORD_PATTERNS)
 
 
     def decode_fn(self, record_bytes):
@@ -159,17 +194,87 @@ class TFRecordProcessor:
         return landmarks, phrase
 
 
+    def decode_raw_fn(self, record_bytes):
+        """
+        Decodes a single example of the raw-tensor layout.
+
+        The landmark buffer is decoded with a single `tf.io.decode_raw` and returned in the same
+        (frames, len(ALL_FEATURE_COLUMNS)) shape as `decode_fn`, with the frame index as first column.
+
+        Parameters:
+        ----------
+        record_bytes : tf.Tensor
+            A tensor containing serialized bytes from a TFRecord file.
+
+        Returns:
+        -------
+        tuple
+            (landmarks, phrase), as returned by `decode_fn`.
+        """
+        features = tf.io.parse_single_example(record_bytes, self.raw_feature_description)
+        landmarks = tf.io.decode_raw(features[RAW_LANDMARKS_FEATURE], tf.float32, little_endian=True)
+        landmarks = tf.reshape(landmarks, [features[RAW_SHAPE_FEATURE][0], -1])
+        frame = tf.cast(tf.range(tf.shape(landmarks)[0]), tf.float32)[:, tf.newaxis]
+        return tf.concat([frame, landmarks], axis=1), features["phrase"]
+
+    def detect_layout(self, input_file, compression_type='auto'):
+        """
+        Detects the record layout of a TFRecord file from its first record.
+
+        The layout is cached per file until the file changes, so reading a file after checking its layout
+        does not open it twice.
+
+        Args:
+            input_file (str): Path of the TFRecord file.
+            compression_type (str, optional): 'auto', None, 'GZIP' or 'ZLIB'. Defaults to 'auto'.
+
+        Returns:
+            str: 'raw' or 'features'. Empty files are reported as 'features'.
+        """
+        stat = os.stat(input_file)
+        key = (stat.st_size, stat.st_mtime_ns)
+        cached = self.layout_cache.get(input_file)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with open_tfrecord(input_file, compression_type) as file:
+            record = next(iter_tfrecord(file), None)
+        layout = RAW_LAYOUT if record is not None and is_raw_example(record) else FEATURES_LAYOUT
+        self.layout_cache[input_file] = (key, layout)
+        return layout
+
+    def read_raw_records(self, input_file, compression_type='auto'):
+        """
+        Reads raw-tensor layout records with NumPy only, without building a tf.data pipeline.
+
+        Args:
+            input_file (str): Path of the TFRecord file.
+            compression_type (str, optional): 'auto', None, 'GZIP' or 'ZLIB'. Defaults to 'auto'.
+
+        Yields:
+            tuple: (landmarks, phrase, sequence_id) with landmarks of shape (frames, 543, 3).
+        """
+        with open_tfrecord(input_file, compression_type) as file:
+            for record in iter_tfrecord(file):
+                yield decode_raw_example(record)
+
     def get_files(self):
         return self.input_file
 
-    def get_dataset(self, input_file):
+    def get_dataset(self, input_file, num_parallel_reads=None, deterministic=True, prefetch=True):
         """
-        Loads and decodes a TFRecord dataset from the specified file.
+        Loads and decodes a TFRecord dataset from one or more files.
 
         Parameters:
         ----------
-        input_file : str
-            The file path to the TFRecord file containing serialized dataset examples.
+        input_file : str or list of str
+            The TFRecord file(s) containing serialized dataset examples. Compression (GZIP/ZLIB) and
+            record layout are detected per file.
+        num_parallel_reads : int, optional
+            Number of files read concurrently when several files are given. Defaults to tf.data.AUTOTUNE.
+        deterministic : bool, optional
+            Whether records are produced in a fixed order across runs. Defaults to True.
+        prefetch : bool, optional
+            Whether to prefetch decoded records ahead of the consumer. Defaults to True.
 
         Returns:
         -------
@@ -182,25 +287,68 @@ class TFRecordProcessor:
 
         Process:
         -------
-        1. Loads the raw dataset from the provided TFRecord file using `tf.data.TFRecordDataset`.
-        2. Applies `self.decode_fn` to parse and decode each serialized example, using
-        `num_parallel_calls=tf.data.AUTOTUNE` for efficient multi-threaded processing.
-        3. Returns the decoded dataset ready for further processing or training.
+        1. Detects the compression type and record layout of each file (see detect_layout).
+        2. Interleaves the records of the files, in the order given, with `num_parallel_reads` concurrent
+        readers; each reader opens its file with the file's compression type.
+        3. Applies `self.decode_fn` (or `self.decode_raw_fn`, chosen per record when the layouts are mixed)
+        to each serialized example, using `num_parallel_calls=tf.data.AUTOTUNE` for efficient
+        multi-threaded processing.
+        4. Prefetches the result.
 
         Notes:
         ------
-        - This method assumes that `self.decode_fn` and `self.feature_description` are 
-        appropriately defined to match the TFRecord schema.
-        - Designed to handle large datasets efficiently by leveraging TensorFlow's 
-        `tf.data` API for seamless data loading and decoding.
+        - With `deterministic=False`, records are produced as soon as any reader has one, which keeps
+        throughput up when some shards are slower to read (e.g. on network storage).
         """
-        raw_dataset = tf.data.TFRecordDataset(input_file)
-
-        # Decode using self.decode_fn for each example
-        dataset = raw_dataset.map(self.decode_fn, num_parallel_calls=tf.data.AUTOTUNE)
-        
+        files = [input_file] if isinstance(input_file, str) else list(input_file)
+        if not files:
+            raise ValueError("No TFRecord files to read!")
+        cycle_length = num_parallel_reads if num_parallel_reads else tf.data.AUTOTUNE
+
+        compressions, raw_layouts = [], []
+        for f in files:
+            compression_type = detect_compression(f)
+            compressions.append(compression_type or '')
+            raw_layouts.append(self.detect_layout(f, compression_type) == RAW_LAYOUT)
+
+        # One interleaved pipeline over the files in input order; each record carries its file's layout
+        if len(files) == 1:
+            raw_dataset = tf.data.TFRecordDataset(files[0], compression_type=compressions[0]).map(
+                lambda record: (record, raw_layouts[0]))
+        else:
+            raw_dataset = tf.data.Dataset.from_tensor_slices((files, compressions, raw_layouts)).interleave(
+                lambda f, c, raw: tf.data.TFRecordDataset(f, compression_type=c).map(lambda record: (record, raw)),
+                cycle_length=cycle_length,
+                num_parallel_calls=tf.data.AUTOTUNE,
+                deterministic=deterministic)
+
+        # Decode each example with the decoder of its file's layout
+        if len(set(raw_layouts)) == 1:
+            layout_fn = self.decode_raw_fn if raw_layouts[0] else self.decode_fn
+            decode_fn = lambda record, raw: layout_fn(record)
+        else:
+            decode_fn = lambda record, raw: tf.cond(raw, lambda: self.decode_raw_fn(record),
+                                                    lambda: self.decode_fn(record))
+        dataset = raw_dataset.map(decode_fn, num_parallel_calls=tf.data.AUTOTUNE, deterministic=deterministic)
+
+        if prefetch:
+            dataset = dataset.prefetch(tf.data.AUTOTUNE)
         return dataset
 
+    def get_directory_dataset(self, tfrecord_path=None, num_parallel_reads=None, deterministic=True):
+        """
+        Loads and decodes every TFRecord shard of a directory as one interleaved, prefetched dataset.
+
+        Args:
+            tfrecord_path (str, optional): Directory of the shards. Defaults to the processor's input path.
+            num_parallel_reads (int, optional): Number of shards read concurrently. Defaults to tf.data.AUTOTUNE.
+            deterministic (bool, optional): Whether records are produced in a fixed order. Defaults to True.
+
+        Returns:
+            tf.data.Dataset: (landmarks, phrase) entries, as returned by `get_dataset`.
+        """
+        files = self.find_tfrecord_files(tfrecord_path or self.input_path)
+        return self.get_dataset(files, num_parallel_reads=num_parallel_reads, deterministic=deterministic)
 
     def write_dataset_to_tfrecord(self, train_ds, tfrecord_path):
         """
@@ -234,39 +382,139 @@ class TFRecordProcessor:
     
         return dataset
     
-    def write_df_to_tfrecord(self, tf_file, frames_df):
-        # Make a copy of the DataFrame
-        seq_df = frames_df.copy()
-        phrase = frames_df.at[0, 'phrase']
+    def serialize_sequence(self, frames_np, phrase, sequence_id=None):
+        """
+        Serializes the frames of one sequence into a single tf.train.Example, in the processor's layout.
 
-        # Filter out unwanted columns that start with specific prefixes
-        seq_df = seq_df.filter(regex='^(?!sequence_id)')
-        seq_df = seq_df.filter(regex='^(?!phrase)')
-        seq_df = seq_df.filter(regex='^(?!context)')
+        The 'features' layout stores one FloatList per column. The 'raw' layout stores the landmarks as one
+        little-endian float32 (frames, 543, 3) buffer with its shape; the frame column is not stored.
+
+        Args:
+            frames_np (numpy.ndarray): Frames of shape (frames, len(ALL_FEATURE_COLUMNS)), in column order.
+            phrase (str): The phrase label of the sequence.
+            sequence_id (int, optional): Identifier of the sequence. Not stored when None.
 
+        Returns:
+            bytes: The serialized example.
+        """
+        if self.layout == RAW_LAYOUT:
+            landmarks = np.ascontiguousarray(frames_np[:, 1:], dtype='<f4').reshape(len(frames_np), -1, 3)
+            features = {
+                RAW_LANDMARKS_FEATURE: tf.train.Feature(bytes_list=tf.train.BytesList(value=[landmarks.tobytes()])),
+                RAW_SHAPE_FEATURE: tf.train.Feature(int64_list=tf.train.Int64List(value=list(landmarks.shape))),
+            }
+        else:
+            features = {ALL_FEATURE_COLUMNS[i]: tf.train.Feature(
+                float_list=tf.train.FloatList(value=frames_np[:, i])) for i in range(len(ALL_FEATURE_COLUMNS))}
+        features["phrase"] = tf.train.Feature(bytes_list=tf.train.BytesList(value=[bytes(str(phrase), 'utf-8')]))
+        if sequence_id is not None:
+            features["sequence_id"] = tf.train.Feature(int64_list=tf.train.Int64List(value=[int(sequence_id)]))
+        return tf.train.Example(features=tf.train.Features(feature=features)).SerializeToString()
+
+    def iter_sequences(self, frames_df):
+        """
+        Splits a DataFrame of frames into its sequences.
+
+        Args:
+            frames_df (pandas.DataFrame): Frames with the columns of ALL_FEATURE_COLUMNS, a `phrase` column and
+                optionally a `sequence_id` column. Without `sequence_id`, all frames form one sequence.
+
+        Yields:
+            tuple: (sequence_id, phrase, frames_np) for every sequence, in order of first appearance.
+
+        Raises:
+            ValueError: If landmark columns are missing.
+        """
         missing_columns = [col for col in ALL_FEATURE_COLUMNS if col not in frames_df.columns]
         if missing_columns:
             raise ValueError(f"Missing columns : {missing_columns}")
 
-        # Reorder columns based on a predefined order in `ALL_FEATURE_COLUMNS`
-        seq_df = seq_df[ALL_FEATURE_COLUMNS]
-
-        # Ensure the target TFRecord file path exists
-        if not os.path.exists(tf_file):
-            # Write processed data to TFRecord
-            with tf.io.TFRecordWriter(tf_file) as file_writer:
-                # Loop through each row of the DataFrame and write as TFRecord
-                for idx, (seq_id, phrase) in enumerate(zip(frames_df.sequence_id, frames_df.phrase)):
-                    print(f"Processing sequence {idx}, phrase: {phrase}")  # Check if loop runs
-                    try:
-                        frames_np = seq_df.to_numpy()
-                        features = {ALL_FEATURE_COLUMNS[i]: tf.train.Feature(
-                            float_list=tf.train.FloatList(value=frames_np[:, i])) for i in range(len(ALL_FEATURE_COLUMNS))}
-                        features["phrase"] = tf.train.Feature(bytes_list=tf.train.BytesList(value=[bytes(phrase, 'utf-8')]))
-                        
-                        record_bytes = tf.train.Example(features=tf.train.Features(feature=features)).SerializeToString()
-                        file_writer.write(record_bytes)
-                        print("Record written.")
-                    except Exception as e:
-                        print("Error in serialization:", e)
+        if 'sequence_id' not in frames_df.columns:
+            frames_np = frames_df[ALL_FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+            yield None, frames_df['phrase'].iloc[0], frames_np
+            return
 
+        for sequence_id, seq_df in frames_df.groupby('sequence_id', sort=False):
+            frames_np = seq_df[ALL_FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+            yield sequence_id, seq_df['phrase'].iloc[0], frames_np
+
+    def write_sharded(self, sequences, output_prefix, shard_size_bytes=100 * 1024 * 1024, compression_type=None):
+        """
+        Writes sequences to TFRecord shards of a target size, one Example per sequence.
+
+        A new shard is started once the serialized (uncompressed) size of the current shard reaches
+        `shard_size_bytes`. Shards are named `<output_prefix>-00000.tfrecord`, with a `.gz` or `.zlib`
+        suffix when compressed. Every shard gets an index sidecar (see write_tfrecord_index) listing the
+        offset, phrase, sequence id and frame count of its records.
+
+        Args:
+            sequences (iterable): (sequence_id, phrase, frames_np) tuples, as yielded by iter_sequences.
+            output_prefix (str): Path prefix of the shards.
+            shard_size_bytes (int, optional): Target shard size in bytes. Defaults to 100 MB.
+            compression_type (str, optional): None, 'GZIP' or 'ZLIB'. Defaults to None.
+
+        Returns:
+            list of dict: One entry per shard with its `path`, `records` and `bytes`.
+        """
+        suffix = {None: '', '': '', 'GZIP': '.gz', 'ZLIB': '.zlib'}[compression_type]
+        options = tf.io.TFRecordOptions(compression_type=compression_type or '')
+
+        shards = []
+        writer = None
+        index = []
+        for sequence_id, phrase, frames_np in sequences:
+            record_bytes = self.serialize_sequence(frames_np, phrase, sequence_id)
+            if writer is None or shards[-1]['bytes'] >= shard_size_bytes:
+                if writer is not None:
+                    writer.close()
+                    write_tfrecord_index(shards[-1]['path'], index)
+                path = f'{output_prefix}-{len(shards):05d}.tfrecord{suffix}'
+                writer = tf.io.TFRecordWriter(path, options)
+                shards.append({'path': path, 'records': 0, 'bytes': 0})
+                index = []
+            writer.write(record_bytes)
+            # Offsets are in the uncompressed stream: 12 header bytes and 4 CRC bytes frame every record
+            index.append({'offset': shards[-1]['bytes'] + 16 * shards[-1]['records'],
+                          'length': len(record_bytes),
+                          'phrase': str(phrase),
+                          'sequence_id': None if sequence_id is None else int(sequence_id),
+                          'frames': len(frames_np)})
+            shards[-1]['records'] += 1
+            shards[-1]['bytes'] += len(record_bytes)
+
+        if writer is not None:
+            writer.close()
+            write_tfrecord_index(shards[-1]['path'], index)
+
+        for shard in shards:
+            self.logger.debug(f"Shard written with {shard['records']} records : {shard['path']}")
+        return shards
+
+    def write_df_to_tfrecord(self, tf_file, frames_df):
+        """
+        Writes the sequences of a DataFrame to a TFRecord file, one Example per sequence.
+
+        Args:
+            tf_file (str): Path of the TFRecord file. Nothing is written if it already exists.
+            frames_df (pandas.DataFrame): Frames with the columns of ALL_FEATURE_COLUMNS, a `phrase` column and
+                optionally a `sequence_id` column.
+
+        Returns:
+            int: The number of records written.
+
+        Raises:
+            ValueError: If landmark columns are missing.
+        """
+        if os.path.exists(tf_file):
+            self.logger.warning(f"TFRecord file already exists, skipping : {tf_file}")
+            return 0
+
+        records = 0
+        # Write processed data to TFRecord
+        with tf.io.TFRecordWriter(tf_file) as file_writer:
+            for sequence_id, phrase, frames_np in self.iter_sequences(frames_df):
+                file_writer.write(self.serialize_sequence(frames_np, phrase, sequence_id))
+                records += 1
+
+        self.logger.debug(f"{records} records written : {tf_file}")
+        return records
@@ -0,0 +1,466 @@
+import io
+import os
+import json
+import gzip
+import zlib
+import struct
+import numpy as np
+
+from .landmark_layout import LANDMARK_COLUMNS, NUM_LANDMARKS
+
+# Feature names of the raw-tensor layout
+RAW_LANDMARKS_FEATURE = 'landmarks'
+RAW_SHAPE_FEATURE = 'shape'
+
+# Suffix of the index sidecar of a TFRecord file
+INDEX_SUFFIX = '.index.json'
+
+# File name patterns of uncompressed and compressed TFRecord files
+TFRECORD_PATTERNS = ('*.tfrecord', '*.tfrecord.gz', '*.tfrecord.zlib')
+
+
+def detect_compression(path):
+    """
+    Detects the compression of a TFRecord file from its name, or else from its first bytes.
+
+    An uncompressed file starts with the uint64 length of its first record, so a GZIP or ZLIB magic
+    number is only trusted when that length would not fit in the file.
+
+    Args:
+        path (str): Path of the TFRecord file.
+
+    Returns:
+        str: None, 'GZIP' or 'ZLIB'.
+    """
+    if path.endswith('.gz'):
+        return 'GZIP'
+    if path.endswith('.zlib'):
+        return 'ZLIB'
+
+    with open(path, 'rb') as file:
+        header = file.read(8)
+    if len(header) < 8:
+        return None
+
+    plausible_length = struct.unpack('<Q', header)[0] + 16 <= os.path.getsize(path)
+    if plausible_length:
+        return None
+    if header[:2] == b'\x1f\x8b':
+        return 'GZIP'
+    if header[0] & 0x0F == 8 and (header[0] * 256 + header[1]) % 31 == 0:
+        return 'ZLIB'
+    return None
+
+
+def iter_tfrecord(fileobj):
+    """
+    Iterates the records of an uncompressed TFRecord stream without TensorFlow.
+
+    Each record is framed as: uint64 length, uint32 masked CRC of the length, data, uint32 masked CRC of
+    the data. CRCs are not verified.
+
+    Args:
+        fileobj (file object): A binary stream positioned at the start of a record.
+
+    Yields:
+        bytes: The serialized record.
+
+    Raises:
+        ValueError: If the stream ends in the middle of a record.
+    """
+    while True:
+        header = fileobj.read(12)
+        if not header:
+            return
+        if len(header) < 12:
+            raise ValueError("Truncated TFRecord header.")
+        length = struct.unpack('<Q', header[:8])[0]
+        data = fileobj.read(length)
+        if len(data) < length or len(fileobj.read(4)) < 4:
+            raise ValueError("Truncated TFRecord record.")
+        yield data
+
+
+class ZlibReader(io.RawIOBase):
+    """
+    Decompresses a ZLIB file incrementally, like gzip.open for GZIP files.
+
+    Only `chunk_size` bytes of compressed and uncompressed data are held at a time. Seeking forward
+    decompresses and discards the data skipped; seeking backward restarts from the start of the file.
+    """
+
+    def __init__(self, path, chunk_size=64 * 1024):
+        """
+        Opens a ZLIB file.
+
+        Args:
+            path (str): Path of the file.
+            chunk_size (int, optional): Bytes read and decompressed per step. Defaults to 64 KB.
+        """
+        super().__init__()
+        self.file = open(path, 'rb')
+        self.chunk_size = chunk_size
+        self._rewind()
+
+    def _rewind(self):
+        self.file.seek(0)
+        self.decompressor = zlib.decompressobj()
+        self.buffer = b''
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        while not self.buffer:
+            if self.decompressor.eof:
+                return 0
+            data = self.decompressor.unconsumed_tail or self.file.read(self.chunk_size)
+            if not data:
+                raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+            self.buffer = self.decompressor.decompress(data, self.chunk_size)
+        size = min(len(b), len(self.buffer))
+        b[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        self.position += size
+        return size
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("ZLIB files can only seek from the start or the current position")
+        if offset < self.position:
+            self._rewind()
+        skip = bytearray(self.chunk_size)
+        while self.position < offset:
+            if not self.readinto(memoryview(skip)[:offset - self.position]):
+                break
+        return self.position
+
+    def close(self):
+        if not self.closed:
+            self.file.close()
+        super().close()
+
+
+def open_tfrecord(path, compression_type='auto'):
+    """
+    Opens a TFRecord file as an uncompressed binary stream.
+
+    Args:
+        path (str): Path of the TFRecord file.
+        compression_type (str, optional): 'auto', None, 'GZIP' or 'ZLIB'. Defaults to 'auto'.
+
+    Returns:
+        file object: A binary stream of the uncompressed records.
+    """
+    if compression_type == 'auto':
+        compression_type = detect_compression(path)
+    if compression_type == 'GZIP':
+        return gzip.open(path, 'rb')
+    elif compression_type == 'ZLIB':
+        return io.BufferedReader(ZlibReader(path))
+    return open(path, 'rb')
+
+
+def _read_varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _iter_fields(buf, start, end):
+    """Yields (field number, wire type, value) of a protobuf message; length-delimited values are (start, end)."""
+    pos = start
+    while pos < end:
+        key, pos = _read_varint(buf, pos)
+        field, wire_type = key >> 3, key & 0x07
+        if wire_type == 0:
+            value, pos = _read_varint(buf, pos)
+        elif wire_type == 1:
+            value, pos = (pos, pos + 8), pos + 8
+        elif wire_type == 2:
+            length, pos = _read_varint(buf, pos)
+            value, pos = (pos, pos + length), pos + length
+        elif wire_type == 5:
+            value, pos = (pos, pos + 4), pos + 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type : {wire_type}")
+        yield field, wire_type, value
+
+
+def _to_int64(value):
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _parse_feature(buf, start, end):
+    """Parses a tf.train.Feature into a list of bytes, a float32 array or a list of ints."""
+    for kind, _, (list_start, list_end) in _iter_fields(buf, start, end):
+        if kind == 1:  # BytesList
+            return [bytes(buf[s:e]) for _, _, (s, e) in _iter_fields(buf, list_start, list_end)]
+        elif kind == 2:  # FloatList, packed or not
+            chunks = [bytes(buf[s:e]) for _, _, (s, e) in _iter_fields(buf, list_start, list_end)]
+            return np.frombuffer(b''.join(chunks), dtype='<f4')
+        elif kind == 3:  # Int64List, packed or not
+            values = []
+            for _, wire_type, value in _iter_fields(buf, list_start, list_end):
+                if wire_type == 0:
+                    values.append(_to_int64(value))
+                else:
+                    pos, packed_end = value
+                    while pos < packed_end:
+                        item, pos = _read_varint(buf, pos)
+                        values.append(_to_int64(item))
+            return values
+    return []
+
+
+def parse_example(record, features=None):
+    """
+    Parses a serialized tf.train.Example without TensorFlow.
+
+    Args:
+        record (bytes): The serialized example.
+        features (set of str, optional): Names of the features to decode. Defaults to all features.
+
+    Returns:
+        dict: Maps feature names to a list of bytes, a float32 array or a list of ints.
+    """
+    buf = memoryview(record)
+    parsed = {}
+    for field, _, (features_start, features_end) in _iter_fields(buf, 0, len(buf)):
+        if field != 1:
+            continue
+        for _, _, (entry_start, entry_end) in _iter_fields(buf, features_start, features_end):
+            name, value_range = None, None
+            for entry_field, _, value in _iter_fields(buf, entry_start, entry_end):
+                if entry_field == 1:
+                    name = bytes(buf[value[0]:value[1]]).decode('utf-8')
+                elif entry_field == 2:
+                    value_range = value
+            if name is not None and value_range is not None and (features is None or name in features):
+                parsed[name] = _parse_feature(buf, *value_range)
+    return parsed
+
+
+def is_raw_example(record):
+    """
+    Tells whether a serialized example uses the raw-tensor layout.
+
+    Args:
+        record (bytes): The serialized example.
+
+    Returns:
+        bool: True if the example holds a raw `landmarks` bytes feature.
+    """
+    return RAW_LANDMARKS_FEATURE in parse_example(record, features={RAW_LANDMARKS_FEATURE})
+
+
+def decode_raw_example(record):
+    """
+    Decodes a raw-tensor layout example with NumPy.
+
+    Args:
+        record (bytes): The serialized example.
+
+    Returns:
+        tuple: A tuple containing:
+            - numpy.ndarray: Landmarks of shape (frames, 543, 3), float32.
+            - str: The phrase.
+            - int: The sequence id, or None if absent.
+    """
+    parsed = parse_example(record, features={RAW_LANDMARKS_FEATURE, RAW_SHAPE_FEATURE, 'phrase', 'sequence_id'})
+    shape = parsed[RAW_SHAPE_FEATURE]
+    landmarks = np.frombuffer(parsed[RAW_LANDMARKS_FEATURE][0], dtype='<f4').reshape(shape)
+    phrase = parsed['phrase'][0].decode('utf-8') if parsed.get('phrase') else ''
+    sequence_id = parsed['sequence_id'][0] if parsed.get('sequence_id') else None
+    return landmarks, phrase, sequence_id
+
+
+def decode_features_example(record):
+    """
+    Decodes a per-column ('features' layout) example with NumPy.
+
+    Args:
+        record (bytes): The serialized example.
+
+    Returns:
+        tuple: A tuple containing:
+            - numpy.ndarray: Landmarks of shape (frames, 543, 3), float32.
+            - str: The phrase.
+            - int: The sequence id, or None if absent.
+    """
+    parsed = parse_example(record)
+    landmarks = np.stack([parsed[col] for col in LANDMARK_COLUMNS], axis=1).reshape(-1, NUM_LANDMARKS, 3)
+    phrase = parsed['phrase'][0].decode('utf-8') if parsed.get('phrase') else ''
+    sequence_id = parsed['sequence_id'][0] if parsed.get('sequence_id') else None
+    return landmarks, phrase, sequence_id
+
+
+def decode_example(record):
+    """
+    Decodes an example of either layout with NumPy.
+
+    Args:
+        record (bytes): The serialized example.
+
+    Returns:
+        tuple: (landmarks, phrase, sequence_id), as returned by decode_raw_example.
+    """
+    if is_raw_example(record):
+        return decode_raw_example(record)
+    return decode_features_example(record)
+
+
+def summarize_example(record):
+    """
+    Reads the phrase, sequence id and frame count of an example without decoding its landmarks.
+
+    Args:
+        record (bytes): The serialized example, of either layout.
+
+    Returns:
+        dict: `phrase`, `sequence_id` (None if absent) and `frames`.
+    """
+    parsed = parse_example(record, features={RAW_SHAPE_FEATURE, 'frame', 'phrase', 'sequence_id'})
+    if RAW_SHAPE_FEATURE in parsed:
+        frames = int(parsed[RAW_SHAPE_FEATURE][0])
+    else:
+        frames = len(parsed.get('frame', []))
+    return {
+        'phrase': parsed['phrase'][0].decode('utf-8') if parsed.get('phrase') else '',
+        'sequence_id': parsed['sequence_id'][0] if parsed.get('sequence_id') else None,
+        'frames': frames,
+    }
+
+
+def get_index_path(path):
+    """Returns the path of the index sidecar of a TFRecord file."""
+    return path + INDEX_SUFFIX
+
+
+def write_tfrecord_index(path, records):
+    """
+    Writes the index sidecar of a TFRecord file.
+
+    The index stores the size and modification time of the TFRecord file, so that a stale index is
+    detected, and for every record its `offset` and `length` in the uncompressed stream, `phrase`,
+    `sequence_id` and `frames`.
+
+    Args:
+        path (str): Path of the TFRecord file.
+        records (list of dict): One entry per record, in file order.
+
+    Returns:
+        dict: The index.
+    """
+    stat = os.stat(path)
+    index = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'records': records}
+    temp_file = f'{get_index_path(path)}.tmp-{os.getpid()}'
+    with open(temp_file, 'w') as file:
+        json.dump(index, file)
+    os.replace(temp_file, get_index_path(path))
+    return index
+
+
+def build_tfrecord_index(path):
+    """
+    Scans a TFRecord file and returns the index entries of its records.
+
+    Args:
+        path (str): Path of the TFRecord file.
+
+    Returns:
+        list of dict: `offset`, `length`, `phrase`, `sequence_id` and `frames` of every record.
+    """
+    records = []
+    offset = 0
+    with open_tfrecord(path) as file:
+        for record in iter_tfrecord(file):
+            entry = {'offset': offset, 'length': len(record)}
+            entry.update(summarize_example(record))
+            records.append(entry)
+            offset += 16 + len(record)
+    return records
+
+
+def load_tfrecord_index(path):
+    """
+    Loads the index sidecar of a TFRecord file, if it exists and is up to date.
+
+    Args:
+        path (str): Path of the TFRecord file.
+
+    Returns:
+        list of dict: The index entries of the records, or None.
+    """
+    try:
+        stat = os.stat(path)
+        with open(get_index_path(path), 'r') as file:
+            index = json.load(file)
+        if index.get('size') == stat.st_size and index.get('mtime_ns') == stat.st_mtime_ns:
+            return index['records']
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def read_tfrecord_index(path, write=True):
+    """
+    Returns the index of a TFRecord file, from its sidecar when up to date, otherwise by scanning it.
+
+    Args:
+        path (str): Path of the TFRecord file.
+        write (bool, optional): Write the sidecar after a scan. Failures (e.g. a read-only directory)
+            are ignored. Defaults to True.
+
+    Returns:
+        list of dict: The index entries of the records, see build_tfrecord_index.
+    """
+    records = load_tfrecord_index(path)
+    if records is not None:
+        return records
+
+    records = build_tfrecord_index(path)
+    if write:
+        try:
+            write_tfrecord_index(path, records)
+        except OSError:
+            pass
+    return records
+
+
+def read_tfrecord_record(path, record_index):
+    """
+    Reads one record of a TFRecord file, seeking to it through the index sidecar.
+
+    Args:
+        path (str): Path of the TFRecord file.
+        record_index (int): Index of the record in the file.
+
+    Returns:
+        bytes: The serialized record.
+
+    Raises:
+        ValueError: If the file has no such record.
+    """
+    records = read_tfrecord_index(path)
+    if not 0 <= record_index < len(records):
+        raise ValueError(f"Record {record_index} not found, {path} has {len(records)} records")
+    entry = records[record_index]
+    with open_tfrecord(path) as file:
+        file.seek(entry['offset'])
+        return next(iter_tfrecord(file))